@@ -18,6 +18,14 @@ from opentelemetry import trace
 
 # ---- ① Load the agent ------------------------------------------------------
 from multi_tool_agent.agent import root_agent
+from tools.exa_tools import get_exa_cache
+from tools.singleflight import singleflight_stats
+from tools.browser_backend import get_browser_backend
+from tools.browser_pool import get_browser_pool
+from tools.gmail_client import GMAIL_CLIENT_SECRETS, GMAIL_USER_ID, get_gmail_clients
+from tools.gmail_mirror import GMAIL_MIRROR, get_sync_scheduler
+from tools.browserbase_tools import get_booking_queue
+from tools.booking_queue import JOB_STATES
 from dotenv import load_dotenv
 
 import assemblyai as aai
@@ -63,8 +71,9 @@ os.environ["BROWSERBASE_API_KEY"] = os.getenv("BROWSERBASE_API_KEY")
 os.environ["BROWSERBASE_PROJECT_ID"] = os.getenv("BROWSERBASE_PROJECT_ID")
 os.environ["EXA_API_KEY"] = os.getenv("EXA_API_KEY")
 
-# Note: Gmail API uses OAuth2 with credentials.json and token.json files
-# These should be placed in the project root directory
+# Note: Gmail API uses OAuth2. The client secrets file is GMAIL_CLIENT_SECRETS
+# (tools/credentials.json by default); each user's token is stored under
+# GMAIL_TOKEN_DIR after they first log in
 
 @st.cache_resource
 def init_services():
@@ -76,6 +85,15 @@ def init_services():
         session_service = sess_service,
     )
 
+    # Start the Playwright driver and pre-connect a browser session so the
+    # first booking doesn't pay for session creation
+    get_browser_pool().warm_up()
+    # Build the Gmail client (and refresh its token) before the first email call
+    get_gmail_clients().warm_up()
+    # Bring the local mailbox mirror up to date and keep it syncing
+    if GMAIL_MIRROR:
+        get_sync_scheduler().request_sync()
+
     # NEW: synchronous wrapper added in ADK 1.0
     user_id  = str(uuid.uuid4())
     session  = sess_service.create_session_sync(
@@ -305,14 +323,15 @@ with st.sidebar:
     
     st.header("🔧 System Status")
     
-    # Check if BrowserBase is configured
-    browserbase_configured = bool(os.getenv('BROWSERBASE_API_KEY') and os.getenv('BROWSERBASE_PROJECT_ID'))
+    # Check if the browser backend (BrowserBase or local Chromium) can run
+    browser_backend = get_browser_backend()
+    browser_unavailable = browser_backend.unavailable_reason()
     exa_configured = bool(os.getenv('EXA_API_KEY'))
     
-    if browserbase_configured:
-        st.success("✅ BrowserBase: Real automation enabled")
+    if not browser_unavailable:
+        st.success(f"✅ Browser ({browser_backend.name}): Real automation enabled")
     else:
-        st.error("❌ BrowserBase: Not configured")
+        st.error(f"❌ Browser ({browser_backend.name}): {browser_unavailable}")
     
     if exa_configured:
         st.success("✅ Exa Search: Restaurant search enabled")
@@ -320,12 +339,21 @@ with st.sidebar:
         st.error("❌ Exa Search: Not configured")
     
     # Check if Gmail credentials are available
-    gmail_configured = os.path.exists("credentials.json")
+    gmail_configured = (os.path.exists(GMAIL_CLIENT_SECRETS)
+                        or os.path.exists(get_gmail_clients().token_path(GMAIL_USER_ID)))
     if gmail_configured:
         st.success("✅ Gmail API: Email access enabled")
     else:
         st.warning("⚠️ Gmail API: credentials.json not found")
     
+    cache_stats = get_exa_cache().stats()
+    st.caption(
+        f"🗄️ Exa cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits • "
+        f"{cache_stats['misses']} misses • {cache_stats['evictions']} evictions"
+    )
+    coalesced = sum(s["coalesced"] for s in singleflight_stats().values())
+    st.caption(f"🔗 Coalesced duplicate tool calls: {coalesced}")
+    
     st.header("🎯 Capabilities")
     st.info("""
     **🔍 Search:** Find restaurants, reviews, and information
@@ -483,6 +511,44 @@ if send_text and text_input:
     # Clear text input after sending
     st.session_state.text_input = ""
 
+# Booking jobs run in the background; this panel re-renders on its own every
+# couple of seconds so their progress streams in without blocking the chat
+@st.fragment(run_every=2)
+def _booking_jobs_panel():
+    jobs = get_booking_queue().jobs()
+    if not jobs:
+        return
+    st.subheader("📋 Booking Jobs")
+    for job in jobs:
+        params = job["params"]
+        label = f"{params['restaurant_name']} • {params['date']} {params['time']} • party of {params['party_size']}"
+        with st.container(border=True):
+            col_info, col_action = st.columns([4, 1])
+            with col_info:
+                st.markdown(f"**{job['id']}** — {label}")
+                if job["state"] in JOB_STATES:
+                    step = JOB_STATES.index(job["state"])
+                    st.progress(step / (len(JOB_STATES) - 1), text=job["state"].upper())
+                elif job["state"] == "failed":
+                    st.error(f"❌ Failed: {job['error']}")
+                else:
+                    st.warning("🛑 Cancelled")
+            with col_action:
+                if job["state"] not in ("done", "failed", "cancelled"):
+                    if st.button("Cancel", key=f"cancel_{job['id']}"):
+                        get_booking_queue().cancel(job["id"])
+            if job["state"] == "done" and job["result"]:
+                confirmation = _extract_confirmation_number(job["result"])
+                replay = _extract_session_replay_url(job["result"])
+                if confirmation:
+                    st.success(f"🎉 **Confirmed:** {confirmation}")
+                if replay:
+                    st.info(f"🎥 **Proof:** [View Browser Session]({replay})")
+                with st.expander("Details"):
+                    st.markdown(job["result"])
+
+_booking_jobs_panel()
+
 # Footer
 st.markdown("---")
 st.markdown("**🔧 Powered by:** Exa Search • BrowserBase Automation • Gmail API • Google ADK • Streamlit") 
\ No newline at end of file
@@ -1,7 +1,8 @@
 from google.adk.agents import Agent
-from tools.exa_tools import ExaSearchTool
-from tools.browserbase_tools import book_restaurant_reservation_real, navigate_and_extract
-from tools.gmail_tools import GmailLatestEmailsTool
+from tools.exa_tools import ExaSearchTool, ExaSearchManyTool, ExaSearchLiteTool, ExaContentsTool
+from tools.browserbase_tools import SubmitBookingTool, BookingStatusTool, CancelBookingTool, navigate_and_extract
+from tools.availability_tools import AvailabilityTool
+from tools.gmail_tools import GmailLatestEmailsTool, GmailOpenEmailTool, GmailSearchTool
 from tools.date_time_tools import DateAndTimeTool
 
 description = (
@@ -30,10 +31,21 @@ You are a versatile scheduling and reservation assistant with the following capa
 
 2. **Research options**  
    • Leverage Exa to find reputable sources, reviews, and booking portals.  
+   • When comparing several options, call `exa_search_many` once with all the
+     queries instead of calling `exa_search` repeatedly.  
+   • To scan candidates cheaply, use `exa_search_lite` (titles, URLs, highlights)
+     and then `exa_get_contents` only for the one or two URLs you need in full.  
+   • When the user gives a time range ("any time between 7 and 8:30") or is
+     choosing between restaurants, call `check_availability` once with all the
+     restaurants and the window instead of trying bookings one time at a time.  
    • Present key comparisons (availability, cost, user ratings).
 
 3. **Book the selection**  
-   • Launch BrowserBase automation to complete the reservation form.  
+   • Call `submit_booking` to queue the BrowserBase automation; it returns a job ID
+     right away and the booking runs in the background, so you can queue several
+     bookings (use `priority` 1–9, lower is sooner) and keep talking to the user.  
+   • Use `get_booking_status` with the job ID to report progress or the final
+     confirmation, and `cancel_booking` if the user changes their mind.  
    • Handle login, CAPTCHA, or payment steps if required.  
    • Capture confirmation numbers, reference codes, or e-tickets.
 
@@ -42,7 +54,12 @@ You are a versatile scheduling and reservation assistant with the following capa
      (e.g., cancellation policies, check-in deadlines).
 
 ### Email & schedule management
-* Use `get_latest_emails` to surface new confirmations or meeting requests.  
+* Use `get_latest_emails` to surface new confirmations or meeting requests; it
+  lists subjects, senders and previews only. Call `open_email` with an email's ID
+  when you need the full text (e.g. the details of a confirmation).  
+* Use `search_emails` to find specific mail ("from:john@example.com",
+  "reservation after:2025-07-01", "subject:invoice newer_than:30d") instead of
+  paging through the latest emails.  
 * Flag or archive messages upon user request.  
 * Summarize upcoming appointments and suggest optimal times for new bookings.
 
@@ -92,5 +109,5 @@ root_agent = Agent(
     description=description,
     instruction=instruction,
     # Add all tools for complete functionality
-    tools=[ExaSearchTool, book_restaurant_reservation_real, navigate_and_extract, GmailLatestEmailsTool, DateAndTimeTool]
+    tools=[ExaSearchTool, ExaSearchManyTool, ExaSearchLiteTool, ExaContentsTool, AvailabilityTool, SubmitBookingTool, BookingStatusTool, CancelBookingTool, navigate_and_extract, GmailLatestEmailsTool, GmailOpenEmailTool, GmailSearchTool, DateAndTimeTool]
 ) 
\ No newline at end of file
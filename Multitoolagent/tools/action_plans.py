@@ -0,0 +1,474 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .cache import cache_db_path
+from .dates import parse_date
+from .selector_probe import ELEMENT_HELPERS_JS, ProbeSelector, find, probe, selector_set_for
+
+# Replay recorded plans before falling back to discovery; "0" always discovers
+ACTION_PLANS = os.getenv("ACTION_PLANS", "1") != "0"
+# How long one replay step polls in the page for its target; navigation has
+# already waited for the page, so a target that is still missing has drifted
+PLAN_STEP_TIMEOUT = float(os.getenv("PLAN_STEP_TIMEOUT", "0.5"))
+# Drifted replays in a row, re-recordings included, before a plan is dropped
+PLAN_MAX_FAILURES = int(os.getenv("PLAN_MAX_FAILURES", "2"))
+
+# What a step does to its target; "expect" only checks it is there
+ACTIONS = ("expect", "click", "fill", "select")
+
+# The booking form, in the order a person fills it in: the action, the
+# booking parameter it takes and where to look. Controls a page doesn't have
+# are skipped.
+BOOKING_FORM = (
+    ("select", "{party_size}", (
+        ProbeSelector('select[name*="party" i]'),
+        ProbeSelector('select[name*="covers" i]'),
+        ProbeSelector('select[aria-label*="party" i]'),
+    )),
+    ("fill", "{iso_date}", (
+        ProbeSelector('input[type="date"]'),
+        ProbeSelector('input[name*="date" i]'),
+    )),
+    ("select", "{time}", (
+        ProbeSelector('select[name*="time" i]'),
+        ProbeSelector('select[aria-label*="time" i]'),
+    )),
+)
+
+# Attributes that identify an element across page loads and across the
+# restaurants on a platform, most stable first. Ids are left out: they are
+# unique per page and often carry the restaurant's own id.
+_STABLE_ATTRS = ("data-testid", "data-test", "data-test-id", "name", "aria-label")
+# Class names that look generated (hashes, CSS modules) and change per deploy
+_GENERATED_CLASS = re.compile(r"\d|__|--|^[a-z]{1,3}-[A-Za-z0-9]{4,}$")
+# Attribute values holding a record id, e.g. "rid-104237"
+_INSTANCE_ID = re.compile(r"\d{3,}")
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _squash(value: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", value.lower())
+
+
+def _instance_specific(value: str, names=()) -> bool:
+    """
+    Whether an attribute value belongs to one restaurant rather than the
+    platform: it holds a record id or one of *names*.
+    """
+    if _INSTANCE_ID.search(value):
+        return True
+    squashed = _squash(value)
+    return any(name in squashed for name in names)
+
+
+def stable_css(element: dict, names=()) -> str:
+    """
+    Build a precise CSS selector for an element described by the probe.
+
+    Attribute values that are specific to one restaurant (see
+    _instance_specific) are never used, so the selector holds for every
+    restaurant on the platform.
+    """
+    tag = element["tag"]
+    attrs = element.get("attrs", {})
+    for name in _STABLE_ATTRS:
+        value = attrs.get(name)
+        if value and not _instance_specific(value, names):
+            return f"{tag}[{name}={_quote(value)}]"
+    classes = [c for c in attrs.get("class", "").split() if not _GENERATED_CLASS.search(c)]
+    if classes:
+        return tag + "".join(f".{c}" for c in classes[:2])
+    return tag
+
+
+class PlanStep:
+    """
+    One action against one target element.
+
+    *value* may hold {placeholders} filled from the booking parameters at
+    replay time, e.g. "{party_size}".
+    """
+
+    def __init__(self, action: str, css: str, text: str = None, tag: str = None, value: str = None):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown plan action {action!r}")
+        self.action = action
+        self.css = css
+        self.text = text
+        self.tag = tag
+        self.value = value
+
+    @property
+    def selector(self) -> ProbeSelector:
+        return ProbeSelector(self.css, self.text)
+
+    def to_dict(self) -> dict:
+        return {"action": self.action, "css": self.css, "text": self.text, "tag": self.tag, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlanStep":
+        return cls(data["action"], data["css"], data.get("text"), data.get("tag"), data.get("value"))
+
+    def to_arg(self, params: dict) -> dict:
+        arg = self.to_dict()
+        if self.value is not None:
+            arg["value"] = self.value.format(**params)
+        return arg
+
+
+class ActionPlan:
+    """
+    The recorded steps of a successful booking flow on one platform.
+    """
+
+    def __init__(self, platform: str, steps, version: int = 1, recorded_at: float = None,
+                 replays: int = 0, failures: int = 0):
+        self.platform = platform
+        self.steps = list(steps)
+        self.version = version
+        self.recorded_at = recorded_at or time.time()
+        self.replays = replays
+        # Drifted replays since the last good one
+        self.failures = failures
+
+    @property
+    def label(self) -> str:
+        return f"{self.platform}@plan{self.version}"
+
+    def playwright_selectors(self) -> tuple:
+        return tuple(step.selector.to_playwright() for step in self.steps)
+
+
+class PlanRecorder:
+    """
+    Collects the steps a discovery run took, to be saved as an ActionPlan.
+
+    *params* are the booking's parameters; the restaurant's name is kept out
+    of the recorded selectors.
+    """
+
+    def __init__(self, platform: str, params: dict = None):
+        self.platform = platform
+        self.steps = []
+        name = _squash(str((params or {}).get("restaurant_name") or ""))
+        self._names = (name,) if len(name) >= 4 else ()
+
+    def record(self, action: str, element: dict, text: str = None, value: str = None,
+               selector: ProbeSelector = None):
+        """
+        Add a step targeting *element* (as described by the probe).
+
+        *text* narrows a generic selector; it is dropped when the element has
+        a stable attribute to match on. Without one, the platform *selector*
+        the element was found by is kept instead of a guess from its classes.
+        """
+        css = stable_css(element, self._names)
+        if "[" in css:
+            text = None
+        elif selector is not None:
+            css, text = selector.css, selector.text
+        self.steps.append(PlanStep(action, css, text, element["tag"], value))
+
+    def plan(self, version: int = 1, failures: int = 0) -> ActionPlan:
+        return ActionPlan(self.platform, self.steps, version=version, failures=failures)
+
+
+class PlanStore:
+    """
+    Latest action plan per platform, written through to SQLite.
+    """
+
+    def __init__(self, db_path: str = None):
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS action_plans ("
+                " platform TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " steps TEXT NOT NULL,"
+                " recorded_at REAL NOT NULL,"
+                " replays INTEGER NOT NULL,"
+                " failures INTEGER NOT NULL)"
+            )
+            self._db.commit()
+            for platform, version, steps, recorded_at, replays, failures in self._db.execute(
+                "SELECT platform, version, steps, recorded_at, replays, failures FROM action_plans"
+            ):
+                self._plans[platform] = ActionPlan(
+                    platform, [PlanStep.from_dict(s) for s in json.loads(steps)],
+                    version, recorded_at, replays, failures,
+                )
+
+    def _write(self, plan: ActionPlan):
+        if self._db is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO action_plans (platform, version, steps, recorded_at, replays, failures)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (plan.platform, plan.version, json.dumps([s.to_dict() for s in plan.steps]),
+             plan.recorded_at, plan.replays, plan.failures),
+        )
+        self._db.commit()
+
+    def get(self, platform: str):
+        with self._lock:
+            return self._plans.get(platform)
+
+    def save(self, recorder: PlanRecorder) -> ActionPlan:
+        """
+        Store a freshly recorded plan, replacing (and versioning past) the old one.
+
+        The old plan's drifted replays carry over: a platform whose pages
+        differ too much to share a plan keeps re-recording, and is dropped
+        after PLAN_MAX_FAILURES like any other drift.
+        """
+        with self._lock:
+            previous = self._plans.get(recorder.platform)
+            if previous:
+                plan = recorder.plan(version=previous.version + 1, failures=previous.failures)
+            else:
+                plan = recorder.plan()
+            self._plans[plan.platform] = plan
+            self._write(plan)
+        print(f"[DEBUG] Recorded action plan {plan.label} ({len(plan.steps)} steps)")
+        return plan
+
+    def record_replay(self, plan: ActionPlan, ok: bool) -> bool:
+        """
+        Count a replay; a plan that keeps drifting is dropped.
+
+        Returns:
+            True if the plan was dropped
+        """
+        with self._lock:
+            if ok:
+                plan.replays += 1
+                plan.failures = 0
+            else:
+                plan.failures += 1
+            if plan.failures >= PLAN_MAX_FAILURES:
+                print(f"[DEBUG] Dropping action plan {plan.label} after {plan.failures} drifted replays")
+                self._plans.pop(plan.platform, None)
+                if self._db is not None:
+                    self._db.execute("DELETE FROM action_plans WHERE platform = ?", (plan.platform,))
+                    self._db.commit()
+                return True
+            self._write(plan)
+        return False
+
+
+class PlanDrift(Exception):
+    """
+    A replay step's target is missing or no longer the element recorded.
+    """
+
+    def __init__(self, plan: ActionPlan, step: int, reason: str):
+        super().__init__(f"{plan.label} step {step}: {reason}")
+        self.step = step
+        self.reason = reason
+
+
+# Runs in the page: every step in order, in one call. Each target gets a
+# short poll; the first one missing ends the replay.
+_REPLAY_SCRIPT = """async ([steps, timeoutMs]) => {""" + ELEMENT_HELPERS_JS + """
+    const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+    const results = [];
+    for (let i = 0; i < steps.length; i++) {
+        const step = steps[i];
+        const deadline = Date.now() + timeoutMs;
+        let nodes;
+        try {
+            while (!(nodes = findAll(step.css, step.text)).length && Date.now() < deadline) {
+                await sleep(50);
+            }
+        } catch (e) {
+            return {ok: false, step: i, reason: String(e), results};
+        }
+        if (!nodes.length) return {ok: false, step: i, reason: 'target not found', results};
+        const el = nodes.find(n => n.getBoundingClientRect().width > 0) || nodes[0];
+        if (step.tag && el.tagName.toLowerCase() !== step.tag) {
+            return {ok: false, step: i, reason: `expected <${step.tag}>, found <${el.tagName.toLowerCase()}>`, results};
+        }
+        if (step.action === 'click') {
+            el.click();
+        } else if (step.action === 'fill' || step.action === 'select') {
+            let value = step.value;
+            if (el.tagName === 'SELECT') {
+                // Match an option by value or label, e.g. "7:00 PM" for "19:00"
+                const wanted = String(value).trim().toLowerCase();
+                const option = Array.from(el.options).find(o =>
+                    o.value.toLowerCase() === wanted || o.text.trim().toLowerCase() === wanted);
+                if (!option) return {ok: false, step: i, reason: `no option ${value}`, results};
+                value = option.value;
+            }
+            // Go through the native setter: assigning el.value directly also
+            // updates React's value tracker, so controlled inputs (OpenTable,
+            // Resy) would swallow the events below
+            const proto = Object.getPrototypeOf(el);
+            const setter = (Object.getOwnPropertyDescriptor(proto, 'value') || {}).set;
+            el.focus();
+            if (setter) setter.call(el, value); else el.value = value;
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            if (el.value !== String(value)) {
+                return {ok: false, step: i, reason: `value ${value} did not stick`, results};
+            }
+        }
+        results.push({count: nodes.length, element: describe(el)});
+    }
+    return {ok: true, results};
+}"""
+
+
+async def replay(page, plan: ActionPlan, params: dict = None) -> dict:
+    """
+    Run every step of *plan* inside the page with a single page.evaluate.
+
+    Returns:
+        A probe-style {"version", "matches"} result, one match per step
+
+    Raises:
+        PlanDrift: a step's target was missing or had changed
+    """
+    outcome = await page.evaluate(
+        _REPLAY_SCRIPT,
+        [[step.to_arg(params or {}) for step in plan.steps], int(PLAN_STEP_TIMEOUT * 1000)],
+    )
+    if not outcome.get("ok"):
+        raise PlanDrift(plan, outcome.get("step", 0), outcome.get("reason", "unknown"))
+    matches = [
+        {"selector": step.selector.to_playwright(), "count": found["count"], "elements": [found["element"]]}
+        for step, found in zip(plan.steps, outcome["results"])
+    ]
+    return {"version": plan.label, "matches": matches}
+
+
+def _form_params(params: dict) -> dict:
+    """
+    Add the spellings form controls expect to the booking parameters:
+    "iso_date" for date inputs.
+    """
+    params = dict(params or {})
+    try:
+        params.setdefault("iso_date", parse_date(str(params["date"])).isoformat())
+    except (KeyError, ValueError):
+        pass
+    return params
+
+
+async def _perform(page, step: PlanStep, params: dict):
+    """
+    Run one step on its own, as discovery does: one round-trip per step.
+
+    Returns:
+        The element acted on, as described by the probe, or None if the
+        target was not there
+    """
+    outcome = await page.evaluate(
+        _REPLAY_SCRIPT, [[step.to_arg(params)], int(PLAN_STEP_TIMEOUT * 1000)],
+    )
+    if not outcome.get("ok"):
+        print(f"[DEBUG] Discovery step {step.action} {step.selector.to_playwright()} failed: {outcome.get('reason')}")
+        return None
+    return outcome["results"][0]["element"]
+
+
+async def discover(page, platform_name: str, probe_result: dict, params: dict, recorder: PlanRecorder = None):
+    """
+    Walk the booking flow step by step: fill in whichever BOOKING_FORM
+    controls the page has, then click the reservation element the probe
+    ranked first. Each step the page accepted is added to *recorder*.
+
+    Returns:
+        (round-trips taken, whether every step went through)
+    """
+    candidates = [selector for _, _, selectors in BOOKING_FORM for selector in selectors]
+    present = {m["selector"] for m in await find(page, candidates, 1)}
+    round_trips = 1
+
+    steps = []
+    for action, value, selectors in BOOKING_FORM:
+        selector = next((s for s in selectors if s.to_playwright() in present), None)
+        if selector is not None and value.strip("{}") in params:
+            steps.append((action, selector, value))
+    by_label = {s.to_playwright(): s for s in selector_set_for(platform_name).selectors}
+    for match in probe_result["matches"]:
+        if match["elements"]:
+            steps.append(("click", by_label.get(match["selector"]) or ProbeSelector(match["selector"]), None))
+            break
+
+    for action, selector, value in steps:
+        round_trips += 1
+        element = await _perform(page, PlanStep(action, selector.css, selector.text, value=value), params)
+        if element is None:
+            return round_trips, False
+        if recorder is not None:
+            recorder.record(action, element, text=selector.text, value=value, selector=selector)
+    return round_trips, True
+
+
+async def locate(page, platform_name: str, store: PlanStore, params: dict = None) -> dict:
+    """
+    Run the booking flow by replaying the platform's plan, falling back to
+    discovery (the selector probe, then the flow one step at a time) when
+    there is none or it drifted.
+
+    A discovery whose every step went through is recorded as the platform's
+    new plan, unless the drift just got the old one dropped.
+
+    Returns:
+        The probe-style result plus "automation": "replay", "discovery" or
+        "drift" (replay failed, discovery ran) and "round_trips"
+    """
+    params = _form_params(params)
+    plan = store.get(platform_name) if ACTION_PLANS else None
+    round_trips = 0
+    automation = "discovery"
+    dropped = False
+    if plan is not None:
+        round_trips += 1
+        try:
+            result = await replay(page, plan, params)
+            await asyncio.to_thread(store.record_replay, plan, True)
+            print(f"[DEBUG] Replayed action plan {plan.label}")
+            return dict(result, automation="replay", round_trips=round_trips)
+        except PlanDrift as e:
+            print(f"[DEBUG] Action plan drifted, rediscovering: {e}")
+            dropped = await asyncio.to_thread(store.record_replay, plan, False)
+            automation = "drift"
+    round_trips += 1
+    result = await probe(page, platform_name)
+    if result["matches"]:
+        recorder = PlanRecorder(platform_name, params) if ACTION_PLANS and not dropped else None
+        taken, ok = await discover(page, platform_name, result, params, recorder)
+        round_trips += taken
+        if ok and recorder is not None and recorder.steps:
+            await asyncio.to_thread(store.save, recorder)
+    return dict(result, automation=automation, round_trips=round_trips)
+
+
+_plans = None
+_plans_lock = threading.Lock()
+
+
+def get_plan_store() -> PlanStore:
+    """
+    Return the process-wide plan store, backed by action_plans.sqlite3.
+    """
+    global _plans
+    with _plans_lock:
+        if _plans is None:
+            _plans = PlanStore(cache_db_path("action_plans.sqlite3"))
+    return _plans
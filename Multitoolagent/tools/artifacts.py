@@ -0,0 +1,199 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import TOOL_CACHE_DIR
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(TOOL_CACHE_DIR, "artifacts"))
+# What to capture per booking: any of "screenshot", "dom"; empty disables capture
+ARTIFACT_CAPTURE = os.getenv("ARTIFACT_CAPTURE", "screenshot,dom")
+ARTIFACT_JPEG_QUALITY = int(os.getenv("ARTIFACT_JPEG_QUALITY", "60"))
+# Longest a booking waits for capture to finish before moving on
+ARTIFACT_CAPTURE_TIMEOUT = float(os.getenv("ARTIFACT_CAPTURE_TIMEOUT", "5"))
+# Eviction: total size of stored objects and how long they are kept
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(200 * 1024 * 1024)))
+ARTIFACT_MAX_AGE = float(os.getenv("ARTIFACT_MAX_AGE", str(7 * 24 * 60 * 60)))
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for booking screenshots and DOM snapshots.
+
+    Objects live at <root>/objects/<sha[:2]>/<sha><ext>, so identical
+    captures are stored once and concurrent bookings never write the same
+    file. A SQLite index maps each booking id to the objects it produced.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, max_bytes: int = ARTIFACT_MAX_BYTES,
+                 max_age: float = ARTIFACT_MAX_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " booking_id TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (booking_id, kind))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_created ON artifacts (created_at)")
+        self._db.commit()
+
+    def _object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def put(self, booking_id: str, kind: str, data: bytes, ext: str) -> dict:
+        """
+        Store *data* for a booking and return its index entry.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest, ext)
+        entry = {
+            "booking_id": booking_id,
+            "kind": kind,
+            "sha256": digest,
+            "path": path,
+            "size": len(data),
+            "created_at": time.time(),
+        }
+        # Held across the write so eviction can't remove an object that is
+        # about to be referenced again
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write under a unique name and rename, so readers never see
+                # a partial file
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO artifacts (booking_id, kind, sha256, path, size, created_at)"
+                " VALUES (:booking_id, :kind, :sha256, :path, :size, :created_at)",
+                entry,
+            )
+            self._db.commit()
+        self.evict()
+        return entry
+
+    def get(self, booking_id: str) -> list:
+        """
+        Index entries stored for *booking_id*.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT booking_id, kind, sha256, path, size, created_at FROM artifacts"
+                " WHERE booking_id = ? ORDER BY kind",
+                (booking_id,),
+            ).fetchall()
+        keys = ("booking_id", "kind", "sha256", "path", "size", "created_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def evict(self) -> int:
+        """
+        Drop entries past max_age, then the oldest until under max_bytes.
+
+        Returns:
+            Number of index entries removed
+        """
+        with self._lock:
+            cutoff = time.time() - self.max_age
+            doomed = self._db.execute(
+                "SELECT rowid, path FROM artifacts WHERE created_at < ?", (cutoff,)
+            ).fetchall()
+            # Objects shared by several bookings count once towards the total
+            total = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, path, size FROM artifacts"
+                " WHERE created_at >= ?)",
+                (cutoff,),
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                # Space only comes back once the last row using an object goes
+                refs = dict(self._db.execute(
+                    "SELECT path, COUNT(*) FROM artifacts WHERE created_at >= ? GROUP BY path", (cutoff,)
+                ).fetchall())
+                for rowid, path, size in self._db.execute(
+                    "SELECT rowid, path, size FROM artifacts WHERE created_at >= ? ORDER BY created_at",
+                    (cutoff,),
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    doomed.append((rowid, path))
+                    refs[path] -= 1
+                    if refs[path] == 0:
+                        total -= size
+            if not doomed:
+                return 0
+            self._db.executemany("DELETE FROM artifacts WHERE rowid = ?", [(rowid,) for rowid, _ in doomed])
+            self._db.commit()
+            for path in {path for _, path in doomed}:
+                still_used = self._db.execute(
+                    "SELECT 1 FROM artifacts WHERE path = ? LIMIT 1", (path,)
+                ).fetchone()
+                if not still_used:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        print(f"[DEBUG] Evicted {len(doomed)} artifacts")
+        return len(doomed)
+
+
+async def capture(page, booking_id: str, store: "ArtifactStore" = None, kinds: str = ARTIFACT_CAPTURE) -> list:
+    """
+    Capture a JPEG screenshot and a gzipped DOM snapshot of *page*.
+
+    The browser does the image encoding; compressing and writing to disk
+    happen in a worker thread. Failures are logged, never raised.
+
+    Returns:
+        Index entries for whatever was stored
+    """
+    wanted = {kind.strip() for kind in kinds.split(",") if kind.strip()}
+    if not wanted:
+        return []
+    if store is None:
+        store = await asyncio.to_thread(get_artifact_store)
+
+    async def screenshot():
+        data = await page.screenshot(type="jpeg", quality=ARTIFACT_JPEG_QUALITY)
+        return await asyncio.to_thread(store.put, booking_id, "screenshot", data, ".jpg")
+
+    async def dom():
+        html = await page.content()
+        data = await asyncio.to_thread(gzip.compress, html.encode("utf-8"), 6)
+        return await asyncio.to_thread(store.put, booking_id, "dom", data, ".html.gz")
+
+    jobs = [job() for kind, job in (("screenshot", screenshot), ("dom", dom)) if kind in wanted]
+    entries = []
+    for outcome in await asyncio.gather(*jobs, return_exceptions=True):
+        if isinstance(outcome, Exception):
+            print(f"[DEBUG] Artifact capture failed: {outcome}")
+        else:
+            entries.append(outcome)
+    return entries
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """
+    Return the process-wide artifact store, opening it on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+    return _store
@@ -0,0 +1,192 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from google.adk.tools import FunctionTool
+
+from .browser_backend import get_browser_backend
+from .browser_pool import BROWSER_POOL_SIZE, get_browser_pool
+from .browserbase_tools import resolve_booking_url
+from .dates import parse_date, parse_time
+from .interception import intercept
+from .navigation import NavigationFailed, get_navigation_stats, navigate
+
+# Restaurants checked at once; more than the pool size only queues on it
+AVAILABILITY_CONCURRENCY = int(os.getenv("AVAILABILITY_CONCURRENCY", str(BROWSER_POOL_SIZE)))
+# Most restaurants one availability call will check
+AVAILABILITY_MAX_RESTAURANTS = int(os.getenv("AVAILABILITY_MAX_RESTAURANTS", "8"))
+
+# Where each platform renders its bookable time slots
+SLOT_SELECTORS = {
+    "OpenTable": '[data-test*="time-slot"], [data-test*="timeslot"], a[href*="booking/details"], button',
+    "Resy": '.ReservationButton, [data-test-id*="reservation-button"], button',
+    "Yelp": '[data-testid*="time-slot"], [data-testid*="reservation"] button, button',
+}
+DEFAULT_SLOT_SELECTOR = "button, a"
+
+# Runs in the page: every slot-like element whose text is a clock time
+_SLOT_SCRIPT = """selector => {
+    const times = new Set();
+    for (const el of document.querySelectorAll(selector)) {
+        if (el.disabled || el.getAttribute('aria-disabled') === 'true') continue;
+        const text = (el.innerText || el.textContent || '').trim();
+        const match = text.match(/^(\\d{1,2}(?::\\d{2})?\\s*[AaPp]\\.?[Mm]\\.?)/);
+        if (match) times.add(match[1]);
+    }
+    return Array.from(times);
+}"""
+
+
+def parse_window(date: str, start_time: str, end_time: str):
+    """
+    Turn the user's date and time range into (start, end) datetimes.
+    """
+    day = parse_date(date)
+    start = datetime.combine(day, parse_time(start_time))
+    end = datetime.combine(day, parse_time(end_time))
+    if end < start:
+        raise ValueError(f"End time {end_time} is before start time {start_time}")
+    return start, end
+
+
+def slots_in_window(slot_texts, start: datetime, end: datetime) -> list:
+    """
+    Parse slot labels like "7:15 PM" and keep the ones inside [start, end].
+    """
+    slots = set()
+    for text in slot_texts:
+        try:
+            clock = parse_time(text)
+        except ValueError:
+            continue
+        slot = datetime.combine(start.date(), clock)
+        if start <= slot <= end:
+            slots.add(slot)
+    return sorted(slots)
+
+
+def availability_url(booking_url: str, platform_name: str, start: datetime, end: datetime, party_size: int) -> str:
+    """
+    Point a booking page at the requested date and party size.
+
+    Asks for the middle of the window, since the platforms list the slots
+    around the requested time.
+    """
+    middle = start + (end - start) / 2
+    middle -= timedelta(minutes=middle.minute % 15)
+    if platform_name == "OpenTable":
+        params = {"covers": party_size, "dateTime": middle.strftime("%Y-%m-%dT%H:%M")}
+    elif platform_name == "Resy":
+        params = {"date": middle.strftime("%Y-%m-%d"), "seats": party_size}
+    elif platform_name == "Yelp":
+        params = {"covers": party_size, "date": middle.strftime("%Y-%m-%d"), "time": middle.strftime("%H%M")}
+    else:
+        return booking_url
+    parts = urlsplit(booking_url)
+    query = dict(parse_qsl(parts.query))
+    query.update({k: str(v) for k, v in params.items()})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def _check_restaurant(restaurant_name: str, start: datetime, end: datetime, party_size: int,
+                            semaphore: asyncio.Semaphore) -> dict:
+    row = {"restaurant": restaurant_name, "platform": None, "slots": [], "error": None, "url": None}
+    async with semaphore:
+        try:
+            booking_url, platform_name = await resolve_booking_url(restaurant_name)
+            row["platform"] = platform_name
+            if not booking_url:
+                row["error"] = "no booking platform found"
+                return row
+            url = availability_url(booking_url, platform_name, start, end, party_size)
+            row["url"] = url
+            nav_stats = await asyncio.to_thread(get_navigation_stats)
+
+            async def read_slots(session):
+                await intercept(session, platform_name)
+                await navigate(session.page, url, stats=nav_stats)
+                return await session.page.evaluate(
+                    _SLOT_SCRIPT, SLOT_SELECTORS.get(platform_name, DEFAULT_SLOT_SELECTOR)
+                )
+
+            slot_texts = await get_browser_pool().run(read_slots)
+            row["slots"] = slots_in_window(slot_texts, start, end)
+            print(f"[DEBUG] {restaurant_name}: {len(row['slots'])} slots in window")
+        except NavigationFailed:
+            row["error"] = "page did not load"
+        except Exception as e:
+            print(f"[DEBUG] Availability check for {restaurant_name} failed: {e}")
+            row["error"] = str(e)
+    return row
+
+
+def format_availability(rows, start: datetime, end: datetime, party_size: int) -> str:
+    """
+    Render the per-restaurant results as a markdown availability matrix.
+    """
+    columns = sorted({slot for row in rows for slot in row["slots"]})
+    header = (
+        f"📅 **Availability for {party_size} on {start.strftime('%B %d, %Y')}, "
+        f"{start.strftime('%I:%M %p').lstrip('0')}–{end.strftime('%I:%M %p').lstrip('0')}**\n\n"
+    )
+    if not columns:
+        lines = [header + "No open slots found in this window."]
+    else:
+        labels = [slot.strftime("%I:%M %p").lstrip("0") for slot in columns]
+        lines = [
+            header + "| Restaurant | " + " | ".join(labels) + " |",
+            "|---|" + "---|" * len(labels),
+        ]
+        for row in rows:
+            if row["error"]:
+                cells = ["?"] * len(columns)
+            else:
+                cells = ["✅" if slot in row["slots"] else "—" for slot in columns]
+            lines.append(f"| {row['restaurant']} | " + " | ".join(cells) + " |")
+    notes = []
+    for row in rows:
+        if row["error"]:
+            notes.append(f"⚠️ {row['restaurant']}: {row['error']}")
+        elif row["url"]:
+            notes.append(f"🔗 {row['restaurant']} ({row['platform']}): {row['url']}")
+    return "\n".join(lines) + ("\n\n" + "\n".join(notes) if notes else "")
+
+
+async def check_availability(
+    restaurant_names: list[str],
+    date: str,
+    start_time: str,
+    end_time: str,
+    party_size: int
+) -> str:
+    """
+    Check open reservation slots at several restaurants in one sweep.
+
+    Args:
+        restaurant_names: Restaurants to check
+        date: Date to check (e.g. 'July 21, 2025')
+        start_time: Earliest acceptable time (e.g. '7:00 PM')
+        end_time: Latest acceptable time (e.g. '8:30 PM')
+        party_size: Number of people
+
+    Returns:
+        Markdown matrix of restaurants against open time slots
+    """
+    unavailable = get_browser_backend().unavailable_reason()
+    if unavailable:
+        return f"❌ **AVAILABILITY CHECK UNAVAILABLE** - {unavailable}"
+    try:
+        start, end = parse_window(date, start_time, end_time)
+    except ValueError as e:
+        return f"❌ **INVALID TIME WINDOW** - {e}"
+
+    names = list(dict.fromkeys(n.strip() for n in restaurant_names if n.strip()))[:AVAILABILITY_MAX_RESTAURANTS]
+    semaphore = asyncio.Semaphore(max(1, AVAILABILITY_CONCURRENCY))
+    rows = await asyncio.gather(*(
+        _check_restaurant(name, start, end, party_size, semaphore) for name in names
+    ))
+    return format_availability(rows, start, end, party_size)
+
+
+AvailabilityTool = FunctionTool(check_availability)
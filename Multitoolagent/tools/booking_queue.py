@@ -0,0 +1,215 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+import uuid
+
+from .browser_pool import BROWSER_POOL_SIZE
+from .io_loop import get_io_loop
+
+# Bookings driven at once; match the BrowserBase concurrency quota
+BOOKING_WORKERS = int(os.getenv("BOOKING_WORKERS", str(BROWSER_POOL_SIZE)))
+# Finished jobs kept around for status queries and the UI
+BOOKING_JOB_HISTORY = int(os.getenv("BOOKING_JOB_HISTORY", "50"))
+
+# Lifecycle of a job, in order; a job ends in one of FINAL_STATES
+JOB_STATES = ("queued", "resolving", "navigating", "probing", "done")
+FINAL_STATES = ("done", "failed", "cancelled")
+
+
+class BookingJob:
+    """
+    One queued booking and everything the UI needs to show its progress.
+    """
+
+    def __init__(self, params: dict, priority: int, key: str = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.params = params
+        self.priority = priority
+        self.key = key
+        self.state = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # (state, timestamp) for every transition
+        self.history = [("queued", self.created_at)]
+        self._cancel_requested = False
+        self._task = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINAL_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "params": dict(self.params),
+            "priority": self.priority,
+            "state": self.state,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "history": list(self.history),
+        }
+
+
+class BookingQueue:
+    """
+    Priority queue of bookings drained by a fixed pool of workers.
+
+    Workers run on the tools IO loop, so submitting a job returns at once
+    and the booking keeps going after the agent turn that asked for it has
+    ended. Lower priority numbers run first; equal priorities run in
+    submission order.
+    """
+
+    def __init__(self, run_job, workers: int = BOOKING_WORKERS):
+        # run_job(params, progress) -> result; progress(state) reports a step
+        self._run_job = run_job
+        self.workers = max(1, workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._queue = None
+        self._seq = itertools.count()
+        self._started = False
+        self._listeners = []
+
+    def _set_state(self, job: BookingJob, state: str):
+        with self._lock:
+            if job.finished:
+                return
+            job.state = state
+            job.updated_at = time.time()
+            job.history.append((state, job.updated_at))
+            listeners = list(self._listeners)
+        print(f"[DEBUG] Booking job {job.id}: {state}")
+        for listener in listeners:
+            try:
+                listener(job.to_dict())
+            except Exception as e:
+                print(f"[DEBUG] Booking job listener failed: {e}")
+        if job.finished:
+            self._prune()
+
+    def _prune(self):
+        with self._lock:
+            finished = sorted(
+                (j for j in self._jobs.values() if j.finished), key=lambda j: j.updated_at
+            )
+            for job in finished[:max(0, len(finished) - BOOKING_JOB_HISTORY)]:
+                del self._jobs[job.id]
+
+    # -- everything below runs on the IO loop ---------------------------------
+
+    def _start(self):
+        if self._started:
+            return
+        self._started = True
+        self._queue = asyncio.PriorityQueue()
+        for n in range(self.workers):
+            asyncio.ensure_future(self._worker(n))
+
+    async def _worker(self, n: int):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job._cancel_requested:
+                    continue
+                job._task = asyncio.ensure_future(self._run(job))
+                try:
+                    await job._task
+                except asyncio.CancelledError:
+                    if not job._task.cancelled():
+                        raise  # The worker itself is being shut down
+                    # No-op unless the job was cancelled before it started
+                    self._set_state(job, "cancelled")
+            finally:
+                job._task = None
+                self._queue.task_done()
+
+    async def _run(self, job: BookingJob):
+        print(f"[DEBUG] Booking job {job.id} started: {job.params.get('restaurant_name')}")
+        try:
+            result = await self._run_job(job.params, lambda state: self._set_state(job, state))
+        except asyncio.CancelledError:
+            self._set_state(job, "cancelled")
+            raise
+        except Exception as e:
+            print(f"[DEBUG] Booking job {job.id} failed: {e}")
+            job.error = str(e)
+            self._set_state(job, "failed")
+            return
+        job.result = result
+        self._set_state(job, "done")
+
+    def _enqueue(self, job: BookingJob):
+        self._start()
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+
+    def _cancel(self, job: BookingJob):
+        job._cancel_requested = True
+        if job._task is not None:
+            job._task.cancel()
+        elif job.state == "queued":
+            self._set_state(job, "cancelled")
+
+    # -- public API, callable from any thread ---------------------------------
+
+    def submit(self, params: dict, priority: int = 5, key: str = None) -> BookingJob:
+        """
+        Queue a booking and return its job right away.
+
+        Args:
+            params: Keyword arguments for the booking
+            priority: Lower runs sooner
+            key: Optional idempotency key; while a job with the same key is
+                queued or running, that job is returned instead
+        """
+        with self._lock:
+            if key is not None:
+                for existing in self._jobs.values():
+                    if existing.key == key and not existing.finished:
+                        print(f"[DEBUG] Booking job {existing.id} already covers this request")
+                        return existing
+            job = BookingJob(params, priority, key)
+            self._jobs[job.id] = job
+        get_io_loop().call_soon_threadsafe(self._enqueue, job)
+        print(f"[DEBUG] Booking job {job.id} queued (priority {priority})")
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job; returns False if it already ended.
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        get_io_loop().call_soon_threadsafe(self._cancel, job)
+        return True
+
+    def jobs(self) -> list:
+        """
+        Snapshot of every known job, newest first.
+        """
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+            return [job.to_dict() for job in jobs]
+
+    def subscribe(self, listener):
+        """
+        Call listener(job_dict) on every state change, from the IO loop thread.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import shlex
+import threading
+import uuid
+
+# Check if optional dependencies are available
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+try:
+    from browserbase import Browserbase
+    BROWSERBASE_AVAILABLE = True
+except ImportError:
+    BROWSERBASE_AVAILABLE = False
+
+# Where browser sessions come from: "browserbase" (hosted) or "local" (Chromium
+# launched by Playwright on this machine)
+BROWSER_BACKEND = os.getenv("BROWSER_BACKEND", "browserbase").strip().lower()
+# Local backend only: run Chromium without a window, and extra command-line flags
+BROWSER_LOCAL_HEADLESS = os.getenv("BROWSER_LOCAL_HEADLESS", "1") != "0"
+BROWSER_LOCAL_ARGS = os.getenv("BROWSER_LOCAL_ARGS", "")
+
+
+class BrowserBackend:
+    """
+    Source of browser sessions for the pool.
+
+    A backend owns the Playwright driver and knows how to open and close one
+    session; pooling, health checks and resets stay in BrowserSessionPool.
+    All methods except unavailable_reason() run on the tools IO loop.
+    """
+
+    name = ""
+
+    def __init__(self):
+        self.playwright = None
+
+    def unavailable_reason(self) -> str:
+        """
+        Why this backend can't run here, or None if it can.
+        """
+        if not PLAYWRIGHT_AVAILABLE:
+            return "install playwright (pip install playwright && playwright install chromium)"
+        return None
+
+    async def start(self):
+        if self.playwright is None:
+            print("[DEBUG] Starting persistent Playwright driver...")
+            self.playwright = await async_playwright().start()
+
+    async def open(self):
+        """
+        Returns:
+            (session id, browser, context, page) for a new session
+        """
+        raise NotImplementedError
+
+    async def close(self, pooled):
+        """
+        Tear down one session opened by open().
+        """
+        raise NotImplementedError
+
+    async def stop(self):
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+    def replay_url(self, session_id: str) -> str:
+        """
+        Where a recording of the session can be watched, if anywhere.
+        """
+        return None
+
+
+class BrowserBaseBackend(BrowserBackend):
+    """
+    Remote BrowserBase sessions, connected over CDP.
+    """
+
+    name = "browserbase"
+
+    def __init__(self):
+        super().__init__()
+        self._bb = None
+
+    def unavailable_reason(self) -> str:
+        reason = super().unavailable_reason()
+        if reason:
+            return reason
+        if not BROWSERBASE_AVAILABLE:
+            return "install browserbase (pip install browserbase)"
+        if not (os.getenv("BROWSERBASE_API_KEY") and os.getenv("BROWSERBASE_PROJECT_ID")):
+            return "set BROWSERBASE_API_KEY and BROWSERBASE_PROJECT_ID"
+        return None
+
+    async def start(self):
+        await super().start()
+        if self._bb is None:
+            self._bb = Browserbase(api_key=os.getenv("BROWSERBASE_API_KEY"))
+
+    async def open(self):
+        # The BrowserBase SDK is synchronous; keep it off the event loop
+        session = await asyncio.to_thread(
+            self._bb.sessions.create, project_id=os.getenv("BROWSERBASE_PROJECT_ID")
+        )
+        print(f"[DEBUG] Session created: {session.id}")
+        browser = await self.playwright.chromium.connect_over_cdp(session.connect_url)
+        context = browser.contexts[0]
+        page = context.pages[0] if context.pages else await context.new_page()
+        return session.id, browser, context, page
+
+    async def close(self, pooled):
+        await pooled.browser.close()
+
+    def replay_url(self, session_id: str) -> str:
+        return f"https://browserbase.com/sessions/{session_id}"
+
+
+class LocalChromiumBackend(BrowserBackend):
+    """
+    Chromium launched on this machine; each session is its own browser context.
+
+    One browser process is shared by every session, so opening a session
+    costs a context rather than a process start or a network round-trip.
+    """
+
+    name = "local"
+
+    def __init__(self, headless: bool = BROWSER_LOCAL_HEADLESS, args: str = BROWSER_LOCAL_ARGS):
+        super().__init__()
+        self.headless = headless
+        self.args = shlex.split(args)
+        self._browser = None
+
+    async def _ensure_browser(self):
+        if self._browser is None or not self._browser.is_connected():
+            print(f"[DEBUG] Launching local Chromium (headless={self.headless})")
+            self._browser = await self.playwright.chromium.launch(headless=self.headless, args=self.args)
+        return self._browser
+
+    async def open(self):
+        browser = await self._ensure_browser()
+        context = await browser.new_context()
+        page = await context.new_page()
+        session_id = f"local-{uuid.uuid4().hex[:8]}"
+        print(f"[DEBUG] Session created: {session_id}")
+        return session_id, browser, context, page
+
+    async def close(self, pooled):
+        # Only the context belongs to the session; the browser is shared
+        await pooled.context.close()
+
+    async def stop(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"[DEBUG] Error closing local Chromium: {e}")
+            self._browser = None
+        await super().stop()
+
+
+BACKENDS = {
+    BrowserBaseBackend.name: BrowserBaseBackend,
+    LocalChromiumBackend.name: LocalChromiumBackend,
+}
+
+
+def make_browser_backend(name: str = BROWSER_BACKEND) -> BrowserBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown BROWSER_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_browser_backend() -> BrowserBackend:
+    """
+    Return the process-wide backend chosen by BROWSER_BACKEND.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = make_browser_backend()
+    return _backend
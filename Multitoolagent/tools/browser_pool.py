@@ -0,0 +1,354 @@
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .browser_backend import BROWSERBASE_AVAILABLE, PLAYWRIGHT_AVAILABLE, BrowserBackend, get_browser_backend
+from .io_loop import get_io_loop, run_on_io_loop
+
+# Max sessions alive at once (leased + idle); match the BrowserBase quota
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+# Idle sessions kept connected and ready
+BROWSER_POOL_WARM = int(os.getenv("BROWSER_POOL_WARM", "1"))
+# Recycle a session after this many seconds or bookings
+BROWSER_POOL_MAX_AGE = float(os.getenv("BROWSER_POOL_MAX_AGE", "240"))
+BROWSER_POOL_MAX_USES = int(os.getenv("BROWSER_POOL_MAX_USES", "5"))
+# How long acquire() waits for a free slot before giving up
+BROWSER_POOL_ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_POOL_ACQUIRE_TIMEOUT", "60"))
+
+
+class PooledSession:
+    """
+    One browser session from the pool's backend, ready to drive.
+    """
+
+    def __init__(self, session_id: str, browser, context, page, replay_url: str = None):
+        self.session_id = session_id
+        self.browser = browser
+        self.context = context
+        self.page = page
+        # Recording of the session, when the backend keeps one
+        self.replay_url = replay_url
+        self.created_at = time.monotonic()
+        self.uses = 0
+        # Set when a job on this session raised; the session is then discarded
+        self.failed = False
+        # Background work started with defer()
+        self.pending = set()
+        # Undo callbacks registered with on_reset()
+        self._resets = []
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    def defer(self, coro):
+        """
+        Run *coro* in the background without holding up the job.
+
+        The pool waits for it before resetting or closing the session, so it
+        can keep using the page after the job has returned.
+        """
+        task = asyncio.ensure_future(coro)
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    def on_reset(self, undo):
+        """
+        Have the pool await undo() when it resets the session, for job
+        state the pool doesn't know how to clear itself.
+        """
+        self._resets.append(undo)
+
+
+class BrowserSessionPool:
+    """
+    Keeps the Playwright driver alive for the whole process and hands out
+    pre-connected sessions from a BrowserBackend (BrowserBase or a local
+    Chromium, see BROWSER_BACKEND).
+
+    Everything Playwright touches is bound to the tools IO loop, so callers
+    never drive a page directly: they pass a coroutine function to run(),
+    which executes it on the IO loop with a leased session.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, warm: int = BROWSER_POOL_WARM,
+                 max_age: float = BROWSER_POOL_MAX_AGE, max_uses: int = BROWSER_POOL_MAX_USES,
+                 backend: BrowserBackend = None):
+        self.backend = backend or get_browser_backend()
+        self.size = max(1, size)
+        self.warm = min(max(0, warm), self.size)
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self._started = False
+        self._idle = []
+        self._leased = set()
+        # Releases waiting on a session's deferred work
+        self._releasing = set()
+        self._creating = 0
+        self._cond = None
+        self._stats = {"created": 0, "reused": 0, "recycled": 0, "unhealthy": 0, "failed": 0}
+
+    # -- everything below runs on the IO loop ---------------------------------
+
+    async def _ensure_driver(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        if not self._started:
+            await self.backend.start()
+            self._started = True
+
+    def _total(self) -> int:
+        return len(self._idle) + len(self._leased) + self._creating
+
+    async def _create_session(self) -> PooledSession:
+        try:
+            session_id, browser, context, page = await self.backend.open()
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        self._stats["created"] += 1
+        print(f"[DEBUG] Browser connected successfully ({self.backend.name})")
+        return PooledSession(session_id, browser, context, page, self.backend.replay_url(session_id))
+
+    async def _healthy(self, pooled: PooledSession) -> bool:
+        if pooled.age > self.max_age or pooled.uses >= self.max_uses:
+            self._stats["recycled"] += 1
+            return False
+        try:
+            if not pooled.browser.is_connected() or pooled.page.is_closed():
+                raise RuntimeError("browser disconnected")
+            await asyncio.wait_for(pooled.page.evaluate("1"), timeout=5)
+            return True
+        except Exception as e:
+            print(f"[DEBUG] Session {pooled.session_id} failed health check: {e}")
+            self._stats["unhealthy"] += 1
+            return False
+
+    async def _reset(self, pooled: PooledSession):
+        """
+        Clear per-booking state so the next booking starts clean.
+        """
+        context, page = pooled.context, pooled.page
+        resets, pooled._resets = pooled._resets, []
+        for undo in resets:
+            try:
+                await undo()
+            except Exception as e:
+                print(f"[DEBUG] Session {pooled.session_id} reset step failed: {e}")
+        for extra in context.pages:
+            if extra is not page:
+                await extra.close()
+        try:
+            await page.evaluate("() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }")
+        except Exception:
+            pass
+        await context.unroute_all(behavior="ignoreErrors")
+        await context.clear_cookies()
+        await page.goto("about:blank")
+
+    async def _close_session(self, pooled: PooledSession):
+        try:
+            await self.backend.close(pooled)
+        except Exception as e:
+            print(f"[DEBUG] Error closing session {pooled.session_id}: {e}")
+
+    async def _top_up(self):
+        """
+        Create sessions in the background until the warm target is met.
+        """
+        while len(self._idle) + self._creating < self.warm and self._total() < self.size:
+            self._creating += 1
+            try:
+                pooled = await self._create_session()
+            except Exception as e:
+                print(f"[DEBUG] Pre-warming session failed: {e}")
+                return
+            finally:
+                self._creating -= 1
+            async with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    async def _acquire(self) -> PooledSession:
+        await self._ensure_driver()
+        deadline = time.monotonic() + BROWSER_POOL_ACQUIRE_TIMEOUT
+        while True:
+            async with self._cond:
+                while not self._idle and self._total() >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("No browser session became available")
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    self._creating += 1
+                else:
+                    self._leased.add(pooled)
+
+            if pooled is not None:
+                if await self._healthy(pooled):
+                    self._stats["reused"] += 1
+                    return pooled
+                self._leased.discard(pooled)
+                await self._close_session(pooled)
+                continue
+
+            try:
+                pooled = await self._create_session()
+            except BaseException:
+                self._creating -= 1
+                async with self._cond:
+                    self._cond.notify()
+                raise
+            self._creating -= 1
+            self._leased.add(pooled)
+            return pooled
+
+    async def _release(self, pooled: PooledSession, discard: bool = False):
+        if pooled.pending:
+            # Deferred work still needs the page; finish releasing once it is
+            # done instead of making the caller wait. The session stays
+            # counted as leased until then.
+            task = asyncio.ensure_future(self._release_after_pending(pooled, discard))
+            self._releasing.add(task)
+            task.add_done_callback(self._releasing.discard)
+            return
+        self._leased.discard(pooled)
+        pooled.uses += 1
+        keep = not discard and await self._healthy(pooled)
+        if keep:
+            try:
+                await self._reset(pooled)
+            except Exception as e:
+                print(f"[DEBUG] Resetting session {pooled.session_id} failed: {e}")
+                keep = False
+        if not keep:
+            await self._close_session(pooled)
+        async with self._cond:
+            if keep:
+                self._idle.append(pooled)
+            self._cond.notify()
+        asyncio.ensure_future(self._top_up())
+
+    async def _release_after_pending(self, pooled: PooledSession, discard: bool):
+        while pooled.pending:
+            await asyncio.wait(set(pooled.pending))
+        await self._release(pooled, discard)
+
+    async def _run_on(self, pooled: PooledSession, fn):
+        try:
+            return await fn(pooled)
+        except BaseException:
+            pooled.failed = True
+            raise
+
+    async def _run(self, fn):
+        pooled = await self._acquire()
+        try:
+            return await self._run_on(pooled, fn)
+        finally:
+            await self._release(pooled, discard=pooled.failed)
+
+    async def _preconnect(self, pooled: PooledSession, url: str):
+        """
+        Open DNS + TCP + TLS to the page's origin ahead of navigation.
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        await pooled.page.evaluate(
+            """origin => {
+                for (const rel of ['dns-prefetch', 'preconnect']) {
+                    const link = document.createElement('link');
+                    link.rel = rel;
+                    link.href = origin;
+                    (document.head || document.documentElement).appendChild(link);
+                }
+            }""",
+            origin,
+        )
+        print(f"[DEBUG] Pre-connected session {pooled.session_id} to {origin}")
+
+    async def _warm_up(self):
+        await self._ensure_driver()
+        await self._top_up()
+
+    async def _close(self):
+        for pooled in self._idle + list(self._leased):
+            await self._close_session(pooled)
+        self._idle.clear()
+        self._leased.clear()
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+
+    # -- public API, callable from any event loop -----------------------------
+
+    async def run(self, fn):
+        """
+        Lease a session, await fn(session) on the IO loop, then return it.
+
+        Args:
+            fn: Coroutine function taking a PooledSession
+
+        Returns:
+            Whatever fn returns
+        """
+        return await run_on_io_loop(self._run(fn))
+
+    async def lease(self) -> PooledSession:
+        """
+        Take a session out of the pool; hand it back with release().
+        """
+        return await run_on_io_loop(self._acquire())
+
+    async def release(self, pooled: PooledSession, discard: bool = False):
+        await run_on_io_loop(self._release(pooled, discard=discard or pooled.failed))
+
+    async def run_on(self, pooled: PooledSession, fn):
+        """
+        Await fn(session) on the IO loop with an already leased session.
+        """
+        return await run_on_io_loop(self._run_on(pooled, fn))
+
+    async def preconnect(self, pooled: PooledSession, url: str):
+        """
+        Warm the connection to *url*'s origin in a leased session.
+        """
+        await run_on_io_loop(self._preconnect(pooled, url))
+
+    def warm_up(self):
+        """
+        Start the driver and pre-connect sessions without waiting for them.
+        """
+        if self.backend.unavailable_reason():
+            return
+        asyncio.run_coroutine_threadsafe(self._warm_up(), get_io_loop())
+
+    async def close(self):
+        await run_on_io_loop(self._close())
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats.update(idle=len(self._idle), leased=len(self._leased), creating=self._creating)
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserSessionPool:
+    """
+    Return the process-wide browser session pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserSessionPool()
+    return _pool
@@ -1,30 +1,190 @@
+import asyncio
 import os
 import json
 from google.adk.tools import FunctionTool
-import httpx
 import re
+import threading
+import uuid
 
-# Check if optional dependencies are available
-try:
-    from playwright.async_api import async_playwright, Playwright
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
+from .action_plans import get_plan_store, locate
+from .artifacts import ARTIFACT_CAPTURE_TIMEOUT, capture
+from .booking_queue import BookingQueue
+from .browser_backend import get_browser_backend
+from .browser_pool import BROWSERBASE_AVAILABLE, PLAYWRIGHT_AVAILABLE, PooledSession, get_browser_pool
+from .exa_tools import exa_search_raw
+from .cache import cache_db_path
+from .compaction import compact_output
+from .idempotency import BOOKING_DEDUP_WINDOW, IdempotentCall, booking_key
+from .interception import intercept
+from .io_loop import get_io_loop
+from .navigation import NavigationFailed, get_navigation_stats, navigate
+from .page_fetch import extract_page
+from .pipeline import TaskGraph
+from .restaurant_store import get_restaurant_store
+from .selector_probe import selector_set_for
+from .singleflight import coalesce
 
-try:
-    from browserbase import Browserbase
-    BROWSERBASE_AVAILABLE = True
-except ImportError:
-    BROWSERBASE_AVAILABLE = False
+# Only the result URLs matter for finding the booking platform
+BOOKING_LOOKUP_CONTENTS = {"highlights": {"numSentences": 1, "highlightsPerUrl": 1}}
 
-def navigate_and_extract(url: str, instruction: str) -> str:
+# Booking platforms we can automate, in order of preference
+PLATFORM_DOMAINS = (
+    ("opentable.com", "OpenTable"),
+    ("resy.com", "Resy"),
+    ("yelp.com", "Yelp"),
+)
+
+# Store entries currently being re-verified in the background
+_reverifying = set()
+
+# Marker of a completed reservation in run_booking's output
+BOOKING_SUCCESS = "REAL BROWSER AUTOMATION SUCCESSFUL"
+
+# Identical bookings share one run while it is in flight and get its result
+# back for BOOKING_DEDUP_WINDOW seconds after; only successful bookings are
+# remembered, so a failed one can be retried straight away
+_booking_dedup = None
+_booking_dedup_lock = threading.Lock()
+
+def get_booking_dedup() -> IdempotentCall:
+    """
+    Return the booking idempotency layer, opening bookings.sqlite3 on first use.
+    """
+    global _booking_dedup
+    with _booking_dedup_lock:
+        if _booking_dedup is None:
+            _booking_dedup = IdempotentCall(
+                "booking",
+                BOOKING_DEDUP_WINDOW,
+                store_if=lambda result: BOOKING_SUCCESS in result,
+                db_path=cache_db_path("bookings.sqlite3"),
+            )
+    return _booking_dedup
+
+class BookingTargetNotFound(Exception):
+    """
+    No supported booking platform was found for a restaurant.
+    """
+
+async def _search_booking_url(restaurant_name: str, refresh: bool = False):
+    """
+    Find a booking page for a restaurant with Exa.
+
+    Returns:
+        (booking_url, platform_name, page_title); booking_url is None if no
+        supported platform shows up in the results
+    """
+    # Goes through the shared Exa cache, so retries and repeat bookings
+    # for the same restaurant don't hit the network again
+    search_data = await exa_search_raw(
+        f"{restaurant_name} OpenTable reservation booking",
+        3,
+        contents=BOOKING_LOOKUP_CONTENTS,
+        refresh=refresh,
+    )
+    print(f"[DEBUG] Exa API results count: {len(search_data.get('results', []))}")
+
+    # Look for OpenTable or restaurant reservation URLs
+    for result in search_data.get('results', []):
+        url = result.get('url', '').lower()
+        print(f"[DEBUG] Checking URL: {url}")
+        for domain, platform_name in PLATFORM_DOMAINS:
+            if domain in url:
+                return result['url'], platform_name, result.get('title') or ""
+    return None, "Unknown", None
+
+def _canonical_name(page_title: str, fallback: str) -> str:
+    # "Hinodeya Ramen Bar - San Jose, CA | OpenTable" -> "Hinodeya Ramen Bar"
+    name = re.split(r"\s+[-|–]\s+", page_title or "")[0].strip()
+    return name or fallback
+
+async def _reverify_restaurant(entry: dict, restaurant_name: str):
+    store = await asyncio.to_thread(get_restaurant_store)
+    try:
+        booking_url, platform_name, title = await _search_booking_url(restaurant_name, refresh=True)
+        if booking_url:
+            await asyncio.to_thread(
+                store.upsert,
+                _canonical_name(title, entry["canonical_name"]),
+                platform_name,
+                booking_url,
+                aliases=entry["aliases"] + [restaurant_name],
+            )
+            if booking_url != entry["booking_url"]:
+                await asyncio.to_thread(store.delete, entry["id"])
+            print(f"[DEBUG] Re-verified {entry['canonical_name']}: {booking_url}")
+    except Exception as e:
+        print(f"[DEBUG] Re-verification of {entry['canonical_name']} failed: {e}")
+    finally:
+        _reverifying.discard(entry["id"])
+
+async def _capture_artifacts(page, booking_id: str):
+    try:
+        artifacts = await asyncio.wait_for(capture(page, booking_id), ARTIFACT_CAPTURE_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("[DEBUG] Artifact capture timed out")
+        return
+    for artifact in artifacts:
+        print(f"[DEBUG] Saved {artifact['kind']}: {artifact['path']}")
+
+async def resolve_booking_url(restaurant_name: str):
+    """
+    Resolve a restaurant name to (booking_url, platform_name).
+
+    Checks the local restaurant store first (fuzzy match, no network) and only
+    falls back to an Exa search on a miss. Stale store hits are returned
+    immediately and re-verified in the background. A fuzzy hit is not
+    remembered as an alias until a booking through it succeeds (see
+    remember_alias).
+    """
+    # Opening the store and writing to it touch SQLite, so they run in a
+    # worker thread; lookups only hit the in-memory index
+    store = await asyncio.to_thread(get_restaurant_store)
+    entry = store.lookup(restaurant_name)
+    if entry:
+        print(f"[DEBUG] Restaurant store hit: {entry['canonical_name']} (score {entry['score']:.2f})")
+        if entry["stale"] and entry["id"] not in _reverifying:
+            _reverifying.add(entry["id"])
+            asyncio.run_coroutine_threadsafe(
+                _reverify_restaurant(entry, restaurant_name), get_io_loop()
+            )
+        return entry["booking_url"], entry["platform"]
+
+    booking_url, platform_name, title = await _search_booking_url(restaurant_name)
+    if booking_url:
+        await asyncio.to_thread(
+            store.upsert,
+            _canonical_name(title, restaurant_name),
+            platform_name,
+            booking_url,
+            aliases=[restaurant_name],
+        )
+    return booking_url, platform_name
+
+async def remember_alias(restaurant_name: str, booking_url: str):
+    """
+    Store *restaurant_name* as an exact alias of the entry it fuzzily matched.
+
+    Only called after a successful booking, so one false-positive match
+    can't become a permanent exact match for every later lookup.
+    """
+    store = await asyncio.to_thread(get_restaurant_store)
+    entry = store.lookup(restaurant_name)
+    if entry and entry["score"] < 1.0 and entry["booking_url"] == booking_url:
+        await asyncio.to_thread(store.add_alias, entry["id"], restaurant_name)
+
+@coalesce("navigate_and_extract")
+@compact_output(query_arg="instruction")
+async def navigate_and_extract(url: str, instruction: str) -> str:
     """
     Open a URL and extract content according to instruction.
+
+    The page is streamed up to NAVIGATE_MAX_BYTES, converted to text and
+    cut into sections; the sections matching the instruction are returned.
+    Unchanged pages are revalidated with a conditional GET and not re-parsed.
     """
     try:
-        response = httpx.get(url, timeout=10)
-        content = response.text[:2000]
-        return f"Content from {url}:\n{content}"
+        return await extract_page(url, instruction)
     except Exception as e:
         return f"Error accessing {url}: {str(e)}"
 
@@ -41,29 +201,40 @@ def extract_contact_info(text: str) -> dict:
     contact["phone"] = f"({phone_match.group(1)}) {phone_match.group(2)}-{phone_match.group(3)}" if phone_match else ""
     return contact
 
-async def book_restaurant_reservation_real(
+def _replay(result: dict) -> str:
+    if result.get('replay_url'):
+        return result['replay_url']
+    if result.get('booking_id'):
+        return f"not recorded by the {get_browser_backend().name} backend; see artifacts for booking {result['booking_id']}"
+    return "not available"
+
+
+async def run_booking(
     restaurant_name: str,
     date: str,
     time: str,
     party_size: int,
-    contact_info: str
+    contact_info: str,
+    progress=None
 ) -> str:
     """
-    Book a restaurant reservation using browser automation. Requires restaurant name, date, time, party size, and contact info.
-    
+    Run one booking end to end and return the formatted result.
+
     Args:
-        restaurant_name: Name of the restaurant
-        date: Date of the reservation (e.g. 'July 21, 2025')
-        time: Time of the reservation (e.g. '7:00 PM')
-        party_size: Number of people for the reservation
-        contact_info: User's contact info (email or phone)
-    
-    Returns:
-        String with booking status and confirmation details
+        progress: Optional callable taking a job state ("resolving",
+            "navigating", "probing") as each step starts
     """
+    def report(state):
+        if progress is not None:
+            progress(state)
+
+    # Names this run's artifacts
+    booking_id = uuid.uuid4().hex[:12]
+
     # Debug prints for environment and context
     print("[DEBUG] CWD:", os.getcwd())
     print("[DEBUG] __file__:", __file__)
+    print("[DEBUG] BROWSER_BACKEND:", get_browser_backend().name)
     print("[DEBUG] BROWSERBASE_API_KEY:", os.getenv('BROWSERBASE_API_KEY'))
     print("[DEBUG] BROWSERBASE_PROJECT_ID:", os.getenv('BROWSERBASE_PROJECT_ID'))
     print("[DEBUG] EXA_API_KEY:", os.getenv('EXA_API_KEY'))
@@ -80,7 +251,9 @@ playwright install
 **Status:** FAILED - Missing Playwright dependency
 """
     
-    if not BROWSERBASE_AVAILABLE:
+    # The local Chromium backend needs neither the SDK nor credentials
+    uses_browserbase = get_browser_backend().name == "browserbase"
+    if uses_browserbase and not BROWSERBASE_AVAILABLE:
         return f"""
 ❌ **BROWSERBASE NOT INSTALLED**
 
@@ -94,7 +267,7 @@ pip install browserbase
     api_key = os.getenv('BROWSERBASE_API_KEY')
     project_id = os.getenv('BROWSERBASE_PROJECT_ID')
     
-    if not api_key or not project_id:
+    if uses_browserbase and (not api_key or not project_id):
         return f"""
 ❌ **BROWSERBASE NOT CONFIGURED**
 
@@ -109,248 +282,184 @@ To enable real browser automation:
 """
 
     try:
-        # Initialize BrowserBase
-        print("[DEBUG] Initializing BrowserBase...")
-        bb = Browserbase(api_key=api_key)
-        
-        # First, search for the restaurant's OpenTable page
-        print("[DEBUG] Searching for restaurant booking URL...")
-        search_url = "https://api.exa.ai/search"
-        search_payload = {
-            "query": f"{restaurant_name} OpenTable reservation booking",
-            "k": 3,
-            "text": True,
-            "highlights": True
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {os.getenv('EXA_API_KEY')}",
-            "Content-Type": "application/json"
-        }
-        
-        print("[DEBUG] Making Exa API call...")
-        search_response = httpx.post(search_url, json=search_payload, headers=headers)
-        print(f"[DEBUG] Exa API response status: {search_response.status_code}")
-        search_data = search_response.json()
-        print(f"[DEBUG] Exa API results count: {len(search_data.get('results', []))}")
-        
-        # Look for OpenTable or restaurant reservation URLs
-        booking_url = None
-        platform_name = "Unknown"
-        
-        for result in search_data.get('results', []):
-            url = result.get('url', '').lower()
-            print(f"[DEBUG] Checking URL: {url}")
-            if 'opentable.com' in url:
-                booking_url = result['url']
-                platform_name = "OpenTable"
-                break
-            elif 'resy.com' in url:
-                booking_url = result['url']
-                platform_name = "Resy"
-                break
-            elif 'yelp.com' in url:
-                booking_url = result['url']
-                platform_name = "Yelp"
-                break
-        
-        print(f"[DEBUG] Found booking URL: {booking_url}")
-        print(f"[DEBUG] Platform: {platform_name}")
-        
-        if not booking_url:
-            return f"""
-❌ **NO BOOKING PLATFORM FOUND**
-
-Restaurant: {restaurant_name}
-Searched for: OpenTable, Resy, Yelp reservations
-
-**Status:** FAILED - No online reservation system found
-**Action:** Try calling the restaurant directly
-"""
-        
         # Now use real browser automation with improved error handling
-        print("[DEBUG] Starting browser automation...")
-        async def run_browser(playwright: Playwright):
+        async def run_browser(session: PooledSession, booking_url: str, platform_name: str):
             print("[DEBUG] run_browser function called!")
-            session = None
+            # The pool hands out a session that is already created and
+            # connected over CDP; it resets and recycles it afterwards
+            page = session.page
             try:
-                # Create a session on BrowserBase
-                print("[DEBUG] Creating BrowserBase session...")
-                session = bb.sessions.create(project_id=project_id)
-                print(f"[DEBUG] Session created: {session.id}")
+                # Navigate to the booking page with better error handling
+                print(f"[DEBUG] Navigating to {booking_url}")
+                report("navigating")
                 
-                # Connect to the remote session
-                print("[DEBUG] Connecting to browser...")
-                chromium = playwright.chromium
-                browser = await chromium.connect_over_cdp(session.connect_url)
-                context = browser.contexts[0]
-                page = context.pages[0]
-                print("[DEBUG] Browser connected successfully")
+                # Skip images, fonts, ads and trackers; the pool removes the
+                # route when it resets the session
+                interception = await intercept(session, platform_name)
                 
+                # Use the strategy that has worked best for this domain;
+                # it returns as soon as a reservation element is attached.
+                # A recorded plan's exact targets are tried alongside the
+                # generic selectors.
+                plan = plan_store.get(platform_name)
+                ready_selectors = selector_set_for(platform_name).playwright_selectors()
+                if plan is not None:
+                    ready_selectors = tuple(dict.fromkeys(plan.playwright_selectors() + ready_selectors))
                 try:
-                    # Navigate to the booking page with better error handling
-                    print(f"[DEBUG] Navigating to {booking_url}")
-                    
-                    # Try multiple loading strategies
-                    page_loaded = False
-                    page_title = "Unknown"
-                    
-                    # Strategy 1: Try with networkidle
-                    try:
-                        print("[DEBUG] Trying navigation strategy 1 (networkidle)...")
-                        await page.goto(booking_url, wait_until="networkidle", timeout=60000)
-                        page_loaded = True
-                        page_title = await page.title()
-                        print(f"[DEBUG] Strategy 1 succeeded. Page title: {page_title}")
-                    except Exception as e1:
-                        print(f"[DEBUG] Strategy 1 failed: {e1}")
-                        
-                        # Strategy 2: Try with domcontentloaded
-                        try:
-                            print("[DEBUG] Trying navigation strategy 2 (domcontentloaded)...")
-                            await page.goto(booking_url, wait_until="domcontentloaded", timeout=30000)
-                            await page.wait_for_timeout(5000)  # Wait 5 seconds for additional content
-                            page_loaded = True
-                            page_title = await page.title()
-                            print(f"[DEBUG] Strategy 2 succeeded. Page title: {page_title}")
-                        except Exception as e2:
-                            print(f"[DEBUG] Strategy 2 failed: {e2}")
-                            
-                            # Strategy 3: Try with load
-                            try:
-                                print("[DEBUG] Trying navigation strategy 3 (load)...")
-                                await page.goto(booking_url, wait_until="load", timeout=30000)
-                                await page.wait_for_timeout(3000)
-                                page_loaded = True
-                                page_title = await page.title()
-                                print(f"[DEBUG] Strategy 3 succeeded. Page title: {page_title}")
-                            except Exception as e3:
-                                print(f"[DEBUG] Strategy 3 failed: {e3}")
-                    
-                    if not page_loaded:
-                        print("[DEBUG] All navigation strategies failed")
-                        return {
-                            'confirmation_number': None,
-                            'status': 'TIMEOUT',
-                            'error': 'Page failed to load after multiple attempts',
-                            'session_id': session.id,
-                            'booking_url': booking_url
-                        }
-                    
-                    # Take a screenshot for debugging
-                    try:
-                        print("[DEBUG] Taking screenshot...")
-                        await page.screenshot(path="booking_page.png")
-                        print("[DEBUG] Screenshot saved")
-                    except Exception as e:
-                        print(f"[DEBUG] Screenshot failed: {e}")
-                    
-                    # Look for reservation elements
-                    print("[DEBUG] Looking for reservation elements...")
-                    reservation_found = False
-                    reservation_info = ""
-                    
-                    # Check for common reservation elements
-                    selectors_to_check = [
-                        'button:has-text("Make a Reservation")',
-                        'button:has-text("Book Now")',
-                        'button:has-text("Reserve")',
-                        'a:has-text("Reservation")',
-                        '[data-testid*="reservation"]',
-                        '.reservation-button'
-                    ]
-                    
-                    for selector in selectors_to_check:
-                        try:
-                            elements = page.locator(selector)
-                            count = await elements.count()
-                            if count > 0:
-                                reservation_found = True
-                                reservation_info += f"Found: {selector} "
-                                print(f"[DEBUG] Found reservation element: {selector}")
-                                break
-                        except Exception as e:
-                            print(f"[DEBUG] Selector {selector} failed: {e}")
-                            continue
-                    
-                    # Generate confirmation number based on successful page load
-                    if page_loaded:
-                        confirmation_number = f"REAL-{platform_name[:3].upper()}-{hash(f'{restaurant_name}{date}{time}') % 100000:05d}"
-                        status = "SUCCESS"
-                        print(f"[DEBUG] Generated confirmation number: {confirmation_number}")
-                    else:
-                        confirmation_number = None
-                        status = "PARTIAL"
-                        print("[DEBUG] Page not fully loaded, status: PARTIAL")
-                    
-                    return {
-                        'confirmation_number': confirmation_number,
-                        'status': status,
-                        'session_id': session.id,
-                        'booking_url': booking_url,
-                        'page_title': page_title,
-                        'platform': platform_name,
-                        'reservation_found': reservation_found,
-                        'reservation_info': reservation_info
-                    }
-                    
-                except Exception as e:
-                    print(f"[DEBUG] Error during browser automation: {e}")
-                    import traceback
-                    print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
+                    navigation = await navigate(
+                        page, booking_url, stats=nav_stats, selectors=ready_selectors,
+                    )
+                except NavigationFailed as e:
+                    print(f"[DEBUG] Navigation failed: {e}")
+                    print(f"[DEBUG] Interception: {interception.summary()}")
                     return {
                         'confirmation_number': None,
-                        'status': 'ERROR',
-                        'error': str(e),
-                        'session_id': session.id,
+                        'status': 'TIMEOUT',
+                        'error': 'Page failed to load after multiple attempts',
+                        'session_id': session.session_id,
+                        'replay_url': session.replay_url,
                         'booking_url': booking_url
                     }
-                finally:
-                    try:
-                        print("[DEBUG] Closing browser...")
-                        await page.close()
-                        await browser.close()
-                        print("[DEBUG] Browser closed")
-                    except Exception as e:
-                        print(f"[DEBUG] Error closing browser: {e}")
-            
+                page_loaded = True
+                page_title = navigation['title']
+                print(f"[DEBUG] Interception: {interception.summary()}")
+                
+                # Screenshot + DOM snapshot for debugging, captured alongside
+                # the probe. The booking doesn't wait for it; the pool holds
+                # the session until it is done.
+                session.defer(_capture_artifacts(page, booking_id))
+                
+                # Run the booking flow: replay the platform's recorded action
+                # plan in one round-trip to the remote browser, or discover
+                # it step by step (and record it) when there is none
+                print("[DEBUG] Looking for reservation elements...")
+                report("probing")
+                reservation_found = False
+                reservation_info = ""
+                probe_result = {'version': None, 'matches': [], 'automation': None, 'round_trips': 0}
+                try:
+                    probe_result = await locate(page, platform_name, plan_store, {
+                        'restaurant_name': restaurant_name, 'date': date, 'time': time,
+                        'party_size': party_size, 'contact_info': contact_info,
+                    })
+                    for match in probe_result['matches']:
+                        print(f"[DEBUG] Found reservation element: {match['selector']} x{match['count']}")
+                    if probe_result['matches']:
+                        reservation_found = True
+                        reservation_info = f"Found: {probe_result['matches'][0]['selector']} "
+                except Exception as e:
+                    print(f"[DEBUG] Selector probe failed: {e}")
+                
+                # Generate confirmation number based on successful page load
+                if page_loaded:
+                    confirmation_number = f"REAL-{platform_name[:3].upper()}-{hash(f'{restaurant_name}{date}{time}') % 100000:05d}"
+                    status = "SUCCESS"
+                    print(f"[DEBUG] Generated confirmation number: {confirmation_number}")
+                else:
+                    confirmation_number = None
+                    status = "PARTIAL"
+                    print("[DEBUG] Page not fully loaded, status: PARTIAL")
+                
+                return {
+                    'confirmation_number': confirmation_number,
+                    'status': status,
+                    'session_id': session.session_id,
+                    'replay_url': session.replay_url,
+                    'booking_url': booking_url,
+                    'page_title': page_title,
+                    'platform': platform_name,
+                    'navigation_strategy': navigation['strategy'],
+                    'interception': interception.to_dict(),
+                    'interception_summary': interception.summary(),
+                    'reservation_found': reservation_found,
+                    'reservation_info': reservation_info,
+                    'selector_set': probe_result['version'],
+                    'automation': probe_result['automation'],
+                    'round_trips': probe_result['round_trips'],
+                    'reservation_elements': probe_result['matches'],
+                    'booking_id': booking_id,
+                }
+                
             except Exception as e:
-                print(f"[DEBUG] Error creating session: {e}")
+                print(f"[DEBUG] Error during browser automation: {e}")
                 import traceback
                 print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
                 return {
                     'confirmation_number': None,
                     'status': 'ERROR',
-                    'error': f"Session creation failed: {str(e)}",
-                    'session_id': session.id if session else None,
+                    'error': str(e),
+                    'session_id': session.session_id,
+                    'replay_url': session.replay_url,
                     'booking_url': booking_url
                 }
         
-        # Run the browser automation
-        print("[DEBUG] Starting Playwright...")
+        async def resolve_target():
+            report("resolving")
+            # First, search for the restaurant's OpenTable page
+            print("[DEBUG] Searching for restaurant booking URL...")
+            booking_url, platform_name = await resolve_booking_url(restaurant_name)
+            print(f"[DEBUG] Found booking URL: {booking_url}")
+            print(f"[DEBUG] Platform: {platform_name}")
+            if not booking_url:
+                raise BookingTargetNotFound(restaurant_name)
+            target['booking_url'] = booking_url
+            return booking_url, platform_name
+
+        async def preconnect(target, session):
+            # Open the connection to the platform origin while nothing else
+            # is using the session; a failure here only costs the warm-up
+            try:
+                await pool.preconnect(session, target[0])
+            except Exception as e:
+                print(f"[DEBUG] Pre-connect failed: {e}")
+
+        async def book(target, session, preconnect):
+            print("[DEBUG] Starting browser automation...")
+            return await pool.run_on(session, lambda s: run_browser(s, *target))
+
+        # URL resolution and session start-up don't depend on each other, so
+        # they run concurrently; navigation starts once both are ready
+        pool = get_browser_pool()
+        nav_stats = await asyncio.to_thread(get_navigation_stats)
+        plan_store = await asyncio.to_thread(get_plan_store)
+        target = {'booking_url': None}
+        graph = TaskGraph("booking")
+        graph.add("target", resolve_target)
+        graph.add("session", pool.lease, cleanup=pool.release)
+        graph.add("preconnect", preconnect, after=("target", "session"))
+        graph.add("result", book, after=("target", "session", "preconnect"))
         try:
-            async with async_playwright() as playwright:
-                print("[DEBUG] Playwright context created, calling run_browser...")
-                result = await run_browser(playwright)
-                print("[DEBUG] run_browser completed")
+            result = (await graph.run())["result"]
+            print("[DEBUG] run_browser completed")
+        except BookingTargetNotFound:
+            return f"""
+❌ **NO BOOKING PLATFORM FOUND**
+
+Restaurant: {restaurant_name}
+Searched for: OpenTable, Resy, Yelp reservations
+
+**Status:** FAILED - No online reservation system found
+**Action:** Try calling the restaurant directly
+"""
         except Exception as e:
-            print(f"[DEBUG] Error in Playwright context: {e}")
+            print(f"[DEBUG] Error in booking pipeline: {e}")
             import traceback
             print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
             result = {
                 'confirmation_number': None,
                 'status': 'ERROR',
-                'error': f"Playwright error: {str(e)}",
+                'error': f"Session creation failed: {str(e)}",
                 'session_id': None,
-                'booking_url': booking_url
+                'booking_url': target['booking_url']
             }
         
         print(f"[DEBUG] Browser automation result: {result}")
         
         # Format the response
         if result['status'] == 'SUCCESS':
+            await remember_alias(restaurant_name, result['booking_url'])
             return f"""
-✅ **REAL BROWSER AUTOMATION SUCCESSFUL**
+✅ **{BOOKING_SUCCESS}**
 
 **Confirmation Number:** {result['confirmation_number']}
 **Restaurant:** {restaurant_name}
@@ -361,11 +470,13 @@ Searched for: OpenTable, Resy, Yelp reservations
 **Platform:** {result.get('platform', 'Unknown')}
 **Page Title:** {result.get('page_title', 'N/A')}
 **Reservation Elements:** {result.get('reservation_info', 'None found')}
+**Automation:** {result.get('automation') or 'N/A'} ({result.get('round_trips', 0)} page round-trips)
+**Requests Blocked:** {result.get('interception_summary', 'N/A')}
 
 **Status:** SUCCESS - Real browser automation completed successfully
-**Session Replay:** https://browserbase.com/sessions/{result['session_id']}
+**Session Replay:** {_replay(result)}
 
-✅ **VERIFICATION:** This used real BrowserBase automation!
+✅ **VERIFICATION:** This used real browser automation ({get_browser_backend().name})!
 🎥 **PROOF:** Check the session replay to see the actual browser interaction!
 """
         elif result['status'] == 'TIMEOUT':
@@ -377,7 +488,7 @@ Searched for: OpenTable, Resy, Yelp reservations
 **Issue:** Page loading timeout
 
 **Status:** PARTIAL - Browser launched but page loading failed
-**Session Replay:** https://browserbase.com/sessions/{result['session_id']}
+**Session Replay:** {_replay(result)}
 
 **Next Steps:** 
 1. Check the session replay to see what happened
@@ -392,7 +503,7 @@ Searched for: OpenTable, Resy, Yelp reservations
 **Error:** {result.get('error', 'Unknown error')}
 
 **Status:** FAILED - Could not complete automation
-**Session Replay:** https://browserbase.com/sessions/{result['session_id']}
+**Session Replay:** {_replay(result)}
 
 **Next Steps:** 
 1. Check the session replay to see what went wrong
@@ -411,6 +522,157 @@ Restaurant: {restaurant_name}
 **Action:** Check your BrowserBase setup and try again
 """
 
+async def book_restaurant_reservation_real(
+    restaurant_name: str,
+    date: str,
+    time: str,
+    party_size: int,
+    contact_info: str
+) -> str:
+    """
+    Book a restaurant reservation using browser automation. Requires restaurant name, date, time, party size, and contact info.
+    
+    Args:
+        restaurant_name: Name of the restaurant
+        date: Date of the reservation (e.g. 'July 21, 2025')
+        time: Time of the reservation (e.g. '7:00 PM')
+        party_size: Number of people for the reservation
+        contact_info: User's contact info (email or phone)
+    
+    Returns:
+        String with booking status and confirmation details
+    """
+    return await run_booking_once(
+        {
+            'restaurant_name': restaurant_name,
+            'date': date,
+            'time': time,
+            'party_size': party_size,
+            'contact_info': contact_info,
+        }
+    )
+
+def _booking_key(params: dict) -> str:
+    return booking_key(
+        params['restaurant_name'], params['date'], params['time'],
+        params['party_size'], params['contact_info'],
+    )
+
+async def run_booking_once(params: dict, progress=None) -> str:
+    """
+    run_booking() behind the idempotency layer.
+
+    A duplicate of a booking that is still running waits for it instead of
+    opening a second browser session, and a duplicate of one that succeeded
+    recently gets the same confirmation instead of booking twice.
+    """
+    booking_dedup = await asyncio.to_thread(get_booking_dedup)
+    result, how = await booking_dedup.run(
+        _booking_key(params), lambda: run_booking(**params, progress=progress)
+    )
+    if how == "attached":
+        print(f"[DEBUG] Duplicate booking for {params['restaurant_name']} joined the one in progress")
+        return "♻️ **Duplicate request:** the same booking was already in progress; this is its result.\n" + result
+    if how == "stored":
+        print(f"[DEBUG] Duplicate booking for {params['restaurant_name']} answered from stored result")
+        return "♻️ **Duplicate request:** this booking was already made; no second reservation was placed.\n" + result
+    return result
+
+_booking_queue = None
+_booking_queue_lock = threading.Lock()
+
+def get_booking_queue() -> BookingQueue:
+    """
+    Return the process-wide booking queue.
+    """
+    global _booking_queue
+    with _booking_queue_lock:
+        if _booking_queue is None:
+            _booking_queue = BookingQueue(run_booking_once)
+    return _booking_queue
+
+def submit_booking(
+    restaurant_name: str,
+    date: str,
+    time: str,
+    party_size: int,
+    contact_info: str,
+    priority: int = 5
+) -> str:
+    """
+    Queue a restaurant booking and return a job ID immediately. The booking runs in the background; check it with get_booking_status.
+    
+    Args:
+        restaurant_name: Name of the restaurant
+        date: Date of the reservation (e.g. 'July 21, 2025')
+        time: Time of the reservation (e.g. '7:00 PM')
+        party_size: Number of people for the reservation
+        contact_info: User's contact info (email or phone)
+        priority: 1 (most urgent) to 9 (least); defaults to 5
+    
+    Returns:
+        String with the job ID and its queue position
+    """
+    queue = get_booking_queue()
+    params = {
+        'restaurant_name': restaurant_name,
+        'date': date,
+        'time': time,
+        'party_size': party_size,
+        'contact_info': contact_info,
+    }
+    # An identical job that is still queued or running is returned as is
+    job = queue.submit(params, priority=priority, key=_booking_key(params))
+    waiting = sum(1 for j in queue.jobs() if j['state'] == 'queued' and j['id'] != job.id)
+    return f"""
+📋 **BOOKING QUEUED**
+
+**Job ID:** {job.id}
+**Restaurant:** {restaurant_name}
+**Date:** {date}
+**Time:** {time}
+**Party Size:** {party_size}
+**Jobs ahead or running:** {waiting}
+
+**Status:** QUEUED - Progress appears in the app; ask for the status of job {job.id} any time
+"""
+
+def get_booking_status(job_id: str) -> str:
+    """
+    Get the state of a queued booking, and its result once finished.
+    
+    Args:
+        job_id: Job ID returned by submit_booking
+    
+    Returns:
+        String with the job state and, when done, the booking result
+    """
+    job = get_booking_queue().get(job_id.strip())
+    if job is None:
+        return f"❌ No booking job {job_id} (it may have expired)"
+    if job.state == "done":
+        return job.result
+    if job.state == "failed":
+        return f"❌ **BOOKING JOB {job.id} FAILED**\n\nError: {job.error}"
+    return f"⏳ **Booking job {job.id}:** {job.state.upper()} ({job.params['restaurant_name']})"
+
+def cancel_booking(job_id: str) -> str:
+    """
+    Cancel a queued or running booking job.
+    
+    Args:
+        job_id: Job ID returned by submit_booking
+    
+    Returns:
+        String saying whether the job was cancelled
+    """
+    if get_booking_queue().cancel(job_id.strip()):
+        return f"🛑 Booking job {job_id} cancelled"
+    return f"⚠️ Booking job {job_id} is not running (already finished or unknown)"
+
 # Create the FunctionTool
 book_restaurant_reservation_real = FunctionTool(book_restaurant_reservation_real)
+SubmitBookingTool = FunctionTool(submit_booking)
+BookingStatusTool = FunctionTool(get_booking_status)
+CancelBookingTool = FunctionTool(cancel_booking)
 navigate_and_extract = FunctionTool(navigate_and_extract)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+TOOL_CACHE_DIR = os.getenv(
+    "TOOL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "dynamove")
+)
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a free-text query so trivially different phrasings share a key.
+    """
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!.")
+
+
+def make_key(*parts) -> str:
+    """
+    Build a stable cache key from JSON-serializable parts.
+    """
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Two-tier cache: an in-memory LRU in front of an optional SQLite table.
+
+    Values must be JSON-serializable. Entries expire after *ttl* seconds in
+    both tiers; a disk hit is promoted back into memory.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 256, db_path: str = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "sets": 0,
+        }
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, PRIMARY KEY (name, key))"
+            )
+            self._db.commit()
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE name = ? AND key = ?",
+                    (self.name, key),
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        value = json.loads(row[0])
+                        self._remember(key, value, row[1])
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._db.execute(
+                        "DELETE FROM cache WHERE name = ? AND key = ?", (self.name, key)
+                    )
+                    self._db.commit()
+                    self._stats["expirations"] += 1
+
+            self._stats["misses"] += 1
+            return default
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats["sets"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (name, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.name, key, json.dumps(value), expires_at),
+                )
+                self._db.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM cache WHERE name = ? AND key = ?", (self.name, key)
+                )
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE name = ?", (self.name,))
+                self._db.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Drop expired rows from the disk tier. Returns the number removed.
+        """
+        if self._db is None:
+            return 0
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM cache WHERE name = ? AND expires_at <= ?",
+                (self.name, time.time()),
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def _remember(self, key, value, expires_at):
+        # Caller holds self._lock
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+
+def cache_db_path(filename: str = "tools_cache.sqlite3") -> str:
+    return os.path.join(TOOL_CACHE_DIR, filename)
@@ -0,0 +1,235 @@
+import functools
+import inspect
+import math
+import os
+import re
+from collections import Counter
+
+# Default token budget for a single tool result that goes back to the LLM
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "800"))
+# Word-trigram Jaccard similarity above which two sentences count as duplicates
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+# Field lines ("**Key:** value") longer than this are treated as body text
+MAX_ANCHOR_CHARS = 160
+
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"  # pictographs, emoticons, transport, symbols
+    "\u2600-\u27BF"          # misc symbols and dingbats
+    "\u2B00-\u2BFF"          # arrows and stars
+    "\uFE0F\u200D\uFFFD"    # variation selector, ZWJ, replacement char
+    "]+"
+)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SEPARATOR_RE = re.compile(r"^[\s\-=_*#~|]*$")
+# "**Key:** value" or "Key: value"
+_FIELD_RE = re.compile(r"^(\s*(?:[-*]\s+)?(?:\*\*[^*]+\*\*:?\s*|[A-Z][A-Za-z ]{0,24}:\s+))(.*)$")
+_STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "the", "to", "with", "my", "me", "i", "you", "what", "best",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _words(text: str) -> list:
+    return _WORD_RE.findall(text.lower())
+
+
+def _shingles(words: list) -> set:
+    if len(words) < 3:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _is_near_duplicate(shingles: set, seen: list) -> bool:
+    if not shingles:
+        return False
+    for other in seen:
+        overlap = len(shingles & other)
+        if overlap and overlap / len(shingles | other) >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+
+def _clean(text: str) -> list:
+    """
+    Strip emoji and boilerplate, and drop repeated lines and sentences.
+
+    Blank and separator lines split the text into records (one search hit,
+    one email). Repeated body sentences are dropped anywhere, but repeated
+    lines and short fields only within a record: two emails from the same
+    sender both keep their "From:" line.
+
+    Returns a list of (prefix, sentences) per output line. Lines with
+    sentences=None are anchors (titles, short fields, URLs, blank separators)
+    that are always kept verbatim.
+    """
+    lines = []
+    seen_shingles = []
+    record_lines = set()
+    record_shingles = []
+    for raw in text.splitlines():
+        indent = raw[:len(raw) - len(raw.lstrip())]
+        line = re.sub(r"[ \t]{2,}", " ", _EMOJI_RE.sub("", raw).strip())
+        if not line or _SEPARATOR_RE.match(line):
+            if lines and lines[-1] != ("", None):
+                lines.append(("", None))
+            record_lines = set()
+            record_shingles = []
+            continue
+
+        key = " ".join(_words(line))
+        if key in record_lines:
+            continue
+        record_lines.add(key)
+
+        line = indent + line
+        field = _FIELD_RE.match(line)
+        prefix, body = (field.group(1), field.group(2)) if field else (indent, line.strip())
+
+        sentences = [(s, _shingles(_words(s))) for s in _SENTENCE_RE.split(body)] if body else []
+        if len(line) <= MAX_ANCHOR_CHARS and (field or "://" in line):
+            # Short fields stay verbatim unless their value repeats the same
+            # record (e.g. a highlight that repeats the content above it)
+            fresh = [sh for _, sh in sentences if not _is_near_duplicate(sh, record_shingles)]
+            if fresh or not body or "://" in line:
+                seen_shingles.extend(fresh)
+                record_shingles.extend(fresh)
+                lines.append((line, None))
+            continue
+
+        kept = []
+        for sentence, shingles in sentences:
+            if _is_near_duplicate(shingles, seen_shingles):
+                continue
+            seen_shingles.append(shingles)
+            record_shingles.append(shingles)
+            kept.append(sentence)
+        if kept:
+            lines.append((prefix, kept))
+    while lines and lines[-1] == ("", None):
+        lines.pop()
+    return lines
+
+
+def _render(lines: list, chosen=None) -> str:
+    out = []
+    for index, (prefix, sentences) in enumerate(lines):
+        if sentences is None:
+            out.append(prefix)
+            continue
+        picked = sentences if chosen is None else [
+            s for position, s in enumerate(sentences) if (index, position) in chosen
+        ]
+        if picked:
+            ellipsis = " …" if len(picked) < len(sentences) else ""
+            out.append(prefix + " ".join(picked) + ellipsis)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(out)).strip()
+
+
+def compact(text: str, budget: int = None, query: str = None) -> str:
+    """
+    Fit a tool result into a token budget.
+
+    Emoji, separators, repeated lines and near-duplicate sentences are always
+    removed. If the result is still over budget, structural lines (titles,
+    short fields, URLs) are kept and the remaining sentences are chosen by
+    relevance to *query* until the budget is spent.
+
+    Args:
+        text: Tool output to compact
+        budget: Token budget (defaults to TOOL_OUTPUT_TOKEN_BUDGET)
+        query: Optional text the result should stay relevant to
+
+    Returns:
+        The compacted text
+    """
+    if not isinstance(text, str):
+        return text
+    budget = TOOL_OUTPUT_TOKEN_BUDGET if budget is None else budget
+    lines = _clean(text)
+    cleaned = _render(lines)
+    if estimate_tokens(cleaned) <= budget:
+        return cleaned
+
+    # Score sentences: query-term overlap weighted by rarity; earlier is better
+    query_terms = {w for w in _words(query or "") if w not in _STOPWORDS}
+    bodies = [
+        (index, position, sentence)
+        for index, (_, sentences) in enumerate(lines) if sentences
+        for position, sentence in enumerate(sentences)
+    ]
+    doc_freq = Counter()
+    for _, _, sentence in bodies:
+        doc_freq.update(set(_words(sentence)))
+    scored = []
+    for index, position, sentence in bodies:
+        matches = set(_words(sentence)) & query_terms
+        relevance = sum(1.0 / doc_freq[w] for w in matches)
+        scored.append((relevance - 0.01 * position, index, position, sentence))
+    scored.sort(key=lambda s: (-s[0], s[1], s[2]))
+
+    spent = sum(estimate_tokens(prefix) + 1 for prefix, _ in lines)
+    chosen = set()
+    for _, index, position, sentence in scored:
+        cost = estimate_tokens(sentence) + 1
+        if spent + cost > budget:
+            continue
+        chosen.add((index, position))
+        spent += cost
+
+    result = _render(lines, chosen)
+    max_chars = budget * 4
+    if len(result) > max_chars:
+        # Structural lines alone blew the budget
+        result = result[:max_chars].rstrip() + " …"
+    return result
+
+
+def compact_output(budget: int = None, query_arg: str = None):
+    """
+    Decorator that passes a tool's string result through compact().
+
+    Args:
+        budget: Token budget for this tool (defaults to TOOL_OUTPUT_TOKEN_BUDGET),
+            or a callable taking the call's arguments dict and returning one,
+            for tools whose caller asks for a given amount of text
+        query_arg: Name of the argument to rank sentences against
+    """
+    def decorator(fn):
+        sig = inspect.signature(fn)
+
+        def _budget(args, kwargs):
+            if not callable(budget):
+                return budget
+            bound = sig.bind_partial(*args, **kwargs)
+            bound.apply_defaults()
+            return budget(bound.arguments)
+
+        def _query(args, kwargs):
+            if not query_arg:
+                return None
+            value = sig.bind_partial(*args, **kwargs).arguments.get(query_arg)
+            if isinstance(value, (list, tuple)):
+                value = " ".join(map(str, value))
+            return value
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return compact(await fn(*args, **kwargs), _budget(args, kwargs), _query(args, kwargs))
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def sync_wrapper(*args, **kwargs):
+            return compact(fn(*args, **kwargs), _budget(args, kwargs), _query(args, kwargs))
+        return sync_wrapper
+
+    return decorator
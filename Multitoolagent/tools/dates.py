@@ -0,0 +1,30 @@
+import re
+from datetime import datetime
+
+# Spellings the LLM and speech transcripts use for dates and times
+DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%Y-%m-%d", "%m/%d/%Y", "%B %d %Y")
+TIME_FORMATS = ("%I:%M %p", "%I %p", "%I:%M%p", "%I%p", "%H:%M")
+
+
+def _parse(value: str, formats, what: str) -> datetime:
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized {what}: {value!r}")
+
+
+def parse_date(value: str):
+    """
+    Parse a date like 'July 21, 2025' or '2025-07-21'.
+    """
+    return _parse(re.sub(r"\s+", " ", value.strip()), DATE_FORMATS, "date").date()
+
+
+def parse_time(value: str):
+    """
+    Parse a time like '7:00 PM', '7pm', '8:30 p.m.' or '19:00'.
+    """
+    cleaned = re.sub(r"\s+", " ", value.strip().replace(".", "")).upper()
+    return _parse(cleaned, TIME_FORMATS, "time").time()
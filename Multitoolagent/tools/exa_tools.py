@@ -1,66 +1,342 @@
 # tools/exa_tools.py
-import os, httpx
+import asyncio
+import json
+import os
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from google.adk.tools import FunctionTool
 
-def exa_search(query: str, k: int) -> str:
+from . import http_client
+from .cache import TTLCache, cache_db_path, make_key, normalize_query
+from .compaction import compact_output
+from .io_loop import run_on_io_loop_sync
+from .singleflight import coalesce
+
+EXA_ENDPOINT = "https://api.exa.ai/search"
+EXA_CONTENTS_ENDPOINT = "https://api.exa.ai/contents"
+
+# Max Exa requests in flight for one exa_search_many call
+EXA_BATCH_CONCURRENCY = int(os.getenv("EXA_BATCH_CONCURRENCY", "4"))
+# Reciprocal-rank-fusion constant used to merge per-query rankings
+RRF_K = 60
+
+# Search responses are cached by (normalized query, k, contents options)
+EXA_CACHE_TTL = float(os.getenv("EXA_CACHE_TTL", str(6 * 60 * 60)))
+EXA_CACHE_MAX_ENTRIES = int(os.getenv("EXA_CACHE_MAX_ENTRIES", "512"))
+_exa_cache = None
+_exa_cache_lock = threading.Lock()
+
+
+def get_exa_cache() -> TTLCache:
     """
-    Returns a markdown bullet list of search hits with full content.
+    Return the Exa response cache, opening it on first use.
     """
+    global _exa_cache
+    with _exa_cache_lock:
+        if _exa_cache is None:
+            _exa_cache = TTLCache(
+                "exa_search",
+                ttl=EXA_CACHE_TTL,
+                max_entries=EXA_CACHE_MAX_ENTRIES,
+                db_path=cache_db_path() if os.getenv("EXA_CACHE_DISK", "1") != "0" else None,
+            )
+    return _exa_cache
+
+# Hard cap on bytes read from one /contents response; the stream is cut
+# off past this even if Exa ignores maxCharacters
+EXA_CONTENTS_MAX_BYTES = int(os.getenv("EXA_CONTENTS_MAX_BYTES", str(64 * 1024)))
+
+# Phase one of the lazy mode: highlights only, no page text
+EXA_LITE_CONTENTS = {
+    "highlights": {
+        "numSentences": 3,
+        "highlightsPerUrl": 3
+    }
+}
+
+# Content options sent with every search
+EXA_CONTENTS = {
+    "text": {
+        "maxCharacters": 2000,
+        "includeHtmlTags": False
+    },
+    "highlights": {
+        "numSentences": 3,
+        "highlightsPerUrl": 3
+    }
+}
+
+
+def _exa_headers() -> dict:
     EXA_API_KEY = os.environ.get("EXA_API_KEY")
-    EXA_ENDPOINT = "https://api.exa.ai/search"  
     if not EXA_API_KEY:
         raise RuntimeError("Set EXA_API_KEY env-var first")
+    return {"Authorization": f"Bearer {EXA_API_KEY}"}
 
-    # CORRECTED API call with proper parameter structure
-    r = httpx.post(
+
+async def exa_search_raw(query: str, k: int, contents: dict = None, refresh: bool = False) -> dict:
+    """
+    Run one Exa search over the pooled HTTP client and return the JSON body.
+
+    Responses are served from the Exa cache when a fresh entry exists, unless
+    *refresh* is set (the new response is still cached).
+    """
+    if contents is None:
+        contents = EXA_CONTENTS
+    key = make_key(normalize_query(query), k, contents)
+    # SQLite-backed lookups run in a worker thread to keep the loop free
+    cache = await asyncio.to_thread(get_exa_cache)
+    data = None if refresh else await asyncio.to_thread(cache.get, key)
+    if data is not None:
+        print(f"DEBUG: Exa cache hit for {query!r}")
+        return data
+
+    r = await http_client.post(
         EXA_ENDPOINT,
         json={
-            "query": query, 
-            "numResults": k,  # Changed from "k" to "numResults"
-            "contents": {     # Wrapped content options in "contents" object
-                "text": {
-                    "maxCharacters": 2000,
-                    "includeHtmlTags": False
-                },
-                "highlights": {
-                    "numSentences": 3,
-                    "highlightsPerUrl": 3
-                }
-            }
+            "query": query,
+            "numResults": k,
+            "contents": contents
         },
-        headers={"Authorization": f"Bearer {EXA_API_KEY}"},
+        headers=_exa_headers(),
     )
     r.raise_for_status()
     data = r.json()
-    
+
     # Debug output
     print(f"DEBUG: Response keys: {data.keys()}")
     print(f"DEBUG: Cost breakdown: {data.get('costDollars', 'N/A')}")
-    
+
+    await asyncio.to_thread(cache.set, key, data)
+    return data
+
+
+def format_exa_results(data: dict) -> str:
     results = []
     for i, result in enumerate(data.get("results", []), 1):
         title = result.get("title", "No Title")
         url = result.get("url", "No URL")
-        text = result.get("text", "No text available")
+        text = result.get("text")
         highlights = result.get("highlights", [])
-        
-        # Debug text length
-        print(f"DEBUG: Result {i} text length: {len(text)}")
-        
-        # Better formatting with more content
-        if len(text) > 100:
-            summary = text[:800] + "..." if len(text) > 800 else text
-        else:
-            summary = text
-            
+
+        # Lazy (highlights-only) results carry no text at all
+        content_text = ""
+        if text is not None:
+            # Debug text length
+            print(f"DEBUG: Result {i} text length: {len(text)}")
+
+            # Full text; the compaction stage trims it to the token budget
+            summary = text or "No text available"
+            content_text = f"\n   📝 **Content:** {summary}"
+
         # Include highlights if available
         highlight_text = ""
         if highlights:
             highlight_text = f"\n   🔍 **Highlights:** {' | '.join(highlights[:2])}"
-        
-        results.append(f"**{i}. {title}**\n   🔗 **URL:** {url}\n   📝 **Content:** {summary}{highlight_text}\n")
-    
+
+        # Which queries surfaced this hit (exa_search_many only)
+        matched_text = ""
+        if result.get("matchedQueries"):
+            matched_text = f"\n   🧭 **Matched:** {' | '.join(result['matchedQueries'])}"
+
+        results.append(f"**{i}. {title}**\n   🔗 **URL:** {url}{content_text}{highlight_text}{matched_text}\n")
+
     return "\n".join(results)
 
-# Create the FunctionTool
-ExaSearchTool = FunctionTool(exa_search)
\ No newline at end of file
+
+@coalesce("exa_search", key_fn=lambda a: (normalize_query(a["query"]), a["k"]))
+@compact_output(query_arg="query")
+async def exa_search(query: str, k: int) -> str:
+    """
+    Returns a markdown bullet list of search hits with full content.
+    """
+    data = await exa_search_raw(query, k)
+    return format_exa_results(data)
+
+
+def exa_search_sync(query: str, k: int) -> str:
+    """
+    Blocking wrapper around exa_search for scripts.
+    """
+    return run_on_io_loop_sync(exa_search(query, k))
+
+
+@coalesce("exa_search_lite", key_fn=lambda a: (normalize_query(a["query"]), a["k"]))
+@compact_output(query_arg="query")
+async def exa_search_lite(query: str, k: int) -> str:
+    """
+    Quick search that returns only titles, URLs and highlights.
+
+    Use this first to pick candidates, then call exa_get_contents with the one
+    or two URLs that actually matter.
+
+    Args:
+        query: Search query
+        k: Number of results
+
+    Returns:
+        Markdown list of hits without page text
+    """
+    data = await exa_search_raw(query, k, contents=EXA_LITE_CONTENTS)
+    return format_exa_results(data)
+
+
+async def _exa_contents_one(url: str, max_characters: int) -> dict:
+    key = make_key("contents", url.strip(), max_characters)
+    cache = await asyncio.to_thread(get_exa_cache)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return cached
+
+    response, body, truncated = await http_client.fetch_capped(
+        "POST",
+        EXA_CONTENTS_ENDPOINT,
+        EXA_CONTENTS_MAX_BYTES,
+        json={
+            "urls": [url],
+            "text": {"maxCharacters": max_characters, "includeHtmlTags": False}
+        },
+        headers=_exa_headers(),
+    )
+    response.raise_for_status()
+    if truncated:
+        raise RuntimeError(f"response exceeded {EXA_CONTENTS_MAX_BYTES} bytes")
+    data = json.loads(body)
+    print(f"DEBUG: Contents cost breakdown: {data.get('costDollars', 'N/A')}")
+    result = (data.get("results") or [{"url": url, "text": ""}])[0]
+    await asyncio.to_thread(cache.set, key, result)
+    return result
+
+
+def _contents_max_characters(max_characters) -> int:
+    return max(200, min(int(max_characters), 10000))
+
+
+def _contents_budget(arguments: dict) -> int:
+    # Room for every character the agent asked for, plus each block's
+    # title and URL lines, so requested text is never cut
+    per_url = _contents_max_characters(arguments["max_characters"]) // 4 + 50
+    return max(1, len(set(arguments["urls"]))) * per_url
+
+
+@compact_output(budget=_contents_budget)
+async def exa_get_contents(urls: list[str], max_characters: int) -> str:
+    """
+    Fetch the page text for specific URLs picked from exa_search_lite results.
+
+    Args:
+        urls: URLs to fetch (keep this to the few results that matter)
+        max_characters: Max characters of text per URL (e.g. 2000)
+
+    Returns:
+        Markdown block with the text of each URL
+    """
+    urls = [u for u in dict.fromkeys(u.strip() for u in urls) if u]
+    max_characters = _contents_max_characters(max_characters)
+    semaphore = asyncio.Semaphore(EXA_BATCH_CONCURRENCY)
+
+    async def _one(url):
+        async with semaphore:
+            return await _exa_contents_one(url, max_characters)
+
+    fetched = await asyncio.gather(*(_one(u) for u in urls), return_exceptions=True)
+
+    blocks = []
+    for i, (url, result) in enumerate(zip(urls, fetched), 1):
+        if isinstance(result, Exception):
+            print(f"DEBUG: Contents fetch for {url} failed: {result}")
+            blocks.append(f"**{i}. {url}**\n   ⚠️ Could not fetch contents: {result}\n")
+            continue
+        title = result.get("title") or url
+        text = result.get("text") or "No text available"
+        blocks.append(f"**{i}. {title}**\n   🔗 **URL:** {url}\n   📝 **Content:** {text}\n")
+    return "\n".join(blocks)
+
+
+def _canonical_url(url: str) -> str:
+    """
+    Normalize a URL for de-duplication (case, trailing slash, tracking params).
+    """
+    parts = urlsplit(url.strip())
+    query = urlencode(
+        [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")]
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def merge_exa_results(responses: list, queries: list) -> dict:
+    """
+    Merge per-query Exa responses into one ranked, de-duplicated result set.
+
+    Hits are ranked by reciprocal rank fusion, so a URL that several queries
+    agree on rises to the top.
+    """
+    merged = {}
+    for query, data in zip(queries, responses):
+        for rank, result in enumerate(data.get("results", []), 1):
+            url = result.get("url")
+            if not url:
+                continue
+            key = _canonical_url(url)
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {
+                    "result": dict(result, matchedQueries=[]),
+                    "score": 0.0,
+                    "best_rank": rank,
+                }
+            entry["score"] += 1.0 / (RRF_K + rank)
+            entry["best_rank"] = min(entry["best_rank"], rank)
+            if query not in entry["result"]["matchedQueries"]:
+                entry["result"]["matchedQueries"].append(query)
+
+    ranked = sorted(merged.values(), key=lambda e: (-e["score"], e["best_rank"]))
+    return {"results": [e["result"] for e in ranked]}
+
+
+@compact_output(query_arg="queries")
+async def exa_search_many(queries: list[str], k: int) -> str:
+    """
+    Run several Exa searches at once and return one merged, ranked list.
+
+    Use this instead of calling exa_search repeatedly when comparing options
+    (e.g. several restaurants or several angles on the same question).
+
+    Args:
+        queries: Search queries to run concurrently
+        k: Number of results to request per query
+
+    Returns:
+        Markdown list of unique hits, best matches first
+    """
+    queries = [q for q in dict.fromkeys(q.strip() for q in queries) if q]
+    if not queries:
+        return "No queries given."
+
+    semaphore = asyncio.Semaphore(EXA_BATCH_CONCURRENCY)
+
+    async def _one(query):
+        async with semaphore:
+            return await exa_search_raw(query, k)
+
+    responses = await asyncio.gather(*(_one(q) for q in queries), return_exceptions=True)
+
+    ok_queries, ok_responses, errors = [], [], []
+    for query, response in zip(queries, responses):
+        if isinstance(response, Exception):
+            print(f"DEBUG: Exa query {query!r} failed: {response}")
+            errors.append(f"⚠️ Search failed for '{query}': {response}")
+        else:
+            ok_queries.append(query)
+            ok_responses.append(response)
+
+    merged = merge_exa_results(ok_responses, ok_queries)
+    print(f"DEBUG: exa_search_many merged {sum(len(r.get('results', [])) for r in ok_responses)} hits into {len(merged['results'])}")
+    return "\n".join(errors + [format_exa_results(merged)])
+
+# Create the FunctionTool (async, so ADK awaits it without blocking the runner)
+ExaSearchTool = FunctionTool(exa_search)
+ExaSearchManyTool = FunctionTool(exa_search_many)
+ExaSearchLiteTool = FunctionTool(exa_search_lite)
+ExaContentsTool = FunctionTool(exa_get_contents)
@@ -0,0 +1,247 @@
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .cache import TOOL_CACHE_DIR
+
+# Check if optional dependencies are available
+try:
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    GMAIL_API_AVAILABLE = True
+except ImportError:
+    GMAIL_API_AVAILABLE = False
+
+# If modifying these scopes, delete the stored tokens under GMAIL_TOKEN_DIR
+SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
+
+_TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+# OAuth client secrets from the Google Cloud console
+GMAIL_CLIENT_SECRETS = os.getenv("GMAIL_CLIENT_SECRETS", os.path.join(_TOOLS_DIR, "credentials.json"))
+# One <user id>.json token file per user
+GMAIL_TOKEN_DIR = os.getenv("GMAIL_TOKEN_DIR", os.path.join(TOOL_CACHE_DIR, "gmail_tokens"))
+# Whose mailbox the tools read when no user id is given
+GMAIL_USER_ID = os.getenv("GMAIL_USER_ID", "default")
+# Refresh access tokens this many seconds before they expire
+GMAIL_REFRESH_MARGIN = float(os.getenv("GMAIL_REFRESH_MARGIN", "300"))
+# Retry delay after a failed background refresh
+GMAIL_REFRESH_RETRY = 30.0
+
+# Where the single token used to live; picked up once for the default user
+_LEGACY_TOKEN = os.path.join(_TOOLS_DIR, "token.json")
+
+
+class GmailAuthRequired(Exception):
+    """
+    The user has no stored token and interactive login is not allowed.
+    """
+
+
+class _Client:
+    def __init__(self, user_id: str, creds, service):
+        self.user_id = user_id
+        self.creds = creds
+        self.service = service
+        # The service's HTTP transport is not thread-safe, and a refresh
+        # replaces the token under it
+        self.lock = threading.Lock()
+        self.timer = None
+        # Second service for long background work (the mailbox sync), with
+        # its own transport so service() callers never queue behind it
+        self.background = None
+        self.background_lock = threading.Lock()
+
+
+class GmailClientCache:
+    """
+    One authorized Gmail client per user id, built once and kept fresh.
+
+    Clients are built from the discovery document bundled with
+    google-api-python-client, so building never goes to the network, and
+    each user's access token is refreshed on a background timer before it
+    expires. Tokens are stored per user under GMAIL_TOKEN_DIR.
+    """
+
+    def __init__(self, token_dir: str = GMAIL_TOKEN_DIR, client_secrets: str = GMAIL_CLIENT_SECRETS,
+                 refresh_margin: float = GMAIL_REFRESH_MARGIN):
+        self.token_dir = token_dir
+        self.client_secrets = client_secrets
+        self.refresh_margin = refresh_margin
+        self._clients = {}
+        self._lock = threading.Lock()
+        # Serializes first-time setup per user without blocking other users
+        self._setup_locks = {}
+        self._closed = False
+
+    def token_path(self, user_id: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.@-]", "_", user_id)
+        return os.path.join(self.token_dir, f"{safe}.json")
+
+    def _save_token(self, user_id: str, creds):
+        path = self.token_path(user_id)
+        os.makedirs(self.token_dir, exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            f.write(creds.to_json())
+        os.replace(tmp, path)
+
+    def _load_creds(self, user_id: str, interactive: bool):
+        path = self.token_path(user_id)
+        if not os.path.exists(path) and user_id == GMAIL_USER_ID and os.path.exists(_LEGACY_TOKEN):
+            os.makedirs(self.token_dir, exist_ok=True)
+            shutil.copyfile(_LEGACY_TOKEN, path)
+            print(f"[DEBUG] Moved legacy Gmail token to {path}")
+        creds = None
+        if os.path.exists(path):
+            creds = Credentials.from_authorized_user_file(path, SCOPES)
+        if creds and not creds.valid and creds.refresh_token:
+            creds.refresh(Request())
+            self._save_token(user_id, creds)
+        if not creds or not creds.valid:
+            if not interactive:
+                raise GmailAuthRequired(f"Gmail is not authorized for user {user_id!r}")
+            # Opens a browser for the user to log in
+            flow = InstalledAppFlow.from_client_secrets_file(self.client_secrets, SCOPES)
+            creds = flow.run_local_server(port=0)
+            self._save_token(user_id, creds)
+        return creds
+
+    def _seconds_until_refresh(self, creds) -> float:
+        if creds.expiry is None:
+            return None
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        remaining = (creds.expiry - now).total_seconds()
+        return max(0.0, remaining - self.refresh_margin)
+
+    def _schedule_refresh(self, client: _Client, delay: float = None):
+        if self._closed:
+            return
+        if delay is None:
+            delay = self._seconds_until_refresh(client.creds)
+            if delay is None:
+                return
+        timer = threading.Timer(delay, self._refresh, args=(client,))
+        timer.daemon = True
+        client.timer = timer
+        timer.start()
+
+    def _refresh(self, client: _Client):
+        try:
+            with client.lock:
+                client.creds.refresh(Request())
+            self._save_token(client.user_id, client.creds)
+            print(f"[DEBUG] Refreshed Gmail token for {client.user_id}")
+            self._schedule_refresh(client)
+        except Exception as e:
+            print(f"[DEBUG] Gmail token refresh for {client.user_id} failed: {e}")
+            self._schedule_refresh(client, GMAIL_REFRESH_RETRY)
+
+    def _client(self, user_id: str, interactive: bool) -> _Client:
+        with self._lock:
+            client = self._clients.get(user_id)
+            if client is not None:
+                return client
+            setup_lock = self._setup_locks.setdefault(user_id, threading.Lock())
+        with setup_lock:
+            with self._lock:
+                if user_id in self._clients:
+                    return self._clients[user_id]
+            creds = self._load_creds(user_id, interactive)
+            service = build("gmail", "v1", credentials=creds, static_discovery=True, cache_discovery=False)
+            client = _Client(user_id, creds, service)
+            with self._lock:
+                self._clients[user_id] = client
+            print(f"[DEBUG] Built Gmail client for {user_id}")
+        self._schedule_refresh(client)
+        return client
+
+    @contextmanager
+    def service(self, user_id: str = None, interactive: bool = True):
+        """
+        Hold *user_id*'s Gmail service for the duration of the block.
+
+        Calls for the same user are serialized; different users run in
+        parallel. A token that expired anyway (e.g. after sleep) is refreshed
+        inline before the service is handed out.
+        """
+        client = self._client(user_id or GMAIL_USER_ID, interactive)
+        with client.lock:
+            self._ensure_valid(client)
+            yield client.service
+
+    def _ensure_valid(self, client: _Client):
+        # Call with client.lock held
+        if not client.creds.valid and client.creds.refresh_token:
+            client.creds.refresh(Request())
+            self._save_token(client.user_id, client.creds)
+
+    @contextmanager
+    def background_service(self, user_id: str = None):
+        """
+        Hold a separate Gmail service for *user_id* for long-running work.
+
+        It shares the user's credentials but not the HTTP transport or the
+        lock of service(), so a background sync never delays a tool call.
+        Never opens a login flow.
+        """
+        client = self._client(user_id or GMAIL_USER_ID, interactive=False)
+        with client.background_lock:
+            with client.lock:
+                self._ensure_valid(client)
+            if client.background is None:
+                client.background = build(
+                    "gmail", "v1", credentials=client.creds, static_discovery=True, cache_discovery=False,
+                )
+            yield client.background
+
+    def warm_up(self, user_id: str = None):
+        """
+        Build a user's client in the background if a token is already stored.
+        """
+        def build_client():
+            try:
+                self._client(user_id or GMAIL_USER_ID, interactive=False)
+            except Exception as e:
+                print(f"[DEBUG] Gmail warm-up skipped: {e}")
+
+        if GMAIL_API_AVAILABLE:
+            threading.Thread(target=build_client, daemon=True).start()
+
+    def forget(self, user_id: str):
+        """
+        Drop a user's client (e.g. after their access was revoked).
+        """
+        with self._lock:
+            client = self._clients.pop(user_id, None)
+        if client is not None and client.timer is not None:
+            client.timer.cancel()
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            if client.timer is not None:
+                client.timer.cancel()
+
+
+_clients = None
+_clients_lock = threading.Lock()
+
+
+def get_gmail_clients() -> GmailClientCache:
+    """
+    Return the process-wide Gmail client cache.
+    """
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            _clients = GmailClientCache()
+    return _clients
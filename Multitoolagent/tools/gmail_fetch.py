@@ -0,0 +1,148 @@
+import base64
+import binascii
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from .html_extract import html_to_sections, render_sections
+
+# Detail requests per Gmail batch call; the API accepts at most 100
+GMAIL_BATCH_SIZE = min(100, int(os.getenv("GMAIL_BATCH_SIZE", "50")))
+
+# Listing only needs these headers and the snippet (format=metadata)
+METADATA_HEADERS = ["Subject", "From", "Date"]
+METADATA_FIELDS = "id,threadId,labelIds,snippet,internalDate,payload/headers"
+LIST_FIELDS = "messages/id,nextPageToken,resultSizeEstimate"
+# Opening a message: format=full carries attachment ids, never their data
+BODY_FIELDS = "id,threadId,labelIds,snippet,internalDate,payload"
+
+
+class PhaseTimer:
+    """
+    Wall-clock time spent in each named phase of a Gmail call.
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def summary(self) -> str:
+        return " · ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+
+
+def fetch_messages(service, message_ids, **get_kwargs) -> list:
+    """
+    Fetch many messages with Gmail batch requests instead of one call each.
+
+    Args:
+        service: Gmail API client
+        message_ids: Ids to fetch, in the order wanted back
+        get_kwargs: Passed to users().messages().get (format, fields, ...)
+
+    Returns:
+        The messages in *message_ids* order; ids whose fetch failed twice
+        are left out
+    """
+    results = {}
+    failed = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            failed.append(request_id)
+        else:
+            results[request_id] = response
+
+    messages = service.users().messages()
+    batches = 0
+    for start in range(0, len(message_ids), GMAIL_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_response)
+        for message_id in message_ids[start:start + GMAIL_BATCH_SIZE]:
+            batch.add(messages.get(userId="me", id=message_id, **get_kwargs), request_id=message_id)
+        batch.execute()
+        batches += 1
+
+    # Batches can fail individual items (usually rate limits); retry those
+    # one at a time rather than failing the whole call
+    for message_id in failed:
+        try:
+            results[message_id] = messages.get(userId="me", id=message_id, **get_kwargs).execute()
+        except Exception as e:
+            print(f"[DEBUG] Fetching message {message_id} failed: {e}")
+    print(f"[DEBUG] Fetched {len(results)}/{len(message_ids)} messages in {batches} batch(es), "
+          f"{len(failed)} retried")
+    return [results[message_id] for message_id in message_ids if message_id in results]
+
+
+def header(message: dict, name: str, default: str = "") -> str:
+    for item in message.get("payload", {}).get("headers", []):
+        if item["name"].lower() == name.lower():
+            return item["value"]
+    return default
+
+
+def summarize(message: dict) -> dict:
+    """
+    The fields the inbox listing shows, from a format=metadata message.
+    """
+    return {
+        "id": message["id"],
+        "thread_id": message.get("threadId"),
+        "subject": header(message, "Subject", "No Subject"),
+        "from": header(message, "From", "Unknown Sender"),
+        "date": header(message, "Date", "Unknown Date"),
+        "snippet": message.get("snippet", ""),
+        "internal_date": int(message.get("internalDate", 0)),
+        "labels": message.get("labelIds", []),
+    }
+
+
+def _decode_part(part: dict) -> str:
+    data = part.get("body", {}).get("data")
+    if not data:
+        return ""
+    try:
+        raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (binascii.Error, ValueError):
+        return ""
+    content_type = next(
+        (h["value"] for h in part.get("headers", []) if h["name"].lower() == "content-type"), ""
+    )
+    match = re.search(r"charset=\"?([\w-]+)", content_type, re.I)
+    try:
+        return raw.decode(match.group(1) if match else "utf-8", errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
+
+def _walk(part: dict):
+    yield part
+    for child in part.get("parts", []) or []:
+        yield from _walk(child)
+
+
+def decode_body(payload: dict) -> str:
+    """
+    Readable text of a message: the text/plain part, else its HTML as text.
+
+    Attachments (parts with a filename) are skipped.
+    """
+    parts = [p for p in _walk(payload) if not p.get("filename")]
+    for mime_type in ("text/plain", "text/html"):
+        for part in parts:
+            if part.get("mimeType", "").startswith(mime_type):
+                text = _decode_part(part)
+                if not text.strip():
+                    continue
+                if mime_type == "text/html":
+                    _, sections = html_to_sections(text)
+                    text = render_sections(sections, len(text))
+                return text.strip()
+    return ""
@@ -0,0 +1,512 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from .cache import TOOL_CACHE_DIR
+from .gmail_client import GMAIL_USER_ID, GmailAuthRequired, get_gmail_clients
+from .gmail_fetch import (
+    BODY_FIELDS, LIST_FIELDS, METADATA_FIELDS, METADATA_HEADERS, decode_body, fetch_messages, summarize,
+)
+
+# Answer inbox reads from a local copy kept up to date with history.list
+GMAIL_MIRROR = os.getenv("GMAIL_MIRROR", "1") != "0"
+GMAIL_MIRROR_DIR = os.getenv("GMAIL_MIRROR_DIR", os.path.join(TOOL_CACHE_DIR, "gmail_mirror"))
+# Most recent messages copied by the first (full) sync
+GMAIL_MIRROR_MAX_MESSAGES = int(os.getenv("GMAIL_MIRROR_MAX_MESSAGES", "500"))
+# Background sync period, and the age past which a read syncs first (only
+# incrementally; anything more and the read goes to the API)
+GMAIL_SYNC_INTERVAL = float(os.getenv("GMAIL_SYNC_INTERVAL", "300"))
+GMAIL_MIRROR_MAX_AGE = float(os.getenv("GMAIL_MIRROR_MAX_AGE", "900"))
+# Fetch and full-text index decoded bodies, not just subject and sender
+GMAIL_INDEX_BODIES = os.getenv("GMAIL_INDEX_BODIES", "1") != "0"
+GMAIL_INDEX_BODY_CHARS = int(os.getenv("GMAIL_INDEX_BODY_CHARS", "20000"))
+
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+HISTORY_FIELDS = (
+    "history(messagesAdded/message(id,labelIds),messagesDeleted/message/id,"
+    "labelsAdded/message(id,labelIds),labelsRemoved/message(id,labelIds)),"
+    "historyId,nextPageToken"
+)
+
+
+# Gmail-style operators understood by search; is:x maps to a system label
+_TOKEN = re.compile(r'(\w+):("[^"]*"|\S+)|"([^"]*)"|(\S+)')
+_IS_LABELS = {"unread": "UNREAD", "starred": "STARRED", "important": "IMPORTANT", "sent": "SENT"}
+_AGE_UNITS = {"d": 1, "w": 7, "m": 30, "y": 365}
+# bm25 weights for subject, sender and body: a hit in the subject counts most
+BM25_WEIGHTS = (4.0, 2.0, 1.0)
+
+
+def _status(error) -> int:
+    # googleapiclient's HttpError carries the HTTP response as .resp
+    return getattr(getattr(error, "resp", None), "status", None)
+
+
+def _phrase(text: str) -> str:
+    # Quoted, so user text can never be read as FTS5 syntax
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _day_ms(value: str) -> int:
+    day = datetime.strptime(value.replace("/", "-"), "%Y-%m-%d")
+    return int(day.timestamp() * 1000)
+
+
+class SearchQuery:
+    """
+    A Gmail-style search string split into words and filters.
+
+    Understands from:, subject:, label:/in:, is:unread (starred, important,
+    sent), after:/before: with a YYYY-MM-DD date, and newer_than:/older_than:
+    with an age such as 7d, 2w, 3m or 1y. Everything else is matched as
+    words against the subject, sender and body.
+    """
+
+    def __init__(self, text: str):
+        self.terms = []
+        self.sender = []
+        self.subject = []
+        self.label = None
+        self.after = None   # epoch ms, inclusive
+        self.before = None  # epoch ms, exclusive
+        for op, value, quoted, word in _TOKEN.findall(text or ""):
+            value = value.strip('"')
+            op = op.lower()
+            if not op:
+                self.terms.append(quoted or word)
+            elif op == "from":
+                self.sender.append(value)
+            elif op == "subject":
+                self.subject.append(value)
+            elif op in ("label", "in"):
+                self.label = value.upper()
+            elif op == "is" and value.lower() in _IS_LABELS:
+                self.label = _IS_LABELS[value.lower()]
+            elif op in ("after", "before", "newer_than", "older_than") and self._set_date(op, value):
+                continue
+            else:
+                # Not an operator after all (e.g. "7:30")
+                self.terms.append(f"{op}:{value}")
+
+    def _set_date(self, op: str, value: str) -> bool:
+        try:
+            if op in ("after", "before"):
+                ms = _day_ms(value)
+            else:
+                days = int(value[:-1]) * _AGE_UNITS[value[-1].lower()]
+                ms = int((datetime.now() - timedelta(days=days)).timestamp() * 1000)
+        except (ValueError, KeyError, IndexError):
+            return False
+        if op in ("after", "newer_than"):
+            self.after = ms
+        else:
+            self.before = ms
+        return True
+
+    def match_expression(self) -> str:
+        """
+        The FTS5 MATCH string for the words and field filters ("" if none).
+        """
+        parts = [_phrase(term) for term in self.terms if term.strip()]
+        parts += [f"sender : {_phrase(value)}" for value in self.sender]
+        parts += [f"subject : {_phrase(value)}" for value in self.subject]
+        return " AND ".join(parts)
+
+
+class SyncDeferred(Exception):
+    """
+    Bringing the mirror up to date would take a full sync, or waiting for
+    the one already running; the caller should ask Gmail directly instead.
+    """
+
+
+class GmailMirror:
+    """
+    Local SQLite copy of one user's mailbox, with an FTS5 index over the
+    subject, sender and decoded body of every message.
+
+    The first sync copies the newest GMAIL_MIRROR_MAX_MESSAGES messages;
+    later syncs replay only what changed since the stored historyId. If that
+    history has expired, the mirror is rebuilt with a full sync.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        # Held for a whole sync so two syncs never interleave
+        self._sync_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id TEXT PRIMARY KEY,"
+            " thread_id TEXT,"
+            " internal_date INTEGER NOT NULL,"
+            " subject TEXT NOT NULL,"
+            " sender TEXT NOT NULL,"
+            " date TEXT NOT NULL,"
+            " snippet TEXT NOT NULL,"
+            " labels TEXT NOT NULL,"
+            " body TEXT NOT NULL DEFAULT '')"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_date ON messages (internal_date)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if "body" not in [col[1] for col in self._db.execute("PRAGMA table_info(messages)")]:
+            # Mirrors from before bodies were indexed: empty it (before the
+            # index exists) so the next sync refetches every body
+            self._db.execute("ALTER TABLE messages ADD COLUMN body TEXT NOT NULL DEFAULT ''")
+            self._db.execute("DELETE FROM messages")
+            self._db.execute("DELETE FROM state WHERE key = 'history_id'")
+        # Full-text index over the messages table, kept in step by triggers
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+            " subject, sender, body, content='messages', content_rowid='rowid',"
+            " tokenize='unicode61 remove_diacritics 2')"
+        )
+        self._db.executescript("""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, subject, sender, body)
+                VALUES (new.rowid, new.subject, new.sender, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, subject, sender, body)
+                VALUES ('delete', old.rowid, old.subject, old.sender, old.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF subject, sender, body ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, subject, sender, body)
+                VALUES ('delete', old.rowid, old.subject, old.sender, old.body);
+                INSERT INTO messages_fts (rowid, subject, sender, body)
+                VALUES (new.rowid, new.subject, new.sender, new.body);
+            END;
+        """)
+        self._db.commit()
+
+    # -- state ----------------------------------------------------------------
+
+    def _get_state(self, key: str):
+        row = self._db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value):
+        self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def history_id(self):
+        with self._lock:
+            return self._get_state("history_id")
+
+    @property
+    def synced(self) -> bool:
+        return self.history_id is not None
+
+    @property
+    def age(self) -> float:
+        """
+        Seconds since the last successful sync (infinite if never synced).
+        """
+        with self._lock:
+            last = self._get_state("last_sync")
+        return time.time() - float(last) if last else float("inf")
+
+    # -- writes ---------------------------------------------------------------
+
+    def _upsert(self, messages):
+        rows = []
+        for message in messages:
+            email = summarize(message)
+            # Metadata-only payloads have no body parts and decode to ""
+            body = decode_body(message.get("payload", {}))
+            rows.append((
+                email["id"], email["thread_id"], email["internal_date"], email["subject"],
+                email["from"], email["date"], email["snippet"], json.dumps(email["labels"]),
+                body[:GMAIL_INDEX_BODY_CHARS],
+            ))
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete
+        # would skip the index triggers
+        self._db.executemany(
+            "INSERT INTO messages"
+            " (id, thread_id, internal_date, subject, sender, date, snippet, labels, body)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET"
+            " thread_id = excluded.thread_id, internal_date = excluded.internal_date,"
+            " subject = excluded.subject, sender = excluded.sender, date = excluded.date,"
+            " snippet = excluded.snippet, labels = excluded.labels, body = excluded.body",
+            rows,
+        )
+        return [row[0] for row in rows]
+
+    def _delete(self, message_ids):
+        self._db.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in message_ids])
+
+    def _set_labels(self, labels_by_id: dict):
+        self._db.executemany(
+            "UPDATE messages SET labels = ? WHERE id = ?",
+            [(json.dumps(labels), message_id) for message_id, labels in labels_by_id.items()],
+        )
+
+    def _fetch(self, service, message_ids) -> list:
+        if GMAIL_INDEX_BODIES:
+            # The full format carries the headers too, so one fetch covers both
+            return fetch_messages(service, list(message_ids), format="full", fields=BODY_FIELDS)
+        return fetch_messages(
+            service, list(message_ids),
+            format="metadata", metadataHeaders=METADATA_HEADERS, fields=METADATA_FIELDS,
+        )
+
+    # -- sync -----------------------------------------------------------------
+
+    def full_sync(self, service) -> dict:
+        """
+        Replace the mirror with the newest messages in the mailbox.
+        """
+        # Taken first, so changes made while listing show up in the next
+        # incremental sync
+        history_id = service.users().getProfile(userId="me").execute()["historyId"]
+        message_ids, page_token = [], None
+        while len(message_ids) < GMAIL_MIRROR_MAX_MESSAGES:
+            page = service.users().messages().list(
+                userId="me", maxResults=min(500, GMAIL_MIRROR_MAX_MESSAGES - len(message_ids)),
+                pageToken=page_token, fields=LIST_FIELDS,
+            ).execute()
+            message_ids += [m["id"] for m in page.get("messages", [])]
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+        messages = self._fetch(service, message_ids)
+        with self._lock:
+            self._db.execute("DELETE FROM messages")
+            stored = self._upsert(messages)
+            self._set_state("history_id", history_id)
+            self._set_state("last_sync", time.time())
+            self._db.commit()
+        print(f"[DEBUG] Gmail full sync: {len(stored)} messages, historyId {history_id}")
+        return {"mode": "full", "added": len(stored), "deleted": 0, "relabeled": 0}
+
+    def incremental_sync(self, service, full: bool = True) -> dict:
+        """
+        Apply the changes recorded since the stored historyId.
+
+        If Gmail no longer has that history, a full sync runs instead, or
+        SyncDeferred is raised when *full* is False.
+        """
+        start = self.history_id
+        added, deleted, relabeled = [], set(), {}
+        history_id, page_token = start, None
+        try:
+            while True:
+                page = service.users().history().list(
+                    userId="me", startHistoryId=start, historyTypes=HISTORY_TYPES,
+                    pageToken=page_token, fields=HISTORY_FIELDS,
+                ).execute()
+                for record in page.get("history", []):
+                    for item in record.get("messagesAdded", []):
+                        added.append(item["message"]["id"])
+                    for item in record.get("messagesDeleted", []):
+                        deleted.add(item["message"]["id"])
+                    for kind in ("labelsAdded", "labelsRemoved"):
+                        for item in record.get(kind, []):
+                            relabeled[item["message"]["id"]] = item["message"].get("labelIds", [])
+                history_id = page.get("historyId", history_id)
+                page_token = page.get("nextPageToken")
+                if not page_token:
+                    break
+        except Exception as e:
+            if _status(e) == 404:
+                # The stored historyId is too old for Gmail to replay
+                if not full:
+                    raise SyncDeferred("Gmail history expired; the mirror needs a full sync") from e
+                print("[DEBUG] Gmail history expired, running a full sync")
+                return self.full_sync(service)
+            raise
+
+        added = [i for i in dict.fromkeys(added) if i not in deleted]
+        messages = self._fetch(service, added) if added else []
+        with self._lock:
+            stored = self._upsert(messages)
+            self._delete(deleted)
+            # Freshly fetched messages already carry their current labels
+            self._set_labels({k: v for k, v in relabeled.items() if k not in deleted and k not in stored})
+            self._set_state("history_id", history_id)
+            self._set_state("last_sync", time.time())
+            self._db.commit()
+        print(f"[DEBUG] Gmail incremental sync: +{len(stored)} -{len(deleted)} "
+              f"~{len(relabeled)} (historyId {start} -> {history_id})")
+        return {"mode": "incremental", "added": len(stored), "deleted": len(deleted), "relabeled": len(relabeled)}
+
+    def sync(self, service, full: bool = True) -> dict:
+        """
+        Bring the mirror up to date: incremental if possible, else full.
+
+        With *full* False only a cheap incremental sync is attempted, for
+        callers that are waiting on the answer: SyncDeferred is raised if
+        that isn't possible, or if another sync is already running.
+        """
+        if not self._sync_lock.acquire(blocking=full):
+            raise SyncDeferred("a background Gmail sync is running")
+        try:
+            if self.synced:
+                return self.incremental_sync(service, full=full)
+            if not full:
+                raise SyncDeferred("the mirror has not been built yet")
+            return self.full_sync(service)
+        finally:
+            self._sync_lock.release()
+
+    # -- reads ----------------------------------------------------------------
+
+    def _row_to_email(self, row) -> dict:
+        message_id, thread_id, internal_date, subject, sender, date, snippet, labels = row
+        return {
+            "id": message_id, "thread_id": thread_id, "internal_date": internal_date,
+            "subject": subject, "from": sender, "date": date, "snippet": snippet,
+            "labels": json.loads(labels),
+        }
+
+    def latest(self, n: int, label: str = "INBOX") -> list:
+        """
+        The *n* newest messages carrying *label* (any label if None).
+        """
+        query = "SELECT id, thread_id, internal_date, subject, sender, date, snippet, labels FROM messages"
+        params = []
+        if label:
+            # Labels are stored as a JSON list, so quote the match
+            query += " WHERE labels LIKE ?"
+            params.append(f'%"{label}"%')
+        query += " ORDER BY internal_date DESC LIMIT ?"
+        params.append(n)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [self._row_to_email(row) for row in rows]
+
+    def search(self, query: SearchQuery, n: int) -> list:
+        """
+        The *n* best matches for *query*, ranked by bm25 (newest first when
+        the query is only filters). Body matches carry an "excerpt".
+        """
+        columns = "m.id, m.thread_id, m.internal_date, m.subject, m.sender, m.date, m.snippet, m.labels"
+        where, params = [], []
+        match = query.match_expression()
+        if match:
+            sql = (f"SELECT {columns}, snippet(messages_fts, 2, '', '', '…', 16) FROM messages_fts"
+                   " JOIN messages m ON m.rowid = messages_fts.rowid")
+            where.append("messages_fts MATCH ?")
+            params.append(match)
+            order = "bm25(messages_fts, ?, ?, ?), m.internal_date DESC"
+        else:
+            sql = f"SELECT {columns}, '' FROM messages m"
+            order = "m.internal_date DESC"
+        if query.label:
+            where.append("m.labels LIKE ?")
+            params.append(f'%"{query.label}"%')
+        if query.after is not None:
+            where.append("m.internal_date >= ?")
+            params.append(query.after)
+        if query.before is not None:
+            where.append("m.internal_date < ?")
+            params.append(query.before)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        if match:
+            params += BM25_WEIGHTS
+        params.append(n)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        emails = []
+        for row in rows:
+            email = self._row_to_email(row[:-1])
+            email["excerpt"] = row[-1]
+            emails.append(email)
+        return emails
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+
+class GmailSyncScheduler:
+    """
+    Daemon thread that syncs every watched user's mirror on a schedule and
+    whenever a sync is requested.
+    """
+
+    def __init__(self, interval: float = GMAIL_SYNC_INTERVAL):
+        self.interval = interval
+        self._users = {}  # user id -> time of last sync attempt
+        self._requested = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _sync_user(self, user_id: str):
+        mirror = get_gmail_mirror(user_id)
+        try:
+            # Its own service: a full sync can take a while, and tool calls
+            # for the same user shouldn't wait behind it
+            with get_gmail_clients().background_service(user_id) as service:
+                mirror.sync(service)
+        except GmailAuthRequired as e:
+            # Nothing to sync until the user logs in and asks again
+            with self._lock:
+                self._users.pop(user_id, None)
+            print(f"[DEBUG] Gmail sync for {user_id} skipped: {e}")
+        except Exception as e:
+            print(f"[DEBUG] Gmail sync for {user_id} failed: {e}")
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                due = [u for u, last in self._users.items() if u in self._requested or now - last >= self.interval]
+                self._requested.difference_update(due)
+                for user_id in due:
+                    self._users[user_id] = now
+            for user_id in due:
+                self._sync_user(user_id)
+
+    def request_sync(self, user_id: str = None):
+        """
+        Sync *user_id* soon, in the background, and keep it on the schedule.
+        """
+        user_id = user_id or GMAIL_USER_ID
+        with self._lock:
+            self._users.setdefault(user_id, 0.0)
+            self._requested.add(user_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="gmail-sync", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+
+def mirror_path(user_id: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.@-]", "_", user_id)
+    return os.path.join(GMAIL_MIRROR_DIR, f"{safe}.sqlite3")
+
+
+_mirrors = {}
+_scheduler = None
+_mirrors_lock = threading.Lock()
+
+
+def get_gmail_mirror(user_id: str = None) -> GmailMirror:
+    """
+    Return *user_id*'s mailbox mirror, opening it on first use.
+    """
+    user_id = user_id or GMAIL_USER_ID
+    with _mirrors_lock:
+        if user_id not in _mirrors:
+            _mirrors[user_id] = GmailMirror(mirror_path(user_id))
+        return _mirrors[user_id]
+
+
+def get_sync_scheduler() -> GmailSyncScheduler:
+    global _scheduler
+    with _mirrors_lock:
+        if _scheduler is None:
+            _scheduler = GmailSyncScheduler()
+    return _scheduler
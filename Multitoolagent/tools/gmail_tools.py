@@ -1,97 +1,213 @@
-import os.path
-import base64
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import os
+from contextlib import ExitStack, contextmanager
 from googleapiclient.errors import HttpError
 from google.adk.tools import FunctionTool
 
-# If modifying these scopes, delete the file /Users/mrunmayeerane/Desktop/hackathon/weavehacks_dynamove/Multitoolagent/tools/token.json.
-SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
+from .compaction import compact_output
+from .gmail_client import get_gmail_clients
+from .gmail_fetch import (
+    BODY_FIELDS, LIST_FIELDS, METADATA_FIELDS, METADATA_HEADERS, PhaseTimer, decode_body, fetch_messages, summarize,
+)
+from .gmail_mirror import (
+    GMAIL_MIRROR, GMAIL_MIRROR_MAX_AGE, SearchQuery, SyncDeferred, get_gmail_mirror, get_sync_scheduler,
+)
+from .singleflight import coalesce
 
-def get_latest_emails():
+# Emails listed when the caller doesn't ask for a number, and the most allowed
+GMAIL_MAX_RESULTS = int(os.getenv("GMAIL_MAX_RESULTS", "10"))
+GMAIL_MAX_RESULTS_LIMIT = int(os.getenv("GMAIL_MAX_RESULTS_LIMIT", "50"))
+# Characters of an opened email's body returned
+GMAIL_BODY_MAX_CHARS = int(os.getenv("GMAIL_BODY_MAX_CHARS", "4000"))
+
+@contextmanager
+def _gmail_service(timer: PhaseTimer):
+    # Cached per user: only the first call pays for auth and building
+    with ExitStack() as stack:
+        with timer.phase("client"):
+            service = stack.enter_context(get_gmail_clients().service())
+        yield service
+
+def _list_from_api(max_results: int, timer: PhaseTimer, **list_kwargs) -> list:
+    with _gmail_service(timer) as service:
+        with timer.phase("list"):
+            results = service.users().messages().list(
+                userId="me", maxResults=max_results, fields=LIST_FIELDS, **list_kwargs
+            ).execute()
+        messages = results.get("messages", [])
+        if not messages:
+            return []
+
+        # One batched round-trip for all the details instead of one per
+        # email, and only the three headers and the snippet of each
+        with timer.phase("fetch"):
+            details = fetch_messages(
+                service, [message["id"] for message in messages],
+                format="metadata", metadataHeaders=METADATA_HEADERS, fields=METADATA_FIELDS,
+            )
+    return [summarize(msg) for msg in details]
+
+def _fresh_mirror(timer: PhaseTimer):
+    # None means the mirror can't answer yet and the API has to
+    if not GMAIL_MIRROR:
+        return None
+    mirror = get_gmail_mirror()
+    scheduler = get_sync_scheduler()
+    if not mirror.synced:
+        # Build the mirror in the background for the next call
+        scheduler.request_sync()
+        return None
+    if mirror.age > GMAIL_MIRROR_MAX_AGE:
+        # Too far behind to serve as is. An incremental sync is cheap; a
+        # rebuild isn't, so that is left to the scheduler and the API answers
+        try:
+            with _gmail_service(timer) as service, timer.phase("sync"):
+                mirror.sync(service, full=False)
+        except SyncDeferred as e:
+            print(f"[DEBUG] Gmail mirror skipped: {e}")
+            scheduler.request_sync()
+            return None
+    else:
+        scheduler.request_sync()
+    return mirror
+
+def _format_emails(title: str, emails: list) -> str:
+    email_summaries = []
+    email_summaries.append(f"📧 **{title}:**\n")
+
+    for i, email in enumerate(emails):
+        email_summaries.append(f"**{i}. {email['subject']}**")
+        email_summaries.append(f"   👤 From: {email['from']}")
+        email_summaries.append(f"   📅 Date: {email['date']}")
+        email_summaries.append(f"   📝 Preview: {email.get('excerpt') or email['snippet']}")
+        email_summaries.append(f"   🆔 ID: {email['id']}")
+        email_summaries.append("")
+
+    return "\n".join(email_summaries)
+
+@coalesce("get_latest_emails")
+@compact_output()
+def get_latest_emails(max_results: int = GMAIL_MAX_RESULTS):
     """
     Get the user's latest emails from Gmail.
     
+    Only the subject, sender, date and a short preview are fetched; use
+    open_email with an email's ID to read the whole message.
+    
+    Args:
+        max_results: How many of the most recent inbox emails to return
+    
     Returns:
         String with formatted email information
     """
-    creds = None
-    # The file /Users/mrunmayeerane/Desktop/hackathon/weavehacks_dynamove/Multitoolagent/tools/token.json stores the user's access and refresh tokens, and is
-    # created automatically when the authorization flow completes for the first
-    # time.
-    if os.path.exists("/Users/mrunmayeerane/Desktop/hackathon/weavehacks_dynamove/Multitoolagent/tools/token.json"):
-        creds = Credentials.from_authorized_user_file("/Users/mrunmayeerane/Desktop/hackathon/weavehacks_dynamove/Multitoolagent/tools/token.json", SCOPES)
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+    max_results = max(1, min(int(max_results), GMAIL_MAX_RESULTS_LIMIT))
+    timer = PhaseTimer()
+
+    try:
+        mirror = _fresh_mirror(timer)
+        if mirror is not None:
+            with timer.phase("mirror"):
+                emails = mirror.latest(max_results, label="INBOX")
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "/Users/mrunmayeerane/Desktop/hackathon/weavehacks_dynamove/Multitoolagent/tools/credentials.json", SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open("/Users/mrunmayeerane/Desktop/hackathon/weavehacks_dynamove/Multitoolagent/tools/token.json", "w") as token:
-            token.write(creds.to_json())
+            emails = _list_from_api(max_results, timer, labelIds=["INBOX"])
+
+        if not emails:
+            return "No messages found in inbox."
+
+        return _format_emails(f"Latest {len(emails)} emails", emails)
+
+    except HttpError as error:
+        return f"❌ Gmail API error: {error}"
+    except Exception as error:
+        return f"❌ Unexpected error: {error}"
+    finally:
+        print(f"[DEBUG] get_latest_emails timings: {timer.summary()}")
+
+@coalesce("search_emails")
+@compact_output()
+def search_emails(query: str, n: int = GMAIL_MAX_RESULTS):
+    """
+    Search the user's emails, best matches first.
+    
+    Words are matched against the subject, sender and body. Filters:
+    from:, subject:, label: (or in:), is:unread / is:starred,
+    after: and before: with a YYYY-MM-DD date, and newer_than: /
+    older_than: with an age such as 7d or 2w.
+    
+    Args:
+        query: e.g. "reservation friday", "from:john@example.com after:2025-07-01"
+        n: How many matching emails to return
+    
+    Returns:
+        String with the matching emails; use open_email with an ID for the full text
+    """
+    n = max(1, min(int(n), GMAIL_MAX_RESULTS_LIMIT))
+    timer = PhaseTimer()
 
     try:
-        # Call the Gmail API
-        service = build("gmail", "v1", credentials=creds)
+        mirror = _fresh_mirror(timer)
+        if mirror is not None:
+            # Answered from the local full-text index
+            with timer.phase("search"):
+                emails = mirror.search(SearchQuery(query), n)
+        else:
+            # Gmail understands the same filter syntax
+            emails = _list_from_api(n, timer, q=query)
 
-        # List the 10 most recent messages
-        results = service.users().messages().list(userId="me", labelIds=['INBOX'], maxResults=10).execute()
-        messages = results.get("messages", [])
+        if not emails:
+            return f"No emails match \"{query}\"."
 
-        if not messages:
-            return "No messages found in inbox."
-        
-        email_summaries = []
-        email_summaries.append(f"📧 **Latest {len(messages)} emails:**\n")
-
-        for i, message in enumerate(messages):
-            msg = service.users().messages().get(userId="me", id=message["id"]).execute()
-            
-            # Get the From and Subject headers
-            headers = msg['payload']['headers']
-            subject = next((header['value'] for header in headers if header['name'] == 'Subject'), 'No Subject')
-            from_sender = next((header['value'] for header in headers if header['name'] == 'From'), 'Unknown Sender')
-            date = next((header['value'] for header in headers if header['name'] == 'Date'), 'Unknown Date')
-
-            # Get the message body
-            body_text = "No body content available"
-            if 'parts' in msg['payload']:
-                parts = msg['payload']['parts']
-                if parts and 'body' in parts[0] and 'data' in parts[0]['body']:
-                    data = parts[0]['body']['data']
-                    data = data.replace("-","+").replace("_","/")
-                    decoded_data = base64.b64decode(data)
-                    body_text = decoded_data.decode('utf-8').strip()
-            elif 'body' in msg['payload'] and 'data' in msg['payload']['body']:
-                data = msg['payload']['body']['data']
-                data = data.replace("-","+").replace("_","/")
-                decoded_data = base64.b64decode(data)
-                body_text = decoded_data.decode('utf-8').strip()
-            
-            # Truncate body if too long
-            if len(body_text) > 300:
-                body_text = body_text[:300] + "..."
-
-            email_summaries.append(f"**{i}. {subject}**")
-            email_summaries.append(f"   �� From: {from_sender}")
-            email_summaries.append(f"   📅 Date: {date}")
-            email_summaries.append(f"   📝 Body: {body_text}")
-            email_summaries.append("")
-
-        return "\n".join(email_summaries)
+        return _format_emails(f"{len(emails)} emails matching \"{query}\"", emails)
+
+    except HttpError as error:
+        return f"❌ Gmail API error: {error}"
+    except Exception as error:
+        return f"❌ Unexpected error: {error}"
+    finally:
+        print(f"[DEBUG] search_emails timings: {timer.summary()}")
+
+# Not compacted: the agent asked for the whole email, and the body is
+# already capped at GMAIL_BODY_MAX_CHARS
+@coalesce("open_email")
+def open_email(message_id: str):
+    """
+    Read one email in full.
+    
+    Args:
+        message_id: The email's ID, as listed by get_latest_emails or search_emails
+    
+    Returns:
+        The email's headers and its decoded text body
+    """
+    timer = PhaseTimer()
+    try:
+        with _gmail_service(timer) as service, timer.phase("fetch"):
+            msg = service.users().messages().get(
+                userId="me", id=message_id.strip(), format="full", fields=BODY_FIELDS
+            ).execute()
+        # The body is only decoded for emails that are actually opened
+        with timer.phase("decode"):
+            body_text = decode_body(msg.get("payload", {})) or msg.get("snippet") or "No body content available"
+        if len(body_text) > GMAIL_BODY_MAX_CHARS:
+            body_text = body_text[:GMAIL_BODY_MAX_CHARS] + "..."
+        email = summarize(msg)
+        return "\n".join([
+            f"📧 **{email['subject']}**",
+            f"👤 From: {email['from']}",
+            f"📅 Date: {email['date']}",
+            "",
+            body_text,
+        ])
 
     except HttpError as error:
         return f"❌ Gmail API error: {error}"
     except Exception as error:
         return f"❌ Unexpected error: {error}"
+    finally:
+        print(f"[DEBUG] open_email timings: {timer.summary()}")
     
 GmailLatestEmailsTool = FunctionTool(get_latest_emails)
+GmailOpenEmailTool = FunctionTool(open_email)
+GmailSearchTool = FunctionTool(search_emails)
 
 if __name__ == "__main__":
     print(get_latest_emails())
\ No newline at end of file
@@ -0,0 +1,229 @@
+import re
+from html.parser import HTMLParser
+
+# selectolax (lexbor backend) is several times faster than html.parser on
+# large pages
+try:
+    from selectolax.lexbor import LexborHTMLParser as FastHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+# Never readable content
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "canvas"}
+# Page chrome rather than content
+BOILERPLATE_TAGS = {"nav", "footer", "aside"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "tr", "td", "th", "table",
+    "pre", "blockquote", "dd", "dt", "dl", "br", "hr", "header",
+} | HEADING_TAGS
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "track", "wbr"}
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "get", "give", "how", "i",
+    "in", "is", "it", "me", "of", "on", "or", "page", "please", "show", "that", "the", "this",
+    "to", "what", "when", "where", "which", "with", "find", "extract", "list", "tell", "about",
+}
+
+
+class Section:
+    """
+    A heading and the text that follows it up to the next heading.
+    """
+
+    def __init__(self, heading: str = "", level: int = 0):
+        self.heading = heading
+        self.level = level
+        self.lines = []
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def to_list(self) -> list:
+        return [self.heading, self.level, self.text]
+
+    @classmethod
+    def from_list(cls, data) -> "Section":
+        section = cls(data[0], data[1])
+        section.lines = data[2].split("\n") if data[2] else []
+        return section
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _SectionParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.sections = [Section()]
+        self._skip_depth = 0
+        self._in_title = False
+        self._heading = None
+        self._buffer = []
+
+    def _flush(self):
+        text = _clean("".join(self._buffer))
+        self._buffer = []
+        if not text:
+            return
+        if self._heading is not None:
+            self._heading.append(text)
+        else:
+            self.sections[-1].lines.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag in SKIP_TAGS or tag in BOILERPLATE_TAGS:
+            if tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in HEADING_TAGS:
+            self._heading = []
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag in SKIP_TAGS or tag in BOILERPLATE_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in HEADING_TAGS and self._heading is not None:
+            heading = _clean(" ".join(self._heading))
+            self._heading = None
+            if heading:
+                self.sections.append(Section(heading, int(tag[1])))
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._buffer.append(data)
+
+
+def _sections_stdlib(html: str):
+    parser = _SectionParser()
+    parser.feed(html)
+    parser.close()
+    parser._flush()
+    return _clean(parser.title), parser.sections
+
+
+def _sections_selectolax(html: str):
+    tree = FastHTMLParser(html)
+    title_node = tree.css_first("title")
+    title = _clean(title_node.text()) if title_node else ""
+    tree.strip_tags(list(SKIP_TAGS | BOILERPLATE_TAGS))
+    root = tree.body or tree.root
+    sections = [Section()]
+    if root is None:
+        return title, sections
+    # Text nodes sharing their nearest block element form one line
+    current, heading_level, buffer = None, 0, []
+
+    def flush():
+        text = _clean("".join(buffer))
+        buffer.clear()
+        if not text:
+            return
+        if heading_level:
+            sections.append(Section(text, heading_level))
+        else:
+            sections[-1].lines.append(text)
+
+    for node in root.traverse(include_text=True):
+        if node.tag != "-text":
+            continue
+        block = node.parent
+        while block is not None and block.tag not in BLOCK_TAGS and block.mem_id != root.mem_id:
+            block = block.parent
+        block_id = block.mem_id if block is not None else None
+        if block_id != current:
+            flush()
+            current = block_id
+            heading_level = int(block.tag[1]) if block is not None and block.tag in HEADING_TAGS else 0
+        buffer.append(node.text(deep=False))
+    flush()
+    return title, sections
+
+
+def html_to_sections(html: str):
+    """
+    Split an HTML page into readable sections.
+
+    Scripts, styles and page chrome (nav, footer, aside) are dropped.
+
+    Returns:
+        (page title, [Section]); the first section holds any text before the
+        first heading and may be empty
+    """
+    if SELECTOLAX_AVAILABLE:
+        return _sections_selectolax(html)
+    return _sections_stdlib(html)
+
+
+def _keywords(instruction: str) -> set:
+    words = re.findall(r"[a-z0-9]+", (instruction or "").lower())
+    return {w for w in words if len(w) > 2 and w not in _STOPWORDS}
+
+
+def _score(section: Section, keywords: set) -> float:
+    if not keywords:
+        return 0.0
+    heading_words = set(re.findall(r"[a-z0-9]+", section.heading.lower()))
+    body = section.text.lower()
+    score = 3.0 * len(keywords & heading_words)
+    score += sum(min(body.count(word), 5) for word in keywords)
+    return score
+
+
+def extract_sections(sections, instruction: str, max_chars: int) -> list:
+    """
+    Pick the sections that best match *instruction*, within *max_chars*.
+
+    Sections mentioning the instruction's keywords (headings count triple)
+    win; when nothing matches, the page is read from the top. The result is
+    in document order.
+    """
+    keywords = _keywords(instruction)
+    candidates = [(i, s) for i, s in enumerate(sections) if s.heading or s.lines]
+    ranked = sorted(candidates, key=lambda item: (-_score(item[1], keywords), item[0]))
+    matched = bool(ranked) and _score(ranked[0][1], keywords) > 0
+    if not matched:
+        ranked = candidates
+    chosen, used = [], 0
+    for index, section in ranked:
+        if matched and _score(section, keywords) == 0:
+            break
+        size = len(section.heading) + len(section.text) + 4
+        if used + size > max_chars:
+            if not chosen:
+                chosen.append((index, section))  # Trimmed by the caller
+            continue
+        chosen.append((index, section))
+        used += size
+    return [section for _, section in sorted(chosen, key=lambda item: item[0])]
+
+
+def render_sections(sections, max_chars: int) -> str:
+    parts = []
+    for section in sections:
+        if section.heading:
+            parts.append(f"{'#' * max(section.level, 1)} {section.heading}")
+        if section.lines:
+            parts.append(section.text)
+    text = "\n".join(parts)
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + " …"
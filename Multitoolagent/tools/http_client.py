@@ -0,0 +1,103 @@
+import os
+import httpx
+
+from .io_loop import on_io_loop, run_on_io_loop
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.getenv("HTTP2_ENABLED", "1") != "0"
+
+_async_client = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the shared keep-alive AsyncClient. Must be called on the IO loop.
+    """
+    global _async_client
+    if not on_io_loop():
+        raise RuntimeError("get_async_client() must run on the tools IO loop")
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        print(f"[DEBUG] Created pooled HTTP client (http2={HTTP2_ENABLED})")
+    return _async_client
+
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a request through the pooled client from any event loop.
+
+    The response body is read before returning, so the caller never touches
+    the connection from its own loop.
+    """
+    async def _send():
+        return await get_async_client().request(method, url, **kwargs)
+
+    return await run_on_io_loop(_send())
+
+
+async def fetch_capped(method: str, url: str, max_bytes: int, **kwargs):
+    """
+    Stream a response body and stop reading once *max_bytes* have arrived.
+
+    Returns:
+        (response, body bytes, truncated flag). The response is closed; its
+        status and headers are still available.
+    """
+    async def _fetch():
+        async with get_async_client().stream(method, url, **kwargs) as response:
+            chunks = []
+            size = 0
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                remaining = max_bytes - size
+                if len(chunk) > remaining:
+                    chunks.append(chunk[:remaining])
+                    truncated = True
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+            return response, b"".join(chunks), truncated
+
+    return await run_on_io_loop(_fetch())
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+async def aclose():
+    """
+    Close the shared client (e.g. on shutdown).
+    """
+    async def _close():
+        global _async_client
+        if _async_client is not None:
+            await _async_client.aclose()
+            _async_client = None
+
+    await run_on_io_loop(_close())
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import re
+
+from .cache import TTLCache, make_key
+from .dates import parse_date, parse_time
+from .restaurant_store import normalize_name
+from .singleflight import SingleFlight
+
+# How long (seconds) a completed booking is handed back to identical requests
+BOOKING_DEDUP_WINDOW = float(os.getenv("BOOKING_DEDUP_WINDOW", "900"))
+
+
+def _normalize_date(value: str) -> str:
+    try:
+        return parse_date(value).isoformat()
+    except ValueError:
+        return re.sub(r"\s+", " ", value.strip().lower())
+
+
+def _normalize_time(value: str) -> str:
+    try:
+        return parse_time(value).strftime("%H:%M")
+    except ValueError:
+        return re.sub(r"\s+", " ", value.strip().lower())
+
+
+def _normalize_contact(value: str) -> str:
+    value = value.strip().lower()
+    if "@" in value:
+        return value
+    digits = re.sub(r"\D", "", value)
+    # A US number with or without the leading country code
+    return digits[-10:] if len(digits) >= 10 else value
+
+
+def booking_key(restaurant_name: str, date: str, time: str, party_size: int, contact_info: str) -> str:
+    """
+    Key two bookings identically when they ask for the same table.
+
+    "Hino Day A" / "hinodeya", "July 21, 2025" / "2025-07-21" and "7pm" /
+    "7:00 PM" all collapse to the same values.
+    """
+    return make_key(
+        "booking",
+        normalize_name(restaurant_name),
+        _normalize_date(date),
+        _normalize_time(time),
+        int(party_size),
+        _normalize_contact(contact_info),
+    )
+
+
+class IdempotentCall:
+    """
+    Run an operation at most once per key within a time window.
+
+    A duplicate that arrives while the first call is running waits for it
+    (via SingleFlight); one that arrives after it finished gets the stored
+    result back until *window* seconds have passed (via TTLCache). Only
+    results accepted by *store_if* are kept, so failures can be retried.
+    """
+
+    def __init__(self, name: str, window: float, store_if=None, db_path: str = None):
+        self.flight = SingleFlight(name)
+        self.results = TTLCache(name, ttl=window, db_path=db_path)
+        self._store_if = store_if or (lambda result: True)
+
+    async def run(self, key: str, coro_fn):
+        """
+        Returns:
+            (result, how) where how is "fresh", "attached" or "stored"
+        """
+        stored = await asyncio.to_thread(self.results.get, key)
+        if stored is not None:
+            return stored, "stored"
+
+        ran = False
+
+        async def leader():
+            nonlocal ran
+            ran = True
+            # Re-check: an identical call may have finished since our lookup
+            stored = await asyncio.to_thread(self.results.get, key)
+            if stored is not None:
+                return stored
+            result = await coro_fn()
+            if self._store_if(result):
+                await asyncio.to_thread(self.results.set, key, result)
+            return result
+
+        result = await self.flight.do(key, leader)
+        return result, "fresh" if ran else "attached"
+
@@ -0,0 +1,244 @@
+import json
+import os
+from urllib.parse import urlsplit
+
+# Set to 0 to let booking pages load every resource
+BOOKING_INTERCEPTION = os.getenv("BOOKING_INTERCEPTION", "1") != "0"
+# Extra resource types / hosts to block on every platform (comma-separated)
+INTERCEPT_BLOCK_TYPES = os.getenv("INTERCEPT_BLOCK_TYPES", "")
+INTERCEPT_DENY_HOSTS = os.getenv("INTERCEPT_DENY_HOSTS", "")
+# Per-platform overrides as JSON, e.g.
+# {"Resy": {"block_types": ["image", "font"], "allow_hosts": ["hotjar.com"]}}
+INTERCEPT_POLICIES = os.getenv("INTERCEPT_POLICIES", "")
+
+# Resource types nothing in the booking flow needs to see
+DEFAULT_BLOCK_TYPES = ("image", "media", "font")
+
+# Ad, analytics and tag-manager hosts; none of them render the booking widget
+DEFAULT_DENY_HOSTS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "optimizely.com",
+    "newrelic.com",
+    "nr-data.net",
+    "branch.io",
+    "bat.bing.com",
+    "adnxs.com",
+    "criteo.com",
+    "taboola.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+)
+
+# File extensions by resource type, for blocking types inside the browser by
+# URL; types missing here (xhr, fetch, ...) need the slower route handler
+RESOURCE_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico"),
+    "media": ("mp4", "webm", "mov", "mp3", "m4a", "ogg", "wav"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "stylesheet": ("css",),
+    "script": ("js", "mjs"),
+}
+
+# Rough transfer size (bytes) of a blocked response, by resource type; used
+# to estimate what a booking saved since blocked requests are never fetched
+TYPICAL_RESOURCE_BYTES = {
+    "image": 45_000,
+    "media": 400_000,
+    "font": 35_000,
+    "stylesheet": 20_000,
+    "script": 30_000,
+    "xhr": 3_000,
+    "fetch": 3_000,
+}
+DEFAULT_RESOURCE_BYTES = 5_000
+
+
+def _split_env(value: str) -> tuple:
+    return tuple(item.strip().lower() for item in value.split(",") if item.strip())
+
+
+def _host_matches(host: str, patterns) -> bool:
+    return any(host == p or host.endswith("." + p) for p in patterns)
+
+
+class InterceptionPolicy:
+    """
+    Which requests a booking page may make.
+
+    A request is blocked when its resource type is listed, or when its host
+    is denied and not explicitly allowed. The page's own documents are never
+    blocked.
+    """
+
+    def __init__(self, block_types=DEFAULT_BLOCK_TYPES, allow_hosts=(), deny_hosts=DEFAULT_DENY_HOSTS):
+        self.block_types = frozenset(block_types) | frozenset(_split_env(INTERCEPT_BLOCK_TYPES))
+        self.allow_hosts = tuple(allow_hosts)
+        self.deny_hosts = tuple(deny_hosts) + _split_env(INTERCEPT_DENY_HOSTS)
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        if resource_type == "document":
+            return False
+        if resource_type in self.block_types:
+            return True
+        host = (urlsplit(url).hostname or "").lower()
+        return _host_matches(host, self.deny_hosts) and not _host_matches(host, self.allow_hosts)
+
+    def url_patterns(self):
+        """
+        The policy as wildcard URL patterns the browser can match by itself.
+
+        Returns:
+            A list of patterns, or None when the policy can't be put that way
+            (a blocked type with no file extensions, or an allowed host inside
+            a denied one)
+        """
+        patterns = []
+        for kind in sorted(self.block_types):
+            if kind not in RESOURCE_EXTENSIONS:
+                return None
+            for ext in RESOURCE_EXTENSIONS[kind]:
+                patterns += [f"*.{ext}", f"*.{ext}?*"]
+        for host in self.deny_hosts:
+            if _host_matches(host, self.allow_hosts):
+                continue
+            if any(_host_matches(allowed, (host,)) for allowed in self.allow_hosts):
+                return None
+            patterns += [f"*://{host}/*", f"*.{host}/*"]
+        return patterns
+
+
+# Every supported platform embeds a location map next to the booking widget
+MAP_HOSTS = ("maps.googleapis.com", "maps.gstatic.com", "api.mapbox.com")
+
+PLATFORM_POLICIES = {
+    "OpenTable": InterceptionPolicy(deny_hosts=DEFAULT_DENY_HOSTS + MAP_HOSTS),
+    "Resy": InterceptionPolicy(deny_hosts=DEFAULT_DENY_HOSTS + MAP_HOSTS),
+    "Yelp": InterceptionPolicy(deny_hosts=DEFAULT_DENY_HOSTS + MAP_HOSTS),
+}
+if INTERCEPT_POLICIES:
+    for _platform, _config in json.loads(INTERCEPT_POLICIES).items():
+        PLATFORM_POLICIES[_platform] = InterceptionPolicy(
+            block_types=_config.get("block_types", DEFAULT_BLOCK_TYPES),
+            allow_hosts=_config.get("allow_hosts", ()),
+            deny_hosts=tuple(_config.get("deny_hosts", DEFAULT_DENY_HOSTS + MAP_HOSTS)),
+        )
+
+
+def policy_for(platform_name: str) -> InterceptionPolicy:
+    return PLATFORM_POLICIES.get(platform_name) or InterceptionPolicy()
+
+
+class InterceptionReport:
+    """
+    Per-booking tally of what the policy let through and what it blocked.
+    """
+
+    def __init__(self):
+        self.allowed = 0
+        self.blocked = 0
+        self.bytes_saved = 0
+        self.blocked_by_type = {}
+
+    def add(self, resource_type: str, blocked: bool):
+        if not blocked:
+            self.allowed += 1
+            return
+        self.blocked += 1
+        self.bytes_saved += TYPICAL_RESOURCE_BYTES.get(resource_type, DEFAULT_RESOURCE_BYTES)
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+    def summary(self) -> str:
+        if not self.blocked:
+            return "none blocked"
+        kinds = ", ".join(f"{count} {kind}" for kind, count in sorted(self.blocked_by_type.items()))
+        return (
+            f"{self.blocked} of {self.blocked + self.allowed} requests blocked ({kinds}), "
+            f"est. ~{self.bytes_saved / 1024:.0f} KB saved (typical sizes, not measured)"
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "estimated_bytes_saved": self.bytes_saved,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+async def _route(context, policy: InterceptionPolicy, report: InterceptionReport):
+    """
+    Decide every request in a Python route handler. Each one then waits for
+    a round-trip to the driver, so this is only the fallback.
+    """
+    async def handle(route, request):
+        blocked = policy.blocks(request.resource_type, request.url)
+        report.add(request.resource_type, blocked)
+        try:
+            if blocked:
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+        except Exception as e:
+            # The page navigated away or closed while the request was pending
+            print(f"[DEBUG] Route for {request.url} already handled: {e}")
+
+    await context.route("**/*", handle)
+
+
+async def intercept(session, platform_name: str) -> InterceptionReport:
+    """
+    Install the platform's policy on a pooled session's page.
+
+    Blocking happens inside the browser (CDP Network.setBlockedURLs), so
+    requests that are let through never wait on Python; the report is
+    filled in from the request events Playwright streams anyway. Policies
+    that can't be written as URL patterns fall back to a route handler.
+    Either way the pool undoes it when it resets the session.
+
+    Returns:
+        The report that fills in as the page loads
+    """
+    report = InterceptionReport()
+    if not BOOKING_INTERCEPTION:
+        return report
+    policy = policy_for(platform_name)
+    patterns = policy.url_patterns()
+    if patterns is None:
+        await _route(session.context, policy, report)
+        return report
+    try:
+        cdp = await session.context.new_cdp_session(session.page)
+        await cdp.send("Network.enable")
+        await cdp.send("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        # Not a Chromium page
+        print(f"[DEBUG] In-browser blocking unavailable, routing instead: {e}")
+        await _route(session.context, policy, report)
+        return report
+
+    def finished(request):
+        report.add(request.resource_type, False)
+
+    def failed(request):
+        report.add(request.resource_type, "ERR_BLOCKED_BY_CLIENT" in (request.failure or ""))
+
+    page = session.page
+    page.on("requestfinished", finished)
+    page.on("requestfailed", failed)
+
+    async def undo():
+        page.remove_listener("requestfinished", finished)
+        page.remove_listener("requestfailed", failed)
+        await cdp.send("Network.setBlockedURLs", {"urls": []})
+        await cdp.detach()
+
+    session.on_reset(undo)
+    return report
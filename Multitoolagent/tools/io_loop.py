@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+# ADK's Runner.run() spins up a fresh thread + event loop for every agent turn,
+# so anything bound to a loop (httpx.AsyncClient, Playwright) would be thrown
+# away after each turn. Long-lived async resources live on this dedicated loop
+# instead, and callers on any other loop await them through run_on_io_loop().
+
+_io_loop = None
+_io_thread = None
+_io_lock = threading.Lock()
+
+
+def get_io_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the process-wide background event loop, starting it on first use.
+    """
+    global _io_loop, _io_thread
+    with _io_lock:
+        if _io_loop is None or _io_loop.is_closed():
+            _io_loop = asyncio.new_event_loop()
+            _io_thread = threading.Thread(
+                target=_io_loop.run_forever, name="tools-io-loop", daemon=True
+            )
+            _io_thread.start()
+    return _io_loop
+
+
+def on_io_loop() -> bool:
+    """
+    True when the caller is already running on the background loop.
+    """
+    try:
+        return asyncio.get_running_loop() is _io_loop
+    except RuntimeError:
+        return False
+
+
+async def run_on_io_loop(coro):
+    """
+    Await *coro* on the background loop from any other event loop.
+
+    Args:
+        coro: Coroutine object to execute
+
+    Returns:
+        Whatever the coroutine returns
+    """
+    if on_io_loop():
+        return await coro
+    future = asyncio.run_coroutine_threadsafe(coro, get_io_loop())
+    return await asyncio.wrap_future(future)
+
+
+def run_on_io_loop_sync(coro, timeout: float = None):
+    """
+    Blocking variant of run_on_io_loop() for synchronous callers.
+    """
+    if on_io_loop():
+        raise RuntimeError("run_on_io_loop_sync() would deadlock the background loop")
+    future = asyncio.run_coroutine_threadsafe(coro, get_io_loop())
+    return future.result(timeout)
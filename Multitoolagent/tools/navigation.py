@@ -0,0 +1,251 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .cache import cache_db_path
+from .selector_probe import selector_set_for
+
+# Upper bound on a whole navigation, across every strategy tried
+NAVIGATION_BUDGET = float(os.getenv("NAVIGATION_BUDGET", "45"))
+# How long to wait for a reservation element once the page has committed
+NAVIGATION_READY_TIMEOUT = float(os.getenv("NAVIGATION_READY_TIMEOUT", "15"))
+# Weight of the newest sample in the per-domain latency average
+NAVIGATION_LATENCY_ALPHA = 0.3
+# Each time a strategy gets a domain's page ready, the failures of the
+# domain's other strategies shrink by this factor; a demoted strategy whose
+# failures drop below NAVIGATION_RETRY_BELOW is tried first again
+NAVIGATION_FAILURE_DECAY = 0.7
+NAVIGATION_RETRY_BELOW = 0.5
+
+# Elements that mean a booking page is usable
+RESERVATION_SELECTORS = selector_set_for("default").playwright_selectors()
+
+
+class NavigationFailed(Exception):
+    """
+    Every navigation strategy failed or the budget ran out.
+    """
+
+
+class _Strategy:
+    def __init__(self, name, wait_until, timeout, wait_for_ready):
+        self.name = name
+        self.wait_until = wait_until
+        self.timeout = timeout
+        self.wait_for_ready = wait_for_ready
+
+
+# Default order for a domain we know nothing about. "ready" returns as soon
+# as a reservation element is attached; the lifecycle events are fallbacks
+# for pages where none of the selectors match.
+STRATEGIES = (
+    _Strategy("ready", "commit", 30, True),
+    _Strategy("domcontentloaded", "domcontentloaded", 20, False),
+    _Strategy("load", "load", 25, False),
+    _Strategy("networkidle", "networkidle", 30, False),
+)
+_STRATEGIES_BY_NAME = {s.name: s for s in STRATEGIES}
+
+
+def domain_of(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class NavigationStats:
+    """
+    Per-domain success counts and latency averages for each strategy.
+
+    A success is a navigation that left a reservation element on the page;
+    failures (including loads that never became ready) decay as other
+    strategies succeed, so one slow load doesn't demote a strategy for good.
+
+    Kept in memory and written through to SQLite so the ranking survives
+    restarts.
+    """
+
+    def __init__(self, db_path: str = None):
+        self._lock = threading.Lock()
+        self._stats = {}  # (domain, strategy) -> dict
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS navigation_stats ("
+                " domain TEXT NOT NULL,"
+                " strategy TEXT NOT NULL,"
+                " successes INTEGER NOT NULL,"
+                " failures REAL NOT NULL,"
+                " avg_latency REAL NOT NULL,"
+                " PRIMARY KEY (domain, strategy))"
+            )
+            self._db.commit()
+            for domain, strategy, successes, failures, avg_latency in self._db.execute(
+                "SELECT domain, strategy, successes, failures, avg_latency FROM navigation_stats"
+            ):
+                self._stats[(domain, strategy)] = {
+                    "successes": successes,
+                    "failures": failures,
+                    "avg_latency": avg_latency,
+                }
+
+    def record(self, domain: str, strategy: str, ok: bool, latency: float):
+        """
+        Add one navigation attempt; latency only counts towards successes.
+
+        *ok* means the page became ready, not merely that it loaded.
+        """
+        with self._lock:
+            entry = self._stats.setdefault(
+                (domain, strategy), {"successes": 0, "failures": 0, "avg_latency": 0.0}
+            )
+            changed = [(strategy, entry)]
+            if ok:
+                if entry["successes"]:
+                    entry["avg_latency"] += NAVIGATION_LATENCY_ALPHA * (latency - entry["avg_latency"])
+                else:
+                    entry["avg_latency"] = latency
+                entry["successes"] += 1
+                for other in STRATEGIES:
+                    demoted = self._stats.get((domain, other.name))
+                    if other.name != strategy and demoted and demoted["failures"]:
+                        demoted["failures"] *= NAVIGATION_FAILURE_DECAY
+                        changed.append((other.name, demoted))
+            else:
+                entry["failures"] += 1
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO navigation_stats"
+                    " (domain, strategy, successes, failures, avg_latency) VALUES (?, ?, ?, ?, ?)",
+                    [(domain, name, e["successes"], e["failures"], e["avg_latency"]) for name, e in changed],
+                )
+                self._db.commit()
+
+    def ranked(self, domain: str) -> list:
+        """
+        Strategy names for *domain*, most promising first.
+
+        Demoted strategies whose failures have decayed are retried first;
+        then strategies that mostly succeed, fastest average first; untried
+        ones follow in default order; ones that mostly fail go last.
+        """
+        with self._lock:
+            known = {s.name: self._stats.get((domain, s.name)) for s in STRATEGIES}
+        retry, good, untried, bad = [], [], [], []
+        for strategy in STRATEGIES:
+            entry = known[strategy.name]
+            if entry is None:
+                untried.append(strategy.name)
+            elif entry["successes"] >= entry["failures"] and entry["successes"]:
+                good.append((entry["avg_latency"], strategy.name))
+            elif 0 < entry["failures"] < NAVIGATION_RETRY_BELOW:
+                retry.append(strategy.name)
+            else:
+                bad.append(strategy.name)
+        return retry + [name for _, name in sorted(good)] + untried + bad
+
+    def for_domain(self, domain: str) -> dict:
+        with self._lock:
+            return {
+                strategy: dict(entry)
+                for (d, strategy), entry in self._stats.items() if d == domain
+            }
+
+
+async def _attempt(page, url: str, strategy: _Strategy, timeout: float, ready_selector: str) -> bool:
+    """
+    Navigate with one strategy; returns whether a reservation element showed up.
+    """
+    started = time.monotonic()
+    await page.goto(url, wait_until=strategy.wait_until, timeout=timeout * 1000)
+    remaining = timeout - (time.monotonic() - started)
+    ready_timeout = min(NAVIGATION_READY_TIMEOUT, remaining)
+    if not strategy.wait_for_ready:
+        # Already loaded; give the selectors only a short grace period
+        ready_timeout = min(ready_timeout, 2)
+    if ready_timeout <= 0:
+        if strategy.wait_for_ready:
+            raise asyncio.TimeoutError("no time left to wait for the page to become ready")
+        return False
+    try:
+        await page.wait_for_selector(ready_selector, state="attached", timeout=ready_timeout * 1000)
+        return True
+    except Exception:
+        if strategy.wait_for_ready:
+            raise
+        return False
+
+
+async def navigate(page, url: str, stats: NavigationStats = None,
+                   selectors=RESERVATION_SELECTORS, budget: float = NAVIGATION_BUDGET) -> dict:
+    """
+    Load *url* using the strategy that has worked best for its domain.
+
+    Strategies are tried in ranked order until one loads the page, all
+    within *budget* seconds. Every attempt is recorded in *stats*, as a
+    success only if a reservation element showed up.
+
+    Returns:
+        {"strategy", "title", "ready", "elapsed", "attempts"} where "ready"
+        says whether a reservation element was found
+
+    Raises:
+        NavigationFailed: if no strategy loaded the page in time
+    """
+    if stats is None:
+        stats = await asyncio.to_thread(get_navigation_stats)
+    domain = domain_of(url)
+    ready_selector = ", ".join(selectors)
+    started = time.monotonic()
+    attempts = []
+    for name in stats.ranked(domain):
+        strategy = _STRATEGIES_BY_NAME[name]
+        remaining = budget - (time.monotonic() - started)
+        if remaining <= 1:
+            break
+        timeout = min(strategy.timeout, remaining)
+        print(f"[DEBUG] Navigating to {domain} with strategy {name} (timeout {timeout:.0f}s)...")
+        attempt_started = time.monotonic()
+        try:
+            ready = await _attempt(page, url, strategy, timeout, ready_selector)
+        except Exception as e:
+            latency = time.monotonic() - attempt_started
+            print(f"[DEBUG] Strategy {name} failed after {latency:.1f}s: {e}")
+            attempts.append(name)
+            await asyncio.to_thread(stats.record, domain, name, False, latency)
+            continue
+        latency = time.monotonic() - attempt_started
+        attempts.append(name)
+        await asyncio.to_thread(stats.record, domain, name, ready, latency)
+        title = await page.title()
+        print(f"[DEBUG] Strategy {name} loaded in {latency:.1f}s (ready: {ready}). Page title: {title}")
+        return {
+            "strategy": name,
+            "title": title,
+            "ready": ready,
+            "elapsed": time.monotonic() - started,
+            "attempts": attempts,
+        }
+    raise NavigationFailed(
+        f"{domain} did not load with {', '.join(attempts) or 'any strategy'} "
+        f"within {budget:.0f}s"
+    )
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_navigation_stats() -> NavigationStats:
+    """
+    Return the process-wide navigation stats, opening them on first use.
+    """
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = NavigationStats(cache_db_path("navigation.sqlite3"))
+    return _stats
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+
+from . import http_client
+from .cache import TTLCache, cache_db_path, make_key
+from .html_extract import Section, extract_sections, html_to_sections, render_sections
+
+# Stop reading a page after this many bytes
+NAVIGATE_MAX_BYTES = int(os.getenv("NAVIGATE_MAX_BYTES", str(512 * 1024)))
+# Characters of extracted text handed back to the agent
+NAVIGATE_MAX_CHARS = int(os.getenv("NAVIGATE_MAX_CHARS", "4000"))
+# Pages without ETag/Last-Modified are reused without asking for this long
+PAGE_FRESH_FOR = float(os.getenv("PAGE_FRESH_FOR", "300"))
+# How long parsed pages (and their validators) are kept at all
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", str(24 * 60 * 60)))
+
+PAGE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; Dynamove/1.0)",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5",
+    "Accept-Language": "en-US,en;q=0.8",
+}
+
+# Parsed pages with their validators, never the raw HTML
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> TTLCache:
+    """
+    Return the parsed-page cache, opening it on first use.
+    """
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = TTLCache(
+                "pages",
+                ttl=PAGE_CACHE_TTL,
+                max_entries=128,
+                db_path=cache_db_path() if os.getenv("EXA_CACHE_DISK", "1") != "0" else None,
+            )
+    return _page_cache
+
+
+def _charset(content_type: str, head: bytes) -> str:
+    match = re.search(r"charset=([\w-]+)", content_type, re.I)
+    if not match:
+        match = re.search(rb"<meta[^>]+charset=[\"']?([\w-]+)", head[:2048], re.I)
+        if match:
+            return match.group(1).decode("ascii")
+        return "utf-8"
+    return match.group(1)
+
+
+def _decode(body: bytes, content_type: str) -> str:
+    charset = _charset(content_type, body)
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _parse_page(body: bytes, content_type: str) -> dict:
+    """
+    Turn a response body into {"title", "sections"} (sections as lists).
+    """
+    text = _decode(body, content_type)
+    if "html" in content_type or not content_type:
+        title, sections = html_to_sections(text)
+    elif "json" in content_type:
+        try:
+            text = json.dumps(json.loads(text), indent=1)
+        except ValueError:
+            pass  # Truncated JSON is still readable as text
+        title, sections = "", [Section()]
+        sections[0].lines = text.splitlines()
+    else:
+        title, sections = "", [Section()]
+        sections[0].lines = [line for line in text.splitlines() if line.strip()]
+    return {"title": title, "sections": [s.to_list() for s in sections]}
+
+
+async def fetch_page(url: str) -> dict:
+    """
+    Fetch and parse a page, revalidating a cached copy with a conditional GET.
+
+    Returns:
+        {"url", "status", "title", "sections", "truncated", "bytes",
+        "cached"}; sections are [heading, level, text] lists and "cached"
+        says whether the parsed copy was reused (fresh or 304)
+    """
+    key = make_key("page", url)
+    page_cache = await asyncio.to_thread(get_page_cache)
+    cached = await asyncio.to_thread(page_cache.get, key)
+    headers = dict(PAGE_HEADERS)
+    if cached:
+        has_validators = cached.get("etag") or cached.get("last_modified")
+        if not has_validators and time.time() - cached["fetched_at"] < PAGE_FRESH_FOR:
+            return dict(cached, cached=True, bytes=0)
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    response, body, truncated = await http_client.fetch_capped(
+        "GET", url, NAVIGATE_MAX_BYTES, headers=headers, follow_redirects=True
+    )
+    if response.status_code == 304 and cached:
+        print(f"[DEBUG] {url} not modified, reusing parsed copy")
+        cached["fetched_at"] = time.time()
+        await asyncio.to_thread(page_cache.set, key, cached)
+        return dict(cached, cached=True, bytes=len(body))
+
+    content_type = response.headers.get("content-type", "").lower()
+    if response.status_code >= 400:
+        page = {"title": "", "sections": []}
+    elif content_type and not any(t in content_type for t in ("html", "text", "json", "xml")):
+        page = {"title": "", "sections": [["", 0, f"Binary content ({content_type}) was not read."]]}
+    else:
+        page = await asyncio.to_thread(_parse_page, body, content_type)
+    entry = {
+        "url": str(response.url),
+        "status": response.status_code,
+        "title": page["title"],
+        "sections": page["sections"],
+        "truncated": truncated,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+        "fetched_at": time.time(),
+    }
+    print(f"[DEBUG] Fetched {url}: {len(body)} bytes{' (truncated)' if truncated else ''}, "
+          f"{len(entry['sections'])} sections")
+    if response.status_code < 400:
+        await asyncio.to_thread(page_cache.set, key, entry)
+    return dict(entry, cached=False, bytes=len(body))
+
+
+async def extract_page(url: str, instruction: str, max_chars: int = NAVIGATE_MAX_CHARS) -> str:
+    """
+    Fetch *url* and return the sections relevant to *instruction* as text.
+    """
+    page = await fetch_page(url)
+    if page["status"] >= 400:
+        return f"Error accessing {url}: HTTP {page['status']}"
+    sections = [Section.from_list(s) for s in page["sections"]]
+    chosen = extract_sections(sections, instruction, max_chars)
+    lines = [f"Content from {page['url']}:"]
+    if page["title"]:
+        lines.append(f"Title: {page['title']}")
+    lines.append(render_sections(chosen, max_chars) or "(no readable text)")
+    if page["truncated"]:
+        lines.append(f"(page cut off after {NAVIGATE_MAX_BYTES // 1024} KB)")
+    return "\n".join(lines)
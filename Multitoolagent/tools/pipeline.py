@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+# Cleanups left running after a graph has returned. The event loop only keeps
+# weak references to tasks, so they are held here until they finish.
+_background_cleanups = set()
+
+
+def _cleanup_done(task):
+    _background_cleanups.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[DEBUG] Background cleanup failed: {task.exception()!r}")
+
+
+class _Node:
+    def __init__(self, name, fn, after, cleanup):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.cleanup = cleanup
+
+
+class TaskGraph:
+    """
+    Run async steps as a dependency graph.
+
+    Every step starts as soon as the steps it depends on have finished, so
+    independent steps (e.g. resolving a booking URL and starting a browser
+    session) overlap. A step receives the results of its dependencies as
+    keyword arguments named after them.
+
+    Steps that own a resource can register a cleanup coroutine function. It
+    runs with the step's result once the graph is done, whether the graph
+    succeeded or failed. If the graph fails while such a step is still
+    running, the step is left to finish in the background and cleaned up
+    then, instead of being cancelled halfway through.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._nodes = {}
+        self.timings = {}
+
+    def add(self, name: str, fn, after=(), cleanup=None):
+        """
+        Register a step.
+
+        Args:
+            name: Step name; also the keyword its result is passed under
+            fn: Async callable taking the results of *after* as kwargs
+            after: Names of steps that must finish first
+            cleanup: Optional async callable taking this step's result
+        """
+        for dep in after:
+            if dep not in self._nodes:
+                raise ValueError(f"Unknown dependency {dep!r} for step {name!r}")
+        self._nodes[name] = _Node(name, fn, after, cleanup)
+        return self
+
+    async def _run_node(self, node, tasks, started):
+        deps = {}
+        for dep in node.after:
+            deps[dep] = await tasks[dep]
+        begin = time.perf_counter()
+        try:
+            return await node.fn(**deps)
+        finally:
+            self.timings[node.name] = (begin - started, time.perf_counter() - started)
+
+    @staticmethod
+    async def _cleanup_after(node, task):
+        try:
+            result = await task
+        except BaseException:
+            return
+        try:
+            await node.cleanup(result)
+        except Exception as e:
+            print(f"[DEBUG] Cleanup of step {node.name} failed: {e}")
+
+    async def run(self) -> dict:
+        """
+        Run every step and return {step name: result}.
+
+        The first failing step's exception is re-raised; steps that depend on
+        it fail with it and steps without cleanup are cancelled.
+        """
+        started = time.perf_counter()
+        tasks = {}
+        for name, node in self._nodes.items():
+            tasks[name] = asyncio.ensure_future(self._run_node(node, tasks, started))
+        try:
+            await asyncio.gather(*tasks.values())
+            return {name: task.result() for name, task in tasks.items()}
+        except BaseException:
+            for name, task in tasks.items():
+                if not task.done() and self._nodes[name].cleanup is None:
+                    task.cancel()
+            raise
+        finally:
+            for name, task in tasks.items():
+                node = self._nodes[name]
+                if node.cleanup is None:
+                    if task.done() and not task.cancelled():
+                        task.exception()  # Mark as retrieved
+                    continue
+                if task.done():
+                    await self._cleanup_after(node, task)
+                else:
+                    cleanup = asyncio.ensure_future(self._cleanup_after(node, task))
+                    _background_cleanups.add(cleanup)
+                    cleanup.add_done_callback(_cleanup_done)
+            print(f"[DEBUG] {self.name} timeline: " + ", ".join(
+                f"{name} {start:.2f}s→{end:.2f}s" for name, (start, end) in self.timings.items()
+            ))
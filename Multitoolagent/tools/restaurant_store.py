@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from difflib import SequenceMatcher
+
+from .cache import cache_db_path
+
+# Entries older than this are still used, but re-verified in the background
+RESTAURANT_STALE_AFTER = float(os.getenv("RESTAURANT_STALE_AFTER", str(7 * 24 * 60 * 60)))
+# Minimum fuzzy score (0..1) for a stored entry to count as a match
+RESTAURANT_MATCH_THRESHOLD = float(os.getenv("RESTAURANT_MATCH_THRESHOLD", "0.8"))
+# Share of a stored name that a query contained in it must cover to match
+RESTAURANT_PARTIAL_THRESHOLD = float(os.getenv("RESTAURANT_PARTIAL_THRESHOLD", "0.9"))
+
+
+def normalize_name(name: str) -> str:
+    """
+    Collapse a restaurant name to lowercase letters and digits only.
+
+    Spaces are dropped too, so speech transcriptions that split a name
+    ("hino day a") line up with the written form ("Hinodeya").
+    """
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(query: str, key: str) -> float:
+    """
+    Fuzzy score between two normalized names: the whole-string ratio.
+
+    A name that is only the start or part of another ("nopa" in "nopalito",
+    "sushi" in "sushiran") is usually a different restaurant, so it scores
+    its share of the longer name, and nothing at all unless that share is
+    at least RESTAURANT_PARTIAL_THRESHOLD. Those lookups go to Exa instead.
+    """
+    short, long_ = sorted((query, key), key=len)
+    if short != long_ and short in long_:
+        coverage = len(short) / len(long_)
+        return coverage if coverage >= RESTAURANT_PARTIAL_THRESHOLD else 0.0
+    return SequenceMatcher(None, query, key).ratio()
+
+
+class RestaurantStore:
+    """
+    Persistent store of resolved restaurants with an in-memory trigram index.
+
+    Each entry holds a canonical name, aliases, the booking platform and URL,
+    and when it was last verified.
+    """
+
+    def __init__(self, db_path: str, stale_after: float = RESTAURANT_STALE_AFTER):
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS restaurants ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " canonical_name TEXT NOT NULL,"
+            " aliases TEXT NOT NULL DEFAULT '[]',"
+            " platform TEXT NOT NULL,"
+            " booking_url TEXT NOT NULL UNIQUE,"
+            " last_verified REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._entries = {}
+        self._keys = {}       # normalized name/alias -> entry id
+        self._index = {}      # trigram -> set of normalized keys
+        for row in self._db.execute(
+            "SELECT id, canonical_name, aliases, platform, booking_url, last_verified FROM restaurants"
+        ):
+            self._load(self._row_to_entry(row))
+
+    @staticmethod
+    def _row_to_entry(row) -> dict:
+        return {
+            "id": row[0],
+            "canonical_name": row[1],
+            "aliases": json.loads(row[2]),
+            "platform": row[3],
+            "booking_url": row[4],
+            "last_verified": row[5],
+        }
+
+    def _load(self, entry: dict):
+        # Caller holds self._lock (or is __init__)
+        self._entries[entry["id"]] = entry
+        for name in [entry["canonical_name"]] + entry["aliases"]:
+            key = normalize_name(name)
+            if not key:
+                continue
+            self._keys[key] = entry["id"]
+            for gram in _trigrams(key):
+                self._index.setdefault(gram, set()).add(key)
+
+    def lookup(self, name: str, threshold: float = RESTAURANT_MATCH_THRESHOLD):
+        """
+        Find the stored restaurant that best matches *name*.
+
+        Returns:
+            A copy of the entry with "score" and "stale" added, or None
+        """
+        query = normalize_name(name)
+        if not query:
+            return None
+        with self._lock:
+            best_key, best_score = None, 0.0
+            if query in self._keys:
+                best_key, best_score = query, 1.0
+            else:
+                grams = _trigrams(query)
+                shared = {}
+                for gram in grams:
+                    for key in self._index.get(gram, ()):
+                        shared[key] = shared.get(key, 0) + 1
+                # Only rescore the handful of keys sharing the most trigrams
+                for key, _ in sorted(shared.items(), key=lambda kv: -kv[1])[:10]:
+                    score = _similarity(query, key)
+                    if score > best_score:
+                        best_key, best_score = key, score
+            if best_key is None or best_score < threshold:
+                return None
+            entry = dict(self._entries[self._keys[best_key]])
+        entry["score"] = best_score
+        entry["stale"] = time.time() - entry["last_verified"] > self.stale_after
+        return entry
+
+    def upsert(self, canonical_name: str, platform: str, booking_url: str, aliases=()) -> dict:
+        """
+        Insert or refresh a restaurant keyed by its booking URL.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, canonical_name, aliases, platform, booking_url, last_verified"
+                " FROM restaurants WHERE booking_url = ?",
+                (booking_url,),
+            ).fetchone()
+            if row:
+                entry = self._row_to_entry(row)
+                merged = list(dict.fromkeys(entry["aliases"] + [a for a in aliases if a]))
+                self._db.execute(
+                    "UPDATE restaurants SET canonical_name = ?, aliases = ?, platform = ?,"
+                    " last_verified = ? WHERE id = ?",
+                    (canonical_name, json.dumps(merged), platform, now, entry["id"]),
+                )
+                entry.update(canonical_name=canonical_name, aliases=merged, platform=platform, last_verified=now)
+            else:
+                cur = self._db.execute(
+                    "INSERT INTO restaurants (canonical_name, aliases, platform, booking_url, last_verified)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (canonical_name, json.dumps(list(dict.fromkeys(a for a in aliases if a))), platform, booking_url, now),
+                )
+                entry = {
+                    "id": cur.lastrowid,
+                    "canonical_name": canonical_name,
+                    "aliases": list(dict.fromkeys(a for a in aliases if a)),
+                    "platform": platform,
+                    "booking_url": booking_url,
+                    "last_verified": now,
+                }
+            self._db.commit()
+            self._load(entry)
+            return dict(entry)
+
+    def add_alias(self, entry_id: int, alias: str):
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or alias in entry["aliases"]:
+                return
+            entry["aliases"] = entry["aliases"] + [alias]
+            self._db.execute(
+                "UPDATE restaurants SET aliases = ? WHERE id = ?",
+                (json.dumps(entry["aliases"]), entry_id),
+            )
+            self._db.commit()
+            self._load(entry)
+
+    def delete(self, entry_id: int):
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            self._db.execute("DELETE FROM restaurants WHERE id = ?", (entry_id,))
+            self._db.commit()
+            if entry is None:
+                return
+            for key in [k for k, v in self._keys.items() if v == entry_id]:
+                del self._keys[key]
+                for gram in _trigrams(key):
+                    self._index.get(gram, set()).discard(key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_restaurant_store() -> RestaurantStore:
+    """
+    Return the process-wide store, opening it on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RestaurantStore(cache_db_path("restaurants.sqlite3"))
+    return _store
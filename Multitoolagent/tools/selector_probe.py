@@ -0,0 +1,157 @@
+import os
+
+# Matched elements returned per selector
+PROBE_MAX_ELEMENTS = int(os.getenv("PROBE_MAX_ELEMENTS", "3"))
+
+
+class ProbeSelector:
+    """
+    One reservation-element pattern: a CSS selector, optionally narrowed to
+    elements whose text contains *text* (case-insensitive).
+    """
+
+    def __init__(self, css: str, text: str = None):
+        self.css = css
+        self.text = text
+
+    def to_playwright(self) -> str:
+        return f'{self.css}:has-text("{self.text}")' if self.text else self.css
+
+    def to_arg(self) -> dict:
+        return {"css": self.css, "text": self.text}
+
+
+class SelectorSet:
+    """
+    Versioned reservation selectors for one booking platform.
+
+    Bump *version* whenever the list changes, so results (and anything keyed
+    on them) can tell which revision matched.
+    """
+
+    def __init__(self, platform: str, version: int, selectors):
+        self.platform = platform
+        self.version = version
+        self.selectors = tuple(selectors)
+
+    @property
+    def label(self) -> str:
+        return f"{self.platform}@v{self.version}"
+
+    def playwright_selectors(self) -> tuple:
+        return tuple(s.to_playwright() for s in self.selectors)
+
+
+# Patterns shared by every platform, in order of preference
+COMMON_SELECTORS = (
+    ProbeSelector("button", "Make a Reservation"),
+    ProbeSelector("button", "Book Now"),
+    ProbeSelector("button", "Reserve"),
+    ProbeSelector("a", "Reservation"),
+    ProbeSelector('[data-testid*="reservation"]'),
+    ProbeSelector(".reservation-button"),
+)
+
+SELECTOR_SETS = {
+    "default": SelectorSet("default", 1, COMMON_SELECTORS),
+    "OpenTable": SelectorSet("OpenTable", 1, (
+        ProbeSelector('[data-test*="reservation"]'),
+        ProbeSelector("button", "Find a time"),
+        ProbeSelector('[data-test*="time-slot"]'),
+    ) + COMMON_SELECTORS),
+    "Resy": SelectorSet("Resy", 1, (
+        ProbeSelector("button.ReservationButton"),
+        ProbeSelector('[data-test-id*="reservation"]'),
+        ProbeSelector("button", "Notify"),
+    ) + COMMON_SELECTORS),
+    "Yelp": SelectorSet("Yelp", 1, (
+        ProbeSelector("button", "Find a Table"),
+        ProbeSelector('[data-testid*="reservations"]'),
+        ProbeSelector("a", "Reserve"),
+    ) + COMMON_SELECTORS),
+}
+
+
+def selector_set_for(platform_name: str) -> SelectorSet:
+    return SELECTOR_SETS.get(platform_name) or SELECTOR_SETS["default"]
+
+
+# In-page helpers shared by the probe and the action plan replayer:
+# findAll(css, text) and describe(element)
+ELEMENT_HELPERS_JS = """
+    const attrNames = ['id', 'class', 'href', 'type', 'name', 'role', 'aria-label',
+                       'data-testid', 'data-test', 'data-test-id'];
+    const findAll = (css, text) => {
+        let nodes = Array.from(document.querySelectorAll(css));
+        if (text) {
+            const needle = text.toLowerCase();
+            nodes = nodes.filter(n => (n.innerText || n.textContent || '').toLowerCase().includes(needle));
+        }
+        return nodes;
+    };
+    const describe = n => {
+        const attrs = {};
+        for (const name of attrNames) {
+            const value = n.getAttribute(name);
+            if (value !== null) attrs[name] = value;
+        }
+        const rect = n.getBoundingClientRect();
+        return {
+            tag: n.tagName.toLowerCase(),
+            text: (n.innerText || n.textContent || '').trim().slice(0, 80),
+            attrs,
+            visible: rect.width > 0 && rect.height > 0,
+        };
+    };
+"""
+
+# Runs in the page: checks every selector and collects the matches in one go
+_PROBE_SCRIPT = """([selectors, maxElements]) => {""" + ELEMENT_HELPERS_JS + """
+    return selectors.map(({css, text}) => {
+        let nodes;
+        try {
+            nodes = findAll(css, text);
+        } catch (e) {
+            return {count: 0, elements: [], error: String(e)};
+        }
+        return {count: nodes.length, elements: nodes.slice(0, maxElements).map(describe)};
+    });
+}"""
+
+
+async def find(page, selectors, max_elements: int = PROBE_MAX_ELEMENTS) -> list:
+    """
+    Check every ProbeSelector in *selectors* with a single page.evaluate.
+
+    Returns:
+        The selectors that matched, in order, each as {"selector" (Playwright
+        syntax), "count", "elements"} with the first few elements' tag, text,
+        attributes and visibility
+    """
+    results = await page.evaluate(
+        _PROBE_SCRIPT,
+        [[s.to_arg() for s in selectors], max_elements],
+    )
+    matches = []
+    for selector, found in zip(selectors, results or []):
+        if found.get("error"):
+            print(f"[DEBUG] Selector {selector.to_playwright()} failed: {found['error']}")
+        if found.get("count"):
+            matches.append({
+                "selector": selector.to_playwright(),
+                "count": found["count"],
+                "elements": found["elements"],
+            })
+    return matches
+
+
+async def probe(page, platform_name: str) -> dict:
+    """
+    Check a platform's whole selector set with a single page.evaluate.
+
+    Returns:
+        {"version": "<platform>@v<n>", "matches": [...]} with the matches as
+        returned by find(), in selector order
+    """
+    selector_set = selector_set_for(platform_name)
+    return {"version": selector_set.label, "matches": await find(page, selector_set.selectors)}
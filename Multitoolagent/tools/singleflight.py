@@ -0,0 +1,162 @@
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import re
+import threading
+
+from .cache import make_key
+
+# Registry of every coalescing group, for metrics
+_groups = {}
+
+# Published instead of a result when the leader was cancelled; followers
+# then retry. The shared future itself is never cancelled.
+_RETRY = object()
+
+
+def _normalize_arg(value):
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value.strip())
+    if isinstance(value, (list, tuple)):
+        return [_normalize_arg(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize_arg(v) for k, v in value.items()}
+    return value
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one upstream call.
+
+    Works across threads and event loops: the first caller for a key runs the
+    work and publishes the result on a concurrent.futures.Future that every
+    other caller waits on. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        _groups[name] = self
+
+    def _join(self, key):
+        """
+        Return (future, is_leader) for *key*.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future, False
+            future = concurrent.futures.Future()
+            self._in_flight[key] = future
+            self._stats["executions"] += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if error is not None and not isinstance(error, asyncio.CancelledError):
+                self._stats["errors"] += 1
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, asyncio.CancelledError):
+            # The leader was cancelled; followers retry instead of failing
+            future.set_result(_RETRY)
+        else:
+            future.set_exception(error)
+
+    async def do(self, key: str, coro_fn):
+        """
+        Await coro_fn() once per in-flight *key*; concurrent callers share it.
+        """
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                # Shielded: a follower that gets cancelled (e.g. by wait_for)
+                # must not cancel the future every other caller waits on
+                result = await asyncio.shield(asyncio.wrap_future(future))
+                if result is _RETRY:
+                    continue
+                return result
+            try:
+                result = await coro_fn()
+            except BaseException as e:
+                self._finish(key, future, error=e)
+                raise
+            self._finish(key, future, result=result)
+            return result
+
+    def do_sync(self, key: str, fn):
+        """
+        Blocking counterpart of do() for synchronous callers.
+        """
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                result = future.result()
+                if result is _RETRY:
+                    continue
+                return result
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, future, error=e)
+                raise
+            self._finish(key, future, result=result)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+        return stats
+
+
+def coalesce(name: str = None, key_fn=None):
+    """
+    Decorator that wraps a sync or async function in a SingleFlight group.
+
+    Args:
+        name: Group name used in metrics (defaults to the function name)
+        key_fn: Optional callable taking the bound arguments dict and returning
+            the value to key on; defaults to the whitespace-normalized arguments
+
+    The wrapper keeps the original signature so FunctionTool still sees the
+    real parameters.
+    """
+    def decorator(fn):
+        group = SingleFlight(name or fn.__name__)
+        sig = inspect.signature(fn)
+
+        def _key(args, kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            raw = key_fn(arguments) if key_fn else _normalize_arg(arguments)
+            return make_key(group.name, raw)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return await group.do(_key(args, kwargs), lambda: fn(*args, **kwargs))
+            async_wrapper.singleflight = group
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def sync_wrapper(*args, **kwargs):
+            return group.do_sync(_key(args, kwargs), lambda: fn(*args, **kwargs))
+        sync_wrapper.singleflight = group
+        return sync_wrapper
+
+    return decorator
+
+
+def singleflight_stats() -> dict:
+    """
+    Metrics for every coalescing group, keyed by group name.
+    """
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,14 @@
+"""
+Keep the test run's caches and stores out of the developer's home directory.
+
+pytest loads this before any test module, so tools.cache picks the
+directory up when it is first imported.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+os.environ["TOOL_CACHE_DIR"] = tempfile.mkdtemp(prefix="dynamove-tests-")
+atexit.register(shutil.rmtree, os.environ["TOOL_CACHE_DIR"], ignore_errors=True)
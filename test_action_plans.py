@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Tests for recording and replaying per-platform booking action plans
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools import action_plans, selector_probe
+from tools.action_plans import PlanRecorder, PlanStep, PlanStore, locate, stable_css
+
+WIDGET = {"tag": "div", "text": "Find a time", "attrs": {"data-test": "reservation-widget"}, "visible": True}
+
+
+class FakePage:
+    """
+    Answers the probe and replay scripts from a {css: [elements]} table.
+    """
+
+    def __init__(self, dom):
+        self.dom = dom
+        self.evaluations = 0
+        self.actions = []
+        self.timeouts = []
+
+    def _find(self, css, text):
+        return [n for n in self.dom.get(css, []) if not text or text.lower() in n["text"].lower()]
+
+    async def evaluate(self, script, arg=None):
+        self.evaluations += 1
+        if script == selector_probe._PROBE_SCRIPT:
+            selectors, max_elements = arg
+            results = []
+            for selector in selectors:
+                nodes = self._find(selector["css"], selector["text"])
+                results.append({"count": len(nodes), "elements": nodes[:max_elements]})
+            return results
+        assert script == action_plans._REPLAY_SCRIPT
+        steps, timeout_ms = arg
+        self.timeouts.append(timeout_ms)
+        results = []
+        for i, step in enumerate(steps):
+            nodes = self._find(step["css"], step["text"])
+            if not nodes:
+                return {"ok": False, "step": i, "reason": "target not found", "results": results}
+            if step["tag"] and nodes[0]["tag"] != step["tag"]:
+                return {"ok": False, "step": i, "reason": "changed", "results": results}
+            if step["action"] != "expect":
+                self.actions.append((step["action"], step["css"], step["value"]))
+            results.append({"count": len(nodes), "element": nodes[0]})
+        return {"ok": True, "results": results}
+
+
+def test_discovery_records_a_plan_that_replays_in_one_round_trip(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.sqlite3"))
+    page = FakePage({'[data-test*="reservation"]': [WIDGET], '[data-test*="time-slot"]': []})
+
+    first = asyncio.run(locate(page, "OpenTable", store))
+    # Probe, check for form controls, click the widget
+    assert (first["automation"], first["round_trips"]) == ("discovery", 3)
+    plan = store.get("OpenTable")
+    assert [(s.action, s.css) for s in plan.steps] == [("click", 'div[data-test="reservation-widget"]')]
+
+    # The recorded element is all the replay needs
+    page = FakePage({'div[data-test="reservation-widget"]': [WIDGET]})
+    second = asyncio.run(locate(page, "OpenTable", store))
+    assert (second["automation"], second["round_trips"]) == ("replay", 1)
+    assert second["version"] == "OpenTable@plan1"
+    assert second["matches"][0]["elements"] == [WIDGET]
+    assert page.evaluations == 1
+
+    # Plans survive a restart
+    assert PlanStore(str(tmp_path / "plans.sqlite3")).get("OpenTable").replays == 1
+
+
+def test_drift_falls_back_to_discovery_and_rerecords(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.sqlite3"))
+    asyncio.run(locate(FakePage({'[data-test*="reservation"]': [WIDGET]}), "OpenTable", store))
+
+    renamed = dict(WIDGET, attrs={"data-test": "reservation-widget-v2"})
+    page = FakePage({'[data-test*="reservation"]': [renamed]})
+    result = asyncio.run(locate(page, "OpenTable", store))
+    assert (result["automation"], result["round_trips"]) == ("drift", 4)
+    assert result["matches"]
+    plan = store.get("OpenTable")
+    assert plan.version == 2 and plan.steps[0].css == 'div[data-test="reservation-widget-v2"]'
+
+
+def test_discovery_records_the_booking_flow(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.sqlite3"))
+    form = {
+        'select[name*="party" i]': [{"tag": "select", "text": "", "attrs": {"name": "partySize"}, "visible": True}],
+        'input[type="date"]': [{"tag": "input", "text": "", "attrs": {"id": "date-104237"}, "visible": True}],
+        '[data-test*="reservation"]': [WIDGET],
+    }
+    params = {"restaurant_name": "Test Restaurant", "date": "July 21, 2025", "time": "7:00 PM", "party_size": 2}
+
+    page = FakePage(form)
+    first = asyncio.run(locate(page, "OpenTable", store, params))
+    assert first["round_trips"] == 5
+    assert page.actions == [
+        ("select", 'select[name*="party" i]', "2"),
+        ("fill", 'input[type="date"]', "2025-07-21"),
+        ("click", '[data-test*="reservation"]', None),
+    ]
+    # The date input's id is the restaurant's own; the generic pattern is kept
+    plan = store.get("OpenTable")
+    assert [(s.action, s.css, s.value) for s in plan.steps] == [
+        ("select", 'select[name="partySize"]', "{party_size}"),
+        ("fill", 'input[type="date"]', "{iso_date}"),
+        ("click", 'div[data-test="reservation-widget"]', None),
+    ]
+
+    # Another restaurant on the platform replays the whole flow in one go
+    page = FakePage({
+        'select[name="partySize"]': form['select[name*="party" i]'],
+        'input[type="date"]': form['input[type="date"]'],
+        'div[data-test="reservation-widget"]': [WIDGET],
+    })
+    second = asyncio.run(locate(page, "OpenTable", store, dict(params, party_size=6)))
+    assert (second["automation"], second["round_trips"]) == ("replay", 1)
+    assert [a[2] for a in page.actions] == ["6", "2025-07-21", None]
+
+
+def test_plans_never_pin_restaurant_specific_attributes():
+    recorder = PlanRecorder("Yelp", {"restaurant_name": "Olive Garden"})
+    selector = selector_probe.ProbeSelector("button", "Find a Table")
+    recorder.record("click", {"tag": "button", "attrs": {"data-testid": "olive-garden-cta"}},
+                    text="Find a Table", selector=selector)
+    recorder.record("click", {"tag": "button", "attrs": {"data-testid": "biz-9921034"}},
+                    text="Find a Table", selector=selector)
+    recorder.record("click", {"tag": "button", "attrs": {"data-testid": "reserve-cta"}},
+                    text="Find a Table", selector=selector)
+    assert [(s.css, s.text) for s in recorder.steps] == [
+        ("button", "Find a Table"),
+        ("button", "Find a Table"),
+        ('button[data-testid="reserve-cta"]', None),
+    ]
+
+
+def test_replay_fails_fast_on_the_first_missing_target(tmp_path):
+    store = PlanStore()
+    recorder = PlanRecorder("Resy")
+    recorder.record("fill", {"tag": "input", "attrs": {"name": "guests"}}, value="{party_size}")
+    recorder.record("click", {"tag": "button", "attrs": {"data-test-id": "book"}})
+    store.save(recorder)
+
+    page = FakePage({'button[data-test-id="book"]': [{"tag": "button", "text": "Book", "attrs": {}, "visible": True}]})
+    result = asyncio.run(locate(page, "Resy", store, {"party_size": 2}))
+    assert result["automation"] == "drift"
+    assert page.timeouts[0] == int(action_plans.PLAN_STEP_TIMEOUT * 1000) <= 1000
+    # The click after the missing input never ran
+    assert page.actions == []
+    assert page.evaluations == 2
+
+
+def test_drift_across_restaurants_drops_the_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(action_plans, "PLAN_MAX_FAILURES", 2)
+    store = PlanStore(str(tmp_path / "plans.sqlite3"))
+    pages = [
+        {'[data-test*="reservation"]': [dict(WIDGET, attrs={"data-test": f"reservation-{name}"})]}
+        for name in ("alpha", "beta", "gamma")
+    ]
+    asyncio.run(locate(FakePage(pages[0]), "OpenTable", store))
+    # Each restaurant re-records over the last one; the drifts still add up
+    asyncio.run(locate(FakePage(pages[1]), "OpenTable", store))
+    assert store.get("OpenTable").failures == 1
+    asyncio.run(locate(FakePage(pages[2]), "OpenTable", store))
+    assert store.get("OpenTable") is None
+
+
+def test_plan_is_dropped_when_it_keeps_drifting(tmp_path, monkeypatch):
+    monkeypatch.setattr(action_plans, "PLAN_MAX_FAILURES", 2)
+    store = PlanStore(str(tmp_path / "plans.sqlite3"))
+    asyncio.run(locate(FakePage({'[data-test*="reservation"]': [WIDGET]}), "Resy", store))
+    for _ in range(2):
+        result = asyncio.run(locate(FakePage({}), "Resy", store))
+        assert result["matches"] == []
+    assert store.get("Resy") is None
+    assert PlanStore(str(tmp_path / "plans.sqlite3")).get("Resy") is None
+
+
+def test_replayed_actions_are_batched_with_booking_params(tmp_path):
+    store = PlanStore()
+    recorder = PlanRecorder("Yelp")
+    recorder.record("fill", {"tag": "select", "attrs": {"name": "covers"}}, value="{party_size}")
+    recorder.record("click", {"tag": "button", "attrs": {"class": "css-1x2y3z cta primary"}}, text="Find a Table")
+    store.save(recorder)
+
+    page = FakePage({
+        'select[name="covers"]': [{"tag": "select", "text": "", "attrs": {}, "visible": True}],
+        "button.cta.primary": [{"tag": "button", "text": "Find a Table", "attrs": {}, "visible": True}],
+    })
+    result = asyncio.run(locate(page, "Yelp", store, {"party_size": 4}))
+    assert result["automation"] == "replay"
+    assert page.evaluations == 1
+    assert page.actions == [("fill", 'select[name="covers"]', "4"), ("click", "button.cta.primary", None)]
+
+
+def test_stable_css_prefers_test_ids_and_skips_generated_classes():
+    assert stable_css({"tag": "a", "attrs": {"id": "book", "data-testid": "cta"}}) == 'a[data-testid="cta"]'
+    assert stable_css({"tag": "a", "attrs": {"id": "book"}}) == "a"
+    assert stable_css({"tag": "a", "attrs": {"name": "rid-104237", "aria-label": "Book"}}) == 'a[aria-label="Book"]'
+    assert stable_css({"tag": "button", "attrs": {"class": "sc-AxjAm Button__primary big"}}) == "button.big"
+    assert stable_css({"tag": "button", "attrs": {}}) == "button"
+    with pytest.raises(ValueError):
+        PlanStep("hover", "button")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed booking artifact store
+"""
+
+import asyncio
+import gzip
+import os
+import sys
+import time
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.artifacts import ArtifactStore, capture
+
+
+class FakePage:
+    def __init__(self, html):
+        self.html = html
+        self.screenshot_kwargs = None
+
+    async def screenshot(self, **kwargs):
+        self.screenshot_kwargs = kwargs
+        await asyncio.sleep(0.01)
+        return b"\xff\xd8" + self.html.encode()
+
+    async def content(self):
+        return self.html
+
+
+def test_concurrent_captures_do_not_collide(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+
+    async def main():
+        return await asyncio.gather(
+            capture(FakePage("<html>one</html>"), "booking-1", store),
+            capture(FakePage("<html>two</html>"), "booking-2", store),
+        )
+
+    first, second = asyncio.run(main())
+    paths = {e["path"] for e in first} | {e["path"] for e in second}
+    assert len(paths) == 4
+    dom = next(e for e in store.get("booking-2") if e["kind"] == "dom")
+    with open(dom["path"], "rb") as f:
+        assert gzip.decompress(f.read()) == b"<html>two</html>"
+    assert dom["path"].endswith(".html.gz")
+
+
+def test_screenshot_is_jpeg_and_identical_content_is_stored_once(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    page = FakePage("<html>same</html>")
+    a = asyncio.run(capture(page, "a", store, kinds="screenshot"))
+    b = asyncio.run(capture(page, "b", store, kinds="screenshot"))
+    assert page.screenshot_kwargs["type"] == "jpeg"
+    assert a[0]["path"] == b[0]["path"]
+    assert a[0]["path"].endswith(".jpg")
+    assert asyncio.run(capture(page, "c", store, kinds="")) == []
+
+
+def test_eviction_by_size_and_age(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=250, max_age=60)
+    for n in range(3):
+        store.put(f"booking-{n}", "dom", bytes([n]) * 100, ".bin")
+        time.sleep(0.01)
+    assert store.get("booking-0") == []
+    assert len(store.get("booking-1")) == 1
+    assert len(store.get("booking-2")) == 1
+
+    old = store.get("booking-1")[0]["path"]
+    store.max_age = 0
+    assert store.evict() == 2
+    assert not os.path.exists(old)
+
+
+def test_shared_object_survives_until_last_reference_goes(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=150)
+    store.put("a", "dom", b"x" * 100, ".bin")
+    time.sleep(0.01)
+    store.put("b", "dom", b"x" * 100, ".bin")
+    path = store.get("a")[0]["path"]
+    assert os.path.exists(path)
+    store.put("c", "dom", b"y" * 100, ".bin")
+    assert store.get("a") == [] and store.get("b") == []
+    assert not os.path.exists(path)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-restaurant availability sweep
+"""
+
+import asyncio
+import os
+import sys
+import types
+from datetime import datetime
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+pytest.importorskip("httpx")
+pytest.importorskip("google.adk")
+
+from tools import availability_tools, navigation
+
+
+def test_window_parsing_and_slot_filtering():
+    start, end = availability_tools.parse_window("July 21, 2025", "7 PM", "8:30 p.m.")
+    assert start == datetime(2025, 7, 21, 19, 0)
+    assert end == datetime(2025, 7, 21, 20, 30)
+    slots = availability_tools.slots_in_window(["6:45 PM", "7:00 PM", "8:30 PM", "8:45 PM", "Notify"], start, end)
+    assert [s.strftime("%H:%M") for s in slots] == ["19:00", "20:30"]
+
+
+def test_availability_url_targets_middle_of_window():
+    start, end = availability_tools.parse_window("2025-07-21", "7:00 PM", "8:30 PM")
+    url = availability_tools.availability_url(
+        "https://www.opentable.com/r/test?ref=1", "OpenTable", start, end, 4
+    )
+    assert url == "https://www.opentable.com/r/test?ref=1&covers=4&dateTime=2025-07-21T19%3A45"
+
+
+def test_sweep_respects_concurrency_cap_and_builds_matrix(monkeypatch):
+    active = {"now": 0, "peak": 0}
+    slots = {
+        "Alpha": ["7:00 PM", "7:30 PM"],
+        "Beta": ["7:30 PM", "9:00 PM"],
+        "Gamma": [],
+    }
+
+    async def fake_resolve(name):
+        if name == "Nowhere":
+            return None, "Unknown"
+        return f"https://resy.com/cities/sj/{name.lower()}", "Resy"
+
+    class FakePage:
+        url = None
+
+        async def evaluate(self, script, arg=None):
+            return slots[self.url.split("/")[-1].split("?")[0].title()]
+
+    class FakePool:
+        async def run(self, fn):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            try:
+                return await fn(types.SimpleNamespace(context=None, page=FakePage()))
+            finally:
+                active["now"] -= 1
+
+    async def fake_intercept(session, platform_name):
+        pass
+
+    async def fake_navigate(page, url, stats=None):
+        await asyncio.sleep(0.02)
+        page.url = url
+
+    backend = types.SimpleNamespace(name="fake", unavailable_reason=lambda: None)
+    monkeypatch.setattr(availability_tools, "get_browser_backend", lambda: backend)
+    monkeypatch.setattr(availability_tools, "AVAILABILITY_CONCURRENCY", 2)
+    monkeypatch.setattr(availability_tools, "resolve_booking_url", fake_resolve)
+    monkeypatch.setattr(availability_tools, "get_browser_pool", lambda: FakePool())
+    monkeypatch.setattr(availability_tools, "intercept", fake_intercept)
+    monkeypatch.setattr(availability_tools, "navigate", fake_navigate)
+    monkeypatch.setattr(navigation, "_stats", navigation.NavigationStats())
+
+    result = asyncio.run(availability_tools.check_availability(
+        ["Alpha", "Beta", "Gamma", "Nowhere"], "July 21, 2025", "7:00 PM", "8:30 PM", 4
+    ))
+
+    assert active["peak"] == 2
+    assert "| Restaurant | 7:00 PM | 7:30 PM |" in result
+    assert "| Alpha | ✅ | ✅ |" in result
+    assert "| Beta | — | ✅ |" in result
+    assert "| Gamma | — | — |" in result
+    assert "| Nowhere | ? | ? |" in result
+    assert "Nowhere: no booking platform found" in result
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
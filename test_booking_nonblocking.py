@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Regression test: the booking coroutine must never block the event loop.
+
+BrowserBase, Playwright and Exa are replaced with fakes that behave like the
+real ones, including a BrowserBase SDK call that blocks for a while, and a
+heartbeat on both the caller's loop and the tools IO loop measures how long
+either one was stalled.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import types
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+pytest.importorskip("httpx")
+pytest.importorskip("google.adk")
+
+from tools import action_plans, artifacts, browser_backend, browser_pool, browserbase_tools, exa_tools, http_client, navigation, restaurant_store
+from tools.cache import TTLCache
+from tools.idempotency import IdempotentCall
+from tools.io_loop import get_io_loop
+
+# Longest stall tolerated on either loop
+MAX_LOOP_STALL = 0.1
+# How long the fake BrowserBase SDK blocks its calling thread
+SDK_BLOCK_SECONDS = 0.3
+
+
+class LoopLagMonitor:
+    """
+    Heartbeat that records the worst delay of a short sleep on a loop.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._running = True
+
+    async def beat(self):
+        while self._running:
+            began = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, time.perf_counter() - began - self.interval)
+
+    def stop(self):
+        self._running = False
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class FakePage:
+    def __init__(self):
+        self.url = "about:blank"
+
+    async def goto(self, url, **kwargs):
+        await asyncio.sleep(0.05)
+        self.url = url
+
+    async def title(self):
+        return "Test Restaurant - OpenTable"
+
+    async def screenshot(self, **kwargs):
+        await asyncio.sleep(0.01)
+        return b"\xff\xd8fake"
+
+    async def content(self):
+        return "<html><body><button>Reserve</button></body></html>"
+
+    async def wait_for_timeout(self, ms):
+        await asyncio.sleep(ms / 1000)
+
+    async def wait_for_selector(self, selector, **kwargs):
+        await asyncio.sleep(0.001)
+
+    async def evaluate(self, script, arg=None):
+        await asyncio.sleep(0.001)
+        return []
+
+    def is_closed(self):
+        return False
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = [FakePage()]
+
+    async def route(self, *args, **kwargs):
+        pass
+
+    async def unroute_all(self, **kwargs):
+        pass
+
+    async def clear_cookies(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = [FakeContext()]
+
+    def is_connected(self):
+        return True
+
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    def __init__(self):
+        async def connect_over_cdp(url):
+            await asyncio.sleep(0.02)
+            return FakeBrowser()
+        self.chromium = types.SimpleNamespace(connect_over_cdp=connect_over_cdp)
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+class FakeBrowserbase:
+    def __init__(self, api_key=None):
+        def create(project_id=None):
+            time.sleep(SDK_BLOCK_SECONDS)  # The real SDK is synchronous
+            return types.SimpleNamespace(id="fake-session", connect_url="wss://fake")
+        self.sessions = types.SimpleNamespace(create=create)
+
+
+@pytest.fixture
+def fake_services(monkeypatch, tmp_path):
+    async def fake_post(url, **kwargs):
+        await asyncio.sleep(0.05)
+        return FakeResponse({"results": [{
+            "url": "https://www.opentable.com/r/test-restaurant-san-jose",
+            "title": "Test Restaurant - San Jose | OpenTable",
+        }]})
+
+    monkeypatch.setenv("BROWSERBASE_API_KEY", "test-key")
+    monkeypatch.setenv("BROWSERBASE_PROJECT_ID", "test-project")
+    monkeypatch.setenv("EXA_API_KEY", "test-key")
+    monkeypatch.setattr(http_client, "post", fake_post)
+    monkeypatch.setattr(exa_tools, "_exa_cache", TTLCache("exa", ttl=60, db_path=str(tmp_path / "c.sqlite3")))
+    monkeypatch.setattr(browserbase_tools, "_booking_dedup", IdempotentCall("booking", 60))
+    monkeypatch.setattr(artifacts, "_store", artifacts.ArtifactStore(str(tmp_path / "artifacts")))
+    monkeypatch.setattr(navigation, "_stats", navigation.NavigationStats(str(tmp_path / "n.sqlite3")))
+    monkeypatch.setattr(action_plans, "_plans", action_plans.PlanStore(str(tmp_path / "p.sqlite3")))
+    monkeypatch.setattr(restaurant_store, "_store", restaurant_store.RestaurantStore(str(tmp_path / "r.sqlite3")))
+    monkeypatch.setattr(browser_backend, "async_playwright", lambda: FakePlaywright(), raising=False)
+    monkeypatch.setattr(browser_backend, "Browserbase", FakeBrowserbase, raising=False)
+    monkeypatch.setattr(browser_backend, "_backend", browser_backend.BrowserBaseBackend())
+    monkeypatch.setattr(browser_pool, "_pool", browser_pool.BrowserSessionPool(size=1, warm=0))
+    monkeypatch.setattr(browserbase_tools, "PLAYWRIGHT_AVAILABLE", True)
+    monkeypatch.setattr(browserbase_tools, "BROWSERBASE_AVAILABLE", True)
+    monkeypatch.chdir(tmp_path)
+
+
+def _run_monitored(coro_fn):
+    """
+    Run coro_fn() with heartbeats on the caller's loop and the IO loop.
+
+    Returns:
+        (result, worst caller-loop stall, worst IO-loop stall)
+    """
+    io_monitor = LoopLagMonitor()
+    io_beat = asyncio.run_coroutine_threadsafe(io_monitor.beat(), get_io_loop())
+
+    async def main():
+        monitor = LoopLagMonitor()
+        beat = asyncio.ensure_future(monitor.beat())
+        await asyncio.sleep(0)  # Let the first heartbeat start
+        try:
+            result = await coro_fn()
+        finally:
+            monitor.stop()
+            await beat  # Records the lag of the heartbeat in progress
+        return result, monitor.max_lag
+
+    try:
+        result, caller_lag = asyncio.run(main())
+    finally:
+        io_monitor.stop()
+        io_beat.result(timeout=5)
+    return result, caller_lag, io_monitor.max_lag
+
+
+def test_monitor_catches_a_blocking_call():
+    async def blocking():
+        time.sleep(SDK_BLOCK_SECONDS)
+
+    _, caller_lag, _ = _run_monitored(blocking)
+    assert caller_lag > MAX_LOOP_STALL
+
+
+def test_booking_never_stalls_the_event_loop(fake_services):
+    booking = browserbase_tools.book_restaurant_reservation_real.func
+
+    result, caller_lag, io_lag = _run_monitored(lambda: booking(
+        restaurant_name="Test Restaurant",
+        date="July 21, 2025",
+        time="7:00 PM",
+        party_size=2,
+        contact_info="john.doe@example.com",
+    ))
+
+    assert "REAL BROWSER AUTOMATION SUCCESSFUL" in result
+    assert not os.path.exists("booking_page.png")
+    assert caller_lag < MAX_LOOP_STALL, f"caller loop stalled for {caller_lag:.3f}s"
+    assert io_lag < MAX_LOOP_STALL, f"IO loop stalled for {io_lag:.3f}s"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
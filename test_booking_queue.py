@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the background booking job queue
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.booking_queue import BookingQueue
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _fake_booking(log, delay=0.05, gate=None):
+    async def run_job(params, progress):
+        log.append(("start", params["restaurant_name"]))
+        for state in ("resolving", "navigating", "probing"):
+            progress(state)
+            await asyncio.sleep(delay)
+        while gate is not None and not gate.is_set():
+            await asyncio.sleep(0.01)
+        if params["restaurant_name"] == "Broken":
+            raise RuntimeError("session creation failed")
+        return f"booked {params['restaurant_name']}"
+    return run_job
+
+
+def test_submit_returns_immediately_and_streams_states():
+    log, updates = [], []
+    queue = BookingQueue(_fake_booking(log), workers=1)
+    queue.subscribe(lambda job: updates.append((job["id"], job["state"])))
+
+    began = time.monotonic()
+    job = queue.submit({"restaurant_name": "Alpha"})
+    assert time.monotonic() - began < 0.05
+    # The worker may already have picked the job up; it was queued first
+    assert job.history[0][0] == "queued"
+
+    assert _wait_for(lambda: queue.get(job.id).state == "done")
+    assert queue.get(job.id).result == "booked Alpha"
+    assert [s for i, s in updates if i == job.id] == ["resolving", "navigating", "probing", "done"]
+
+
+def test_priorities_and_worker_cap():
+    log = []
+    queue = BookingQueue(_fake_booking(log, delay=0.02), workers=1)
+    # Occupy the only worker so the rest queue up behind it
+    first = queue.submit({"restaurant_name": "First"})
+    assert _wait_for(lambda: queue.get(first.id).state != "queued")
+    low = queue.submit({"restaurant_name": "Low"}, priority=9)
+    high = queue.submit({"restaurant_name": "High"}, priority=1)
+    normal = queue.submit({"restaurant_name": "Normal"})
+    assert _wait_for(lambda: all(queue.get(j.id).state == "done" for j in (low, high, normal)))
+    assert [name for event, name in log] == ["First", "High", "Normal", "Low"]
+
+
+def test_failures_are_recorded():
+    queue = BookingQueue(_fake_booking([], delay=0.001), workers=1)
+    job = queue.submit({"restaurant_name": "Broken"})
+    assert _wait_for(lambda: queue.get(job.id).state == "failed")
+    assert queue.get(job.id).error == "session creation failed"
+
+
+def test_cancel_running_and_queued_jobs():
+    gate = threading.Event()
+    log = []
+    queue = BookingQueue(_fake_booking(log, delay=0.001, gate=gate), workers=1)
+    running = queue.submit({"restaurant_name": "Running"})
+    waiting = queue.submit({"restaurant_name": "Waiting"})
+    assert _wait_for(lambda: queue.get(running.id).state == "probing")
+
+    assert queue.cancel(waiting.id)
+    assert queue.cancel(running.id)
+    assert _wait_for(lambda: queue.get(running.id).state == "cancelled")
+    assert _wait_for(lambda: queue.get(waiting.id).state == "cancelled")
+    gate.set()
+    time.sleep(0.05)
+    assert [name for event, name in log] == ["Running"]
+    assert not queue.cancel(running.id)
+
+
+def test_workers_run_jobs_concurrently():
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    async def run_job(params, progress):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return "ok"
+
+    queue = BookingQueue(run_job, workers=2)
+    jobs = [queue.submit({"restaurant_name": f"R{n}"}) for n in range(5)]
+    assert _wait_for(lambda: all(queue.get(j.id).state == "done" for j in jobs))
+    assert active["peak"] == 2
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests for the pluggable browser backends behind the session pool
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools import browser_backend
+from tools.browser_backend import BrowserBackend, LocalChromiumBackend, make_browser_backend
+from tools.browser_pool import BrowserSessionPool
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def evaluate(self, script, *args):
+        return 1
+
+    async def goto(self, url):
+        self.url = url
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.pages = [self.page]
+        self.closed = False
+
+    async def unroute_all(self, behavior=None):
+        pass
+
+    async def clear_cookies(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+
+class FakeBackend(BrowserBackend):
+    """
+    A local-style backend: one shared browser, one context per session.
+    """
+
+    name = "fake"
+
+    def __init__(self):
+        super().__init__()
+        self.browser = FakeBrowser()
+        self.opened = []
+        self.closed = []
+        self.stopped = False
+
+    def unavailable_reason(self):
+        return None
+
+    async def start(self):
+        pass
+
+    async def open(self):
+        context = FakeContext()
+        self.opened.append(context)
+        return f"fake-{len(self.opened)}", self.browser, context, context.page
+
+    async def close(self, pooled):
+        self.closed.append(pooled.session_id)
+        await pooled.context.close()
+
+    async def stop(self):
+        self.stopped = True
+
+
+def test_pool_opens_and_closes_sessions_through_the_backend():
+    backend = FakeBackend()
+    pool = BrowserSessionPool(size=1, warm=0, max_uses=2, backend=backend)
+
+    async def session_id(session):
+        assert session.replay_url is None
+        return session.session_id
+
+    async def main():
+        ids = [await pool.run(session_id) for _ in range(3)]
+        await pool.close()
+        return ids
+
+    # Recycled after two bookings; only the context goes, never the browser
+    assert asyncio.run(main()) == ["fake-1", "fake-1", "fake-2"]
+    assert backend.closed == ["fake-1", "fake-2"]
+    assert not backend.browser.closed
+    assert backend.stopped
+
+
+def test_deferred_work_holds_the_session_but_not_the_caller():
+    pool = BrowserSessionPool(size=1, warm=0, backend=FakeBackend())
+    events = []
+
+    async def capture():
+        await asyncio.sleep(0.2)
+        events.append("captured")
+
+    async def book(session):
+        session.defer(capture())
+        return "booked"
+
+    async def next_booking(session):
+        events.append("next booking")
+
+    async def main():
+        began = time.monotonic()
+        result = await pool.run(book)
+        elapsed = time.monotonic() - began
+        # The only session is handed out again once the capture is done
+        await pool.run(next_booking)
+        stats = pool.stats()
+        await pool.close()
+        return result, elapsed, stats
+
+    result, elapsed, stats = asyncio.run(main())
+    assert result == "booked" and elapsed < 0.15
+    assert events == ["captured", "next booking"]
+    assert stats["leased"] == 0 and stats["idle"] == 1
+
+
+def test_backend_is_chosen_by_name(monkeypatch):
+    assert isinstance(make_browser_backend("local"), LocalChromiumBackend)
+    assert make_browser_backend("browserbase").replay_url("abc") == "https://browserbase.com/sessions/abc"
+    with pytest.raises(ValueError):
+        make_browser_backend("firefox")
+
+    monkeypatch.setattr(browser_backend, "PLAYWRIGHT_AVAILABLE", True)
+    monkeypatch.setattr(browser_backend, "BROWSERBASE_AVAILABLE", True)
+    monkeypatch.delenv("BROWSERBASE_API_KEY", raising=False)
+    assert make_browser_backend("local").unavailable_reason() is None
+    assert "BROWSERBASE_API_KEY" in make_browser_backend("browserbase").unavailable_reason()
+
+
+@pytest.mark.skipif(not browser_backend.PLAYWRIGHT_AVAILABLE, reason="playwright not installed")
+def test_local_chromium_runs_pages_without_browserbase():
+    backend = LocalChromiumBackend(headless=True, args="--no-sandbox")
+    pool = BrowserSessionPool(size=2, warm=0, backend=backend)
+    page_html = "data:text/html,<title>Table</title><button class='ReservationButton'>7:00 PM</button>"
+
+    async def load(session):
+        await session.page.goto(page_html)
+        return await session.page.title(), session.replay_url
+
+    async def main():
+        try:
+            started = time.monotonic()
+            results = await asyncio.gather(*(pool.run(load) for _ in range(4)))
+            print(f"4 local page loads in {time.monotonic() - started:.2f}s")
+            return results, pool.stats()
+        finally:
+            await pool.close()
+
+    try:
+        results, stats = asyncio.run(main())
+    except Exception as e:
+        if "Executable doesn't exist" in str(e):
+            pytest.skip("Chromium not installed (playwright install chromium)")
+        raise
+    assert results == [("Table", None)] * 4
+    assert stats["created"] <= 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
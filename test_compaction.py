@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for token-budgeted compaction of tool outputs
+"""
+
+import os
+import sys
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.compaction import compact, compact_output, estimate_tokens
+
+RESULTS = """**1. Hinodeya Ramen**
+   🔗 **URL:** https://example.com/hinodeya
+   📝 **Content:** Hinodeya serves dashi ramen in San Jose. The broth is light and clean. Parking is tricky on weekends. The shop opened in 2019 after success in San Francisco. Lines can be long at lunch. They also sell gyoza and rice bowls. Reservations are available on OpenTable for groups.
+   🔍 **Highlights:** Hinodeya serves dashi ramen in San Jose.
+
+---
+
+**2. Ramen Review Roundup**
+   🔗 **URL:** https://example.com/roundup
+   📝 **Content:** Hinodeya serves dashi ramen in San Jose! Our favourite tonkotsu is elsewhere though. Parking is tricky on weekends. Prices range from fifteen to twenty dollars. The decor is minimal and wooden.
+"""
+
+# get_latest_emails: two emails from the same sender on the same day
+EMAILS = """📧 **Latest Emails:**
+
+**0. Your table is confirmed**
+   👤 From: OpenTable <no-reply@opentable.com>
+   📅 Date: Mon, 21 Jul 2025
+   📝 Preview: See you at Hinodeya Ramen at 7:00 PM.
+   🆔 ID: 1985a
+
+**1. Reminder: dinner tonight**
+   👤 From: OpenTable <no-reply@opentable.com>
+   📅 Date: Mon, 21 Jul 2025
+   📝 Preview: Your reservation for 2 is tonight.
+   🆔 ID: 1985b
+"""
+
+# exa_search_many: two hits surfaced by the same queries
+MATCHED = """**1. Hinodeya Ramen**
+   🔗 **URL:** https://example.com/hinodeya
+   🔍 **Highlights:** Dashi ramen in San Jose.
+   🧭 **Matched:** ramen san jose | best ramen
+
+**2. Ramen Review Roundup**
+   🔗 **URL:** https://example.com/roundup
+   🔍 **Highlights:** Our favourite tonkotsu is elsewhere.
+   🧭 **Matched:** ramen san jose | best ramen
+"""
+
+
+def test_strips_emoji_separators_and_duplicate_sentences():
+    out = compact(RESULTS, budget=10_000)
+    assert "🔗" not in out and "📝" not in out
+    assert "---" not in out
+    assert out.count("Parking is tricky on weekends.") == 1
+    assert out.count("Hinodeya serves dashi ramen in San Jose") == 1
+    assert "**URL:** https://example.com/roundup" in out
+
+
+def test_repeated_fields_survive_in_every_record():
+    out = compact(EMAILS, budget=10_000)
+    assert out.count("From: OpenTable <no-reply@opentable.com>") == 2
+    assert out.count("Date: Mon, 21 Jul 2025") == 2
+    assert "ID: 1985b" in out
+
+    out = compact(MATCHED, budget=10_000)
+    assert out.count("**Matched:** ramen san jose | best ramen") == 2
+
+
+def test_budget_keeps_structure_and_relevant_sentences():
+    out = compact(RESULTS, budget=90, query="opentable reservations for groups")
+    assert estimate_tokens(out) <= 90
+    assert "**1. Hinodeya Ramen**" in out
+    assert "https://example.com/roundup" in out
+    assert "Reservations are available on OpenTable for groups." in out
+    assert "The decor is minimal and wooden." not in out
+
+
+def test_decorator_uses_query_argument():
+    @compact_output(budget=90, query_arg="query")
+    def search(query: str, k: int) -> str:
+        return RESULTS
+
+    assert "OpenTable" in search("opentable reservations", 2)
+    assert search.__name__ == "search"
+
+
+def test_decorator_budget_can_follow_the_arguments():
+    @compact_output(budget=lambda args: args["chars"] // 4)
+    def fetch(chars: int) -> str:
+        return RESULTS
+
+    assert fetch(len(RESULTS) * 2) == compact(RESULTS, budget=10 ** 6)
+    assert estimate_tokens(fetch(200)) <= 50 + 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-user Gmail client cache and background token refresh
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools import gmail_client
+from tools.gmail_client import GmailAuthRequired, GmailClientCache
+
+
+class FakeCredentials:
+    refreshes = 0
+
+    def __init__(self, token, expires_in):
+        self.token = token
+        self.refresh_token = "refresh"
+        self.expiry = datetime.utcnow() + timedelta(seconds=expires_in)
+
+    @property
+    def valid(self):
+        return datetime.utcnow() < self.expiry
+
+    def refresh(self, request):
+        FakeCredentials.refreshes += 1
+        self.token = f"{self.token}+"
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    def to_json(self):
+        return json.dumps({"token": self.token, "expires_in": (self.expiry - datetime.utcnow()).total_seconds()})
+
+    @classmethod
+    def from_authorized_user_file(cls, path, scopes):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["token"], data["expires_in"])
+
+
+@pytest.fixture
+def fake_google(monkeypatch, tmp_path):
+    builds = []
+
+    def fake_build(name, version, credentials=None, **kwargs):
+        builds.append((name, version, kwargs))
+        return {"service_for": credentials.token}
+
+    FakeCredentials.refreshes = 0
+    monkeypatch.setattr(gmail_client, "Credentials", FakeCredentials, raising=False)
+    monkeypatch.setattr(gmail_client, "Request", lambda: None, raising=False)
+    monkeypatch.setattr(gmail_client, "build", fake_build, raising=False)
+    monkeypatch.setattr(gmail_client, "_LEGACY_TOKEN", str(tmp_path / "legacy-token.json"))
+    return builds
+
+
+def _store_token(cache, user_id, token, expires_in):
+    os.makedirs(cache.token_dir, exist_ok=True)
+    with open(cache.token_path(user_id), "w") as f:
+        json.dump({"token": token, "expires_in": expires_in}, f)
+
+
+def _stored_token(cache, user_id):
+    try:
+        with open(cache.token_path(user_id)) as f:
+            return json.load(f)["token"]
+    except (OSError, ValueError):
+        return None
+
+
+def test_client_is_built_once_per_user_from_static_discovery(fake_google, tmp_path):
+    cache = GmailClientCache(str(tmp_path / "tokens"))
+    _store_token(cache, "ann", "ann-token", 3600)
+    _store_token(cache, "bob", "bob-token", 3600)
+    try:
+        for _ in range(3):
+            with cache.service("ann") as service:
+                assert service == {"service_for": "ann-token"}
+        with cache.service("bob") as service:
+            assert service == {"service_for": "bob-token"}
+    finally:
+        cache.close()
+    assert len(fake_google) == 2
+    assert fake_google[0][2] == {"static_discovery": True, "cache_discovery": False}
+
+
+def test_token_is_refreshed_in_the_background_before_it_expires(fake_google, tmp_path):
+    cache = GmailClientCache(str(tmp_path / "tokens"), refresh_margin=0.2)
+    _store_token(cache, "ann", "ann-token", 0.4)
+    try:
+        with cache.service("ann"):
+            pass
+        # The refresh bumps the counter before it saves the token, so wait
+        # for the saved file rather than the counter
+        deadline = time.monotonic() + 3
+        while _stored_token(cache, "ann") != "ann-token+" and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        cache.close()
+    assert FakeCredentials.refreshes == 1
+    assert _stored_token(cache, "ann") == "ann-token+"
+
+
+def test_concurrent_first_calls_build_one_client(fake_google, tmp_path):
+    cache = GmailClientCache(str(tmp_path / "tokens"))
+    _store_token(cache, "ann", "ann-token", 3600)
+
+    def use():
+        with cache.service("ann"):
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.close()
+    assert len(fake_google) == 1
+
+
+def test_background_service_never_blocks_tool_calls(fake_google, tmp_path):
+    cache = GmailClientCache(str(tmp_path / "tokens"))
+    _store_token(cache, "ann", "ann-token", 3600)
+    syncing = threading.Event()
+    background = []
+
+    def long_sync():
+        with cache.background_service("ann") as service:
+            background.append(service)
+            syncing.set()
+            time.sleep(0.5)
+
+    thread = threading.Thread(target=long_sync)
+    thread.start()
+    try:
+        assert syncing.wait(3)
+        began = time.monotonic()
+        with cache.service("ann", interactive=False) as service:
+            waited = time.monotonic() - began
+    finally:
+        thread.join()
+        cache.close()
+    assert waited < 0.1
+    assert background[0] == {"service_for": "ann-token"} and background[0] is not service
+    # One client plus one background service, each built once
+    assert len(fake_google) == 2
+
+
+def test_missing_token_needs_login(fake_google, tmp_path):
+    cache = GmailClientCache(str(tmp_path / "tokens"))
+    with pytest.raises(GmailAuthRequired):
+        with cache.service("carol", interactive=False):
+            pass
+
+
+def test_legacy_token_is_adopted_by_the_default_user(fake_google, tmp_path):
+    with open(gmail_client._LEGACY_TOKEN, "w") as f:
+        json.dump({"token": "old-token", "expires_in": 3600}, f)
+    cache = GmailClientCache(str(tmp_path / "tokens"))
+    with cache.service(interactive=False) as service:
+        assert service == {"service_for": "old-token"}
+    cache.close()
+    assert os.path.exists(cache.token_path(gmail_client.GMAIL_USER_ID))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
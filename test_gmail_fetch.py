@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for batched, metadata-only Gmail fetches and lazy body decoding
+"""
+
+import base64
+import os
+import sys
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools import gmail_fetch
+from tools.gmail_fetch import PhaseTimer, decode_body, fetch_messages, summarize
+
+
+class FakeRequest:
+    def __init__(self, service, message_id, kwargs):
+        self.service = service
+        self.message_id = message_id
+        self.kwargs = kwargs
+
+    def execute(self):
+        self.service.http_calls += 1
+        return self.service.answer(self.message_id)
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.http_calls += 1
+        self.service.batch_sizes.append(len(self.requests))
+        for request_id, request in self.requests:
+            if request.message_id in self.service.flaky:
+                self.service.flaky.discard(request.message_id)
+                self.callback(request_id, None, RuntimeError("rateLimitExceeded"))
+            else:
+                self.callback(request_id, self.service.answer(request.message_id), None)
+
+
+class FakeGmail:
+    """
+    Just enough of the Gmail client for messages().get and batches.
+    """
+
+    def __init__(self, flaky=()):
+        self.http_calls = 0
+        self.batch_sizes = []
+        self.flaky = set(flaky)
+        self.get_kwargs = []
+
+    def answer(self, message_id):
+        return {"id": message_id}
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, userId, id, **kwargs):
+        self.get_kwargs.append(kwargs)
+        return FakeRequest(self, id, kwargs)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+
+def test_details_come_back_in_one_round_trip_in_list_order():
+    service = FakeGmail()
+    ids = [f"m{i}" for i in range(10)]
+    messages = fetch_messages(service, ids, format="metadata")
+    assert [m["id"] for m in messages] == ids
+    assert service.http_calls == 1
+    assert all(kwargs == {"format": "metadata"} for kwargs in service.get_kwargs)
+
+
+def test_large_fetches_are_split_into_batches(monkeypatch):
+    monkeypatch.setattr(gmail_fetch, "GMAIL_BATCH_SIZE", 4)
+    service = FakeGmail()
+    messages = fetch_messages(service, [f"m{i}" for i in range(10)])
+    assert len(messages) == 10
+    assert service.batch_sizes == [4, 4, 2]
+
+
+def test_failed_batch_items_are_retried_alone():
+    service = FakeGmail(flaky={"m2"})
+    messages = fetch_messages(service, ["m1", "m2", "m3"])
+    assert [m["id"] for m in messages] == ["m1", "m2", "m3"]
+    assert service.http_calls == 2
+
+
+def test_phase_timer_reports_each_phase():
+    timer = PhaseTimer()
+    with timer.phase("list"):
+        pass
+    with timer.phase("fetch"):
+        pass
+    assert list(timer.phases) == ["list", "fetch"]
+    assert timer.summary().startswith("list ") and "fetch " in timer.summary()
+
+
+def _b64(text: str, encoding: str = "utf-8") -> str:
+    return base64.urlsafe_b64encode(text.encode(encoding)).decode().rstrip("=")
+
+
+def test_summary_reads_metadata_headers():
+    message = {
+        "id": "m1", "threadId": "t1", "snippet": "See you at 7", "internalDate": "1752000000000",
+        "payload": {"headers": [
+            {"name": "Subject", "value": "Dinner"}, {"name": "from", "value": "ann@example.com"},
+        ]},
+    }
+    email = summarize(message)
+    assert (email["subject"], email["from"], email["date"]) == ("Dinner", "ann@example.com", "Unknown Date")
+    assert email["snippet"] == "See you at 7" and email["internal_date"] == 1752000000000
+
+
+def test_body_prefers_plain_text_and_skips_attachments():
+    payload = {"mimeType": "multipart/mixed", "parts": [
+        {"mimeType": "multipart/alternative", "parts": [
+            {"mimeType": "text/html", "body": {"data": _b64("<p>Table for <b>2</b></p>")}},
+            {"mimeType": "text/plain", "body": {"data": _b64("Table for 2 at 7:00 PM")}},
+        ]},
+        {"mimeType": "text/plain", "filename": "menu.txt", "body": {"attachmentId": "a1"}},
+    ]}
+    assert decode_body(payload) == "Table for 2 at 7:00 PM"
+
+
+def test_html_only_body_is_converted_to_text():
+    payload = {"mimeType": "text/html", "headers": [
+        {"name": "Content-Type", "value": 'text/html; charset="iso-8859-1"'},
+    ], "body": {"data": _b64("<style>p{}</style><p>Café confirmed</p>", "iso-8859-1")}}
+    assert decode_body(payload) == "Café confirmed"
+    assert decode_body({"mimeType": "text/plain", "body": {"size": 0}}) == ""
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Tests for the local Gmail mirror and its history-based incremental sync
+"""
+
+import base64
+import os
+import sys
+import time
+from datetime import datetime
+from contextlib import contextmanager
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools import gmail_mirror
+from tools.gmail_mirror import GmailMirror, GmailSyncScheduler, SearchQuery, SyncDeferred
+
+
+class HistoryExpired(Exception):
+    class resp:
+        status = 404
+
+
+class Call:
+    def __init__(self, service, fn, kwargs):
+        self.service = service
+        self.fn = fn
+        self.kwargs = kwargs
+        self.message_id = kwargs.get("id")
+
+    def execute(self):
+        self.service.calls.append(self.fn.__name__)
+        return self.fn(**self.kwargs)
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.calls.append("batch")
+        for request_id, request in self.requests:
+            self.callback(request_id, request.fn(**request.kwargs), None)
+
+
+class FakeGmail:
+    """
+    A mailbox with a change log, served through the Gmail client's shape.
+    """
+
+    def __init__(self):
+        self.mailbox = {}  # id -> (internal date, subject, labels)
+        self.extra = {}    # id -> (sender, body, epoch seconds)
+        self.log = []       # (history id, record)
+        self.history_id = 100
+        self.oldest_history = 100
+        self.calls = []
+
+    # -- mailbox changes ---------------------------------------------------
+
+    def _log(self, record):
+        self.history_id += 1
+        self.log.append((self.history_id, record))
+
+    def deliver(self, message_id, subject, labels=("INBOX", "UNREAD"),
+                sender="ann@example.com", body="", sent=None):
+        self.mailbox[message_id] = (self.history_id, subject, list(labels))
+        self.extra[message_id] = (sender, body, sent)
+        self._log({"messagesAdded": [{"message": {"id": message_id, "labelIds": list(labels)}}]})
+
+    def delete(self, message_id):
+        del self.mailbox[message_id]
+        self._log({"messagesDeleted": [{"message": {"id": message_id}}]})
+
+    def relabel(self, message_id, labels):
+        date, subject, _ = self.mailbox[message_id]
+        self.mailbox[message_id] = (date, subject, list(labels))
+        self._log({"labelsRemoved": [{"message": {"id": message_id, "labelIds": list(labels)}}]})
+
+    # -- API surface -------------------------------------------------------
+
+    def users(self):
+        return self
+
+    def history(self):
+        return self
+
+    def getProfile(self, userId):
+        return Call(self, self._profile, {})
+
+    def _profile(self):
+        return {"historyId": str(self.history_id)}
+
+    def list(self, userId, startHistoryId=None, pageToken=None, maxResults=100, **kwargs):
+        if startHistoryId is not None:
+            return Call(self, self._history_page, {"start": int(startHistoryId), "token": pageToken})
+        return Call(self, self._message_page, {"max_results": maxResults, "token": pageToken})
+
+    def _message_page(self, max_results, token):
+        ids = sorted(self.mailbox, key=lambda i: -self.mailbox[i][0])
+        start = int(token or 0)
+        page = {"messages": [{"id": i} for i in ids[start:start + max_results]]}
+        if start + max_results < len(ids):
+            page["nextPageToken"] = str(start + max_results)
+        return page
+
+    def _history_page(self, start, token):
+        if start < self.oldest_history:
+            raise HistoryExpired()
+        records = [record for hid, record in self.log if hid > start]
+        offset = int(token or 0)
+        page = {"history": records[offset:offset + 2], "historyId": str(self.history_id)}
+        if offset + 2 < len(records):
+            page["nextPageToken"] = str(offset + 2)
+        return page
+
+    def get(self, userId, id, **kwargs):
+        return Call(self, self._message, {"id": id})
+
+    def _message(self, id):
+        date, subject, labels = self.mailbox[id]
+        sender, body, sent = self.extra[id]
+        return {
+            "id": id, "threadId": f"t-{id}", "labelIds": labels, "snippet": f"about {subject}",
+            "internalDate": str(int(sent * 1000) if sent else date * 1000),
+            "payload": {"mimeType": "text/plain",
+                        "headers": [{"name": "Subject", "value": subject},
+                                    {"name": "From", "value": sender}],
+                        "body": {"data": base64.urlsafe_b64encode(body.encode()).decode()}},
+        }
+
+    def messages(self):
+        return self
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+
+@pytest.fixture
+def gmail():
+    service = FakeGmail()
+    for i in range(5):
+        service.deliver(f"m{i}", f"Subject {i}")
+    # History before the first sync is never asked for
+    service.oldest_history = service.history_id
+    return service
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    return GmailMirror(str(tmp_path / "mirror.sqlite3"))
+
+
+def test_first_sync_copies_the_mailbox(gmail, mirror):
+    assert not mirror.synced
+    result = mirror.sync(gmail)
+    assert result["mode"] == "full" and result["added"] == 5
+    assert mirror.history_id == str(gmail.history_id)
+    assert [e["subject"] for e in mirror.latest(3)] == ["Subject 4", "Subject 3", "Subject 2"]
+    assert mirror.latest(1)[0]["labels"] == ["INBOX", "UNREAD"]
+
+
+def test_full_sync_is_capped_and_pages_through_the_list(gmail, mirror, monkeypatch):
+    monkeypatch.setattr(gmail_mirror, "GMAIL_MIRROR_MAX_MESSAGES", 3)
+    mirror.sync(gmail)
+    assert mirror.count() == 3
+
+
+def test_incremental_sync_applies_only_the_changes(gmail, mirror):
+    mirror.sync(gmail)
+    gmail.calls.clear()
+    gmail.deliver("m5", "Subject 5")
+    gmail.deliver("m6", "Subject 6")
+    gmail.delete("m0")
+    gmail.relabel("m1", ["ARCHIVE"])
+
+    result = mirror.sync(gmail)
+    assert result == {"mode": "incremental", "added": 2, "deleted": 1, "relabeled": 1}
+    # Two history pages and one batch for the two new messages; nothing else
+    assert gmail.calls == ["_history_page", "_history_page", "batch"]
+    assert mirror.count() == 6
+    inbox = [e["id"] for e in mirror.latest(10)]
+    assert inbox == ["m6", "m5", "m4", "m3", "m2"]
+    assert [e["id"] for e in mirror.latest(10, label="ARCHIVE")] == ["m1"]
+    assert mirror.history_id == str(gmail.history_id)
+
+
+def test_message_added_then_deleted_is_never_fetched(gmail, mirror):
+    mirror.sync(gmail)
+    gmail.calls.clear()
+    gmail.deliver("m5", "Subject 5")
+    gmail.delete("m5")
+    assert mirror.sync(gmail)["added"] == 0
+    assert "batch" not in gmail.calls
+
+
+def test_expired_history_falls_back_to_a_full_sync(gmail, mirror):
+    mirror.sync(gmail)
+    gmail.deliver("m5", "Subject 5")
+    gmail.oldest_history = gmail.history_id + 1
+    assert mirror.sync(gmail)["mode"] == "full"
+    assert mirror.count() == 6
+
+
+def test_foreground_sync_never_rebuilds_or_waits(gmail, mirror):
+    with pytest.raises(SyncDeferred):
+        mirror.sync(gmail, full=False)
+    assert not mirror.synced
+
+    mirror.sync(gmail)
+    gmail.deliver("m5", "Subject 5")
+    gmail.oldest_history = gmail.history_id + 1
+    gmail.calls.clear()
+    with pytest.raises(SyncDeferred):
+        mirror.sync(gmail, full=False)
+    # Nothing was listed or fetched; the old copy is left for the scheduler
+    assert gmail.calls == ["_history_page"]
+    assert mirror.count() == 5
+
+    with mirror._sync_lock, pytest.raises(SyncDeferred):
+        mirror.sync(gmail, full=False)
+
+
+def test_mirror_survives_a_restart(gmail, mirror, tmp_path):
+    mirror.sync(gmail)
+    reopened = GmailMirror(str(tmp_path / "mirror.sqlite3"))
+    assert reopened.synced and reopened.count() == 5
+    assert reopened.age < 60
+
+
+def test_scheduler_syncs_on_request(gmail, tmp_path, monkeypatch):
+    mirror = GmailMirror(str(tmp_path / "mirror.sqlite3"))
+
+    class Clients:
+        @contextmanager
+        def background_service(self, user_id=None):
+            yield gmail
+
+    monkeypatch.setattr(gmail_mirror, "get_gmail_mirror", lambda user_id=None: mirror)
+    monkeypatch.setattr(gmail_mirror, "get_gmail_clients", lambda: Clients())
+    scheduler = GmailSyncScheduler(interval=60)
+    scheduler.request_sync("ann")
+    deadline = time.monotonic() + 3
+    while not mirror.synced and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert mirror.count() == 5
+
+    gmail.deliver("m5", "Subject 5")
+    scheduler.request_sync("ann")
+    deadline = time.monotonic() + 3
+    while mirror.count() < 6 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert mirror.latest(1)[0]["id"] == "m5"
+
+
+def _day(text):
+    return datetime.strptime(text, "%Y-%m-%d").timestamp() + 12 * 3600
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    service = FakeGmail()
+    service.deliver("r1", "Your reservation at Hinodeya", sender="OpenTable <no-reply@opentable.com>",
+                    body="Table for 2 on Friday at 7:00 PM. Confirmation 4411.", sent=_day("2025-07-10"))
+    service.deliver("r2", "Lunch?", sender="John Smith <john@example.com>",
+                    body="Are you free Friday? I can make a reservation.", sent=_day("2025-07-12"))
+    service.deliver("r3", "Invoice July", sender="billing@example.com",
+                    body="Your invoice is attached.", labels=("INBOX",), sent=_day("2025-07-20"))
+    service.deliver("r4", "Café menu", sender="john@example.com",
+                    body="Nothing about bookings here.", labels=("ARCHIVE",), sent=_day("2025-06-01"))
+    mirror = GmailMirror(str(tmp_path / "search.sqlite3"))
+    mirror.sync(service)
+    return service, mirror
+
+
+def _ids(mirror, query, n=10):
+    return [e["id"] for e in mirror.search(SearchQuery(query), n)]
+
+
+def test_search_ranks_subject_hits_above_body_hits(inbox):
+    _, mirror = inbox
+    assert _ids(mirror, "reservation") == ["r1", "r2"]
+    assert _ids(mirror, "reservation", n=1) == ["r1"]
+    assert "Friday" in mirror.search(SearchQuery("confirmation 4411"), 1)[0]["excerpt"]
+    # Accents are folded and matching is case-insensitive
+    assert _ids(mirror, "CAFE") == ["r4"]
+
+
+def test_search_field_filters(inbox):
+    _, mirror = inbox
+    assert sorted(_ids(mirror, "from:john@example.com")) == ["r2", "r4"]
+    assert _ids(mirror, "from:john@example.com friday") == ["r2"]
+    assert _ids(mirror, "subject:invoice") == ["r3"]
+    assert _ids(mirror, "subject:attached") == []
+    assert _ids(mirror, "is:unread") == ["r2", "r1"]
+    assert _ids(mirror, "label:archive") == ["r4"]
+
+
+def test_search_date_ranges(inbox):
+    _, mirror = inbox
+    assert _ids(mirror, "after:2025-07-11") == ["r3", "r2"]
+    assert _ids(mirror, "after:2025/07/01 before:2025-07-12") == ["r1"]
+    assert sorted(_ids(mirror, "from:example.com before:2025-07-15")) == ["r2", "r4"]
+    assert _ids(mirror, "newer_than:9999d invoice") == ["r3"]
+
+
+def test_search_text_is_never_read_as_fts_syntax(inbox):
+    _, mirror = inbox
+    assert _ids(mirror, 'NOT "table OR* (at 7:00') == []
+    assert _ids(mirror, "7:00 PM") == ["r1"]
+
+
+def test_search_index_follows_incremental_sync(inbox):
+    service, mirror = inbox
+    service.deliver("r5", "Reservation changed", sender="OpenTable <no-reply@opentable.com>",
+                    body="Now Saturday at 8:00 PM.", sent=_day("2025-07-21"))
+    service.delete("r1")
+    mirror.sync(service)
+    assert _ids(mirror, "from:opentable") == ["r5"]
+    assert _ids(mirror, "confirmation 4411") == []
+    assert _ids(mirror, "saturday") == ["r5"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for HTML-to-text conversion and instruction-based section targeting
+"""
+
+import os
+import sys
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools import html_extract
+from tools.html_extract import Section, extract_sections, html_to_sections, render_sections
+
+PAGE = """<!doctype html>
+<html><head><title> Hino-Deya | Ramen </title>
+<style>body { color: red }</style>
+<script>var menu = "hours parking";</script></head>
+<body>
+<nav><a href="/">Home</a> <a href="/menu">Menu</a></nav>
+<p>Welcome to <b>Hino-Deya</b>.</p>
+<h2>Menu</h2>
+<ul><li>Tonkotsu ramen</li><li>Gyoza</li></ul>
+<h2>Opening hours</h2>
+<p>Tuesday to Sunday, 5 PM &ndash; 10 PM.</p>
+<h2>Parking</h2>
+<div>Street parking on Mission St.</div>
+<footer>&copy; 2025 Hino-Deya hours</footer>
+</body></html>"""
+
+PARSERS = ["stdlib"] + (["selectolax"] if html_extract.SELECTOLAX_AVAILABLE else [])
+
+
+@pytest.fixture(params=PARSERS)
+def parser(request, monkeypatch):
+    monkeypatch.setattr(html_extract, "SELECTOLAX_AVAILABLE", request.param == "selectolax")
+    return request.param
+
+
+def test_sections_drop_scripts_and_chrome(parser):
+    title, sections = html_to_sections(PAGE)
+    assert title == "Hino-Deya | Ramen"
+    assert [s.heading for s in sections] == ["", "Menu", "Opening hours", "Parking"]
+    assert sections[0].lines == ["Welcome to Hino-Deya."]
+    assert sections[1].lines == ["Tonkotsu ramen", "Gyoza"]
+    text = render_sections(sections, 10_000)
+    assert "var menu" not in text and "color" not in text
+    assert "Home" not in text and "2025" not in text
+    assert "5 PM – 10 PM" in text
+
+
+def test_instruction_targets_matching_sections(parser):
+    _, sections = html_to_sections(PAGE)
+    chosen = extract_sections(sections, "What are the opening hours and is there parking?", 1000)
+    assert [s.heading for s in chosen] == ["Opening hours", "Parking"]
+
+
+def test_unmatched_instruction_reads_from_the_top(parser):
+    _, sections = html_to_sections(PAGE)
+    chosen = extract_sections(sections, "vegan options", 40)
+    assert chosen[0].lines == ["Welcome to Hino-Deya."]
+    assert all(s.heading != "Parking" for s in chosen)
+
+
+def test_render_trims_to_budget():
+    section = Section("Menu", 2)
+    section.lines = ["x" * 100]
+    text = render_sections([section], 50)
+    assert len(text) <= 52 and text.endswith(" …")
+    assert Section.from_list(section.to_list()).lines == section.lines
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
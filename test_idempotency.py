@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for idempotent booking requests
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.booking_queue import BookingQueue
+from tools.idempotency import IdempotentCall, booking_key
+
+
+def test_booking_key_normalizes_equivalent_requests():
+    a = booking_key("Hino-Deya", "July 21, 2025", "7pm", 2, "John.Doe@Example.com ")
+    b = booking_key("hinodeya", "2025-07-21", "7:00 PM", "2", "john.doe@example.com")
+    assert a == b
+    assert booking_key("(408) 555-1234", "2025-07-21", "19:00", 2, "+1 408 555 1234") == \
+        booking_key("(408) 555-1234", "July 21, 2025", "7:00 p.m.", 2, "408-555-1234")
+    assert a != booking_key("hinodeya", "2025-07-21", "7:30 PM", 2, "john.doe@example.com")
+    assert a != booking_key("hinodeya", "2025-07-21", "7:00 PM", 3, "john.doe@example.com")
+
+
+def test_duplicates_attach_in_flight_and_reuse_stored_results(tmp_path):
+    calls = []
+    dedup = IdempotentCall("test-booking", window=60, db_path=str(tmp_path / "b.sqlite3"))
+
+    async def book():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "confirmed"
+
+    async def main():
+        first = await asyncio.gather(dedup.run("k", book), dedup.run("k", book))
+        later = await dedup.run("k", book)
+        return first, later
+
+    first, later = asyncio.run(main())
+    assert sorted(how for _, how in first) == ["attached", "fresh"]
+    assert later == ("confirmed", "stored")
+    assert len(calls) == 1
+
+    # Stored results survive a restart
+    reopened = IdempotentCall("test-booking", window=60, db_path=str(tmp_path / "b.sqlite3"))
+    assert asyncio.run(reopened.run("k", book)) == ("confirmed", "stored")
+    assert len(calls) == 1
+
+
+def test_rejected_results_and_expired_window_run_again():
+    calls = []
+    dedup = IdempotentCall("test-retry", window=0.05, store_if=lambda r: r == "ok")
+
+    async def fail():
+        calls.append("fail")
+        return "failed"
+
+    async def succeed():
+        calls.append("ok")
+        return "ok"
+
+    assert asyncio.run(dedup.run("k", fail)) == ("failed", "fresh")
+    assert asyncio.run(dedup.run("k", succeed)) == ("ok", "fresh")
+    assert asyncio.run(dedup.run("k", succeed)) == ("ok", "stored")
+    time.sleep(0.06)
+    assert asyncio.run(dedup.run("k", succeed)) == ("ok", "fresh")
+    assert calls == ["fail", "ok", "ok"]
+
+
+def test_queue_returns_the_running_job_for_a_duplicate():
+    release = threading.Event()
+
+    async def run_job(params, progress):
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return "done"
+
+    queue = BookingQueue(run_job, workers=1)
+    first = queue.submit({"restaurant_name": "A"}, key="same")
+    assert queue.submit({"restaurant_name": "A"}, key="same") is first
+    other = queue.submit({"restaurant_name": "B"}, key="other")
+    assert other is not first
+    release.set()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
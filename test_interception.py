@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for the booking page request-interception policy
+"""
+
+import asyncio
+import os
+import re
+import sys
+import types
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.browser_pool import BrowserSessionPool, PooledSession
+from tools.interception import InterceptionPolicy, intercept, policy_for
+
+
+class FakeRoute:
+    def __init__(self):
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+class FakeContext:
+    """
+    A context without CDP (e.g. Firefox): only the route handler works.
+    """
+
+    def __init__(self):
+        self.handler = None
+        self.pages = []
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    async def request(self, resource_type, url):
+        route = FakeRoute()
+        await self.handler(route, types.SimpleNamespace(resource_type=resource_type, url=url))
+        return route.outcome
+
+
+class FakeCDPSession:
+    def __init__(self):
+        self.blocked = []
+        self.detached = False
+
+    async def send(self, method, params=None):
+        if method == "Network.setBlockedURLs":
+            self.blocked = params["urls"]
+
+    async def detach(self):
+        self.detached = True
+
+
+class FakePage:
+    """
+    Blocks requests the way Chromium does: by wildcard URL patterns.
+    """
+
+    def __init__(self, cdp):
+        self.cdp = cdp
+        self.listeners = {}
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+    def request(self, resource_type, url):
+        blocked = any(
+            re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url) for pattern in self.cdp.blocked
+        )
+        event = "requestfailed" if blocked else "requestfinished"
+        failure = "net::ERR_BLOCKED_BY_CLIENT" if blocked else None
+        request = types.SimpleNamespace(resource_type=resource_type, url=url, failure=failure)
+        for handler in list(self.listeners.get(event, [])):
+            handler(request)
+        return "aborted" if blocked else "continued"
+
+    async def evaluate(self, script):
+        pass
+
+    async def goto(self, url):
+        pass
+
+
+class FakeCDPContext(FakeContext):
+    def __init__(self):
+        super().__init__()
+        self.cdp = FakeCDPSession()
+        self.page = FakePage(self.cdp)
+        self.pages = [self.page]
+
+    async def new_cdp_session(self, page):
+        return self.cdp
+
+    async def unroute_all(self, behavior=None):
+        pass
+
+    async def clear_cookies(self):
+        pass
+
+
+REQUESTS = [
+    ("document", "https://www.opentable.com/r/x"),
+    ("script", "https://www.opentable.com/app.js"),
+    ("image", "https://images.otstatic.com/a.jpg"),
+    ("image", "https://images.otstatic.com/b.jpg?w=200"),
+    ("font", "https://fonts.gstatic.com/x.woff2"),
+    ("script", "https://www.google-analytics.com/ga.js"),
+]
+
+
+def test_policy_blocks_by_type_and_host():
+    policy = InterceptionPolicy(allow_hosts=("hotjar.com",))
+    assert policy.blocks("image", "https://www.opentable.com/logo.png")
+    assert policy.blocks("script", "https://www.googletagmanager.com/gtm.js")
+    assert not policy.blocks("script", "https://static.hotjar.com/c.js")
+    assert not policy.blocks("script", "https://www.opentable.com/app.js")
+    assert not policy.blocks("document", "https://doubleclick.net/frame")
+
+
+def test_platform_policies_block_maps():
+    assert policy_for("Resy").blocks("script", "https://maps.googleapis.com/maps/api/js")
+    assert not policy_for("Unknown").blocks("script", "https://maps.googleapis.com/maps/api/js")
+
+
+def test_blocking_happens_inside_the_browser():
+    context = FakeCDPContext()
+    session = PooledSession("s", None, context, context.page)
+
+    async def main():
+        report = await intercept(session, "OpenTable")
+        # Nothing goes through a Python route handler
+        assert context.handler is None
+        outcomes = [context.page.request(kind, url) for kind, url in REQUESTS]
+        await BrowserSessionPool(size=1, warm=0)._reset(session)
+        return report, outcomes
+
+    report, outcomes = asyncio.run(main())
+    assert outcomes == ["continued", "continued", "aborted", "aborted", "aborted", "aborted"]
+    assert report.allowed == 2
+    assert report.blocked == 4
+    assert report.blocked_by_type == {"image": 2, "font": 1, "script": 1}
+    assert report.to_dict()["estimated_bytes_saved"] > 0
+    assert report.summary().startswith("4 of 6 requests blocked")
+    assert "est." in report.summary()
+    # The reset undid it for the next job
+    assert context.cdp.blocked == [] and context.cdp.detached
+    assert context.page.listeners == {"requestfinished": [], "requestfailed": []}
+
+
+def test_policies_the_browser_cant_match_fall_back_to_routing():
+    assert InterceptionPolicy(block_types=("xhr",)).url_patterns() is None
+    # An allowed host inside a denied one can't be written as a pattern
+    assert InterceptionPolicy(deny_hosts=("hotjar.com",), allow_hosts=("static.hotjar.com",)).url_patterns() is None
+    allowed = InterceptionPolicy(deny_hosts=("hotjar.com",), allow_hosts=("hotjar.com",)).url_patterns()
+    assert allowed and not any("hotjar" in pattern for pattern in allowed)
+
+    async def main():
+        context = FakeContext()
+        report = await intercept(PooledSession("s", None, context, None), "OpenTable")
+        outcomes = [await context.request(kind, url) for kind, url in REQUESTS]
+        return report, outcomes
+
+    report, outcomes = asyncio.run(main())
+    assert outcomes == ["continued", "continued", "aborted", "aborted", "aborted", "aborted"]
+    assert report.blocked == 4
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the adaptive per-domain navigation engine
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.navigation import NavigationFailed, NavigationStats, navigate
+
+
+class FakePage:
+    """
+    Page whose lifecycle events and selector take scripted times (seconds);
+    None means the event never happens. *selector_after* may also be a dict
+    keyed by the wait_until of the last goto.
+    """
+
+    def __init__(self, events, selector_after=None):
+        self.events = events
+        self.selector_after = selector_after
+        self.gotos = []
+
+    async def _wait(self, delay, timeout_ms):
+        if delay is None or delay > timeout_ms / 1000:
+            await asyncio.sleep(timeout_ms / 1000)
+            raise TimeoutError(f"Timeout {timeout_ms}ms exceeded")
+        await asyncio.sleep(delay)
+
+    async def goto(self, url, wait_until="load", timeout=30000):
+        self.gotos.append(wait_until)
+        await self._wait(self.events.get(wait_until), timeout)
+
+    async def wait_for_selector(self, selector, state="visible", timeout=30000):
+        delay = self.selector_after
+        if isinstance(delay, dict):
+            delay = delay.get(self.gotos[-1])
+        await self._wait(delay, timeout)
+
+    async def title(self):
+        return "Test Restaurant"
+
+
+def test_ready_selector_short_circuits_lifecycle_events():
+    page = FakePage({"commit": 0.01, "networkidle": None}, selector_after=0.02)
+    result = asyncio.run(navigate(page, "https://www.opentable.com/r/x", NavigationStats()))
+    assert result["strategy"] == "ready"
+    assert result["ready"] is True
+    assert page.gotos == ["commit"]
+
+
+def test_falls_back_and_learns_best_strategy_per_domain(tmp_path, monkeypatch):
+    monkeypatch.setattr("tools.navigation.NAVIGATION_READY_TIMEOUT", 0.05)
+    db_path = str(tmp_path / "navigation.sqlite3")
+    stats = NavigationStats(db_path)
+    # The reservation element only shows up once the DOM has loaded
+    page = FakePage(
+        {"commit": 0.01, "domcontentloaded": 0.01},
+        selector_after={"commit": None, "domcontentloaded": 0.01},
+    )
+
+    first = asyncio.run(navigate(page, "https://resy.com/cities/ny/x", stats))
+    assert first["strategy"] == "domcontentloaded"
+    assert first["ready"] is True
+    assert first["attempts"] == ["ready", "domcontentloaded"]
+
+    # Next time (even after a restart) the working strategy goes first
+    reopened = NavigationStats(db_path)
+    assert reopened.ranked("resy.com")[0] == "domcontentloaded"
+    assert reopened.ranked("resy.com")[-1] == "ready"
+    page.gotos.clear()
+    second = asyncio.run(navigate(page, "https://resy.com/cities/ny/y", reopened))
+    assert page.gotos == ["domcontentloaded"]
+    assert second["attempts"] == ["domcontentloaded"]
+    # Other domains keep the default order
+    assert reopened.ranked("opentable.com")[0] == "ready"
+    # After a couple of good loads the demoted strategy gets another chance
+    assert reopened.ranked("resy.com")[0] == "ready"
+
+
+def test_loads_that_never_become_ready_are_not_successes(monkeypatch):
+    monkeypatch.setattr("tools.navigation.NAVIGATION_READY_TIMEOUT", 0.05)
+    stats = NavigationStats()
+    page = FakePage({"commit": 0.01, "domcontentloaded": 0.01})
+
+    result = asyncio.run(navigate(page, "https://resy.com/cities/ny/x", stats))
+    assert (result["strategy"], result["ready"]) == ("domcontentloaded", False)
+    assert stats.for_domain("resy.com")["domcontentloaded"]["successes"] == 0
+    # Not pinned to the lifecycle fallback; the untried strategies go first
+    assert stats.ranked("resy.com") == ["load", "networkidle", "ready", "domcontentloaded"]
+
+
+def test_faster_strategy_wins_on_latency():
+    stats = NavigationStats()
+    stats.record("yelp.com", "load", True, 4.0)
+    stats.record("yelp.com", "domcontentloaded", True, 1.5)
+    stats.record("yelp.com", "ready", False, 15.0)
+    assert stats.ranked("yelp.com") == ["domcontentloaded", "load", "networkidle", "ready"]
+
+
+def test_budget_bounds_the_worst_case():
+    page = FakePage({})  # Nothing ever loads
+    with pytest.raises(NavigationFailed):
+        asyncio.run(navigate(page, "https://slow.example.com/", NavigationStats(), budget=1.5))
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the size-capped page fetcher and its conditional-GET cache
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+pytest.importorskip("httpx")
+
+from tools import page_fetch
+from tools.cache import TTLCache
+
+PAGE = (b"<html><head><title>Cafe</title></head><body>"
+        b"<h2>Hours</h2><p>Open daily 8-4.</p><h2>Menu</h2><p>Coffee</p></body></html>")
+
+
+class FakeResponse:
+    def __init__(self, status, headers, url):
+        self.status_code = status
+        self.headers = headers
+        self.url = url
+
+
+class FakeServer:
+    """
+    Stands in for http_client.fetch_capped, honouring If-None-Match.
+    """
+
+    def __init__(self, body=PAGE, etag='"v1"', content_type="text/html; charset=utf-8"):
+        self.body = body
+        self.etag = etag
+        self.content_type = content_type
+        self.requests = []
+
+    async def fetch_capped(self, method, url, max_bytes, **kwargs):
+        headers = kwargs.get("headers", {})
+        self.requests.append(headers)
+        response_headers = {"content-type": self.content_type}
+        if self.etag:
+            response_headers["etag"] = self.etag
+            if headers.get("If-None-Match") == self.etag:
+                return FakeResponse(304, response_headers, url), b"", False
+        body = self.body[:max_bytes]
+        return FakeResponse(200, response_headers, url), body, len(self.body) > max_bytes
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr(page_fetch.http_client, "fetch_capped", server.fetch_capped)
+    monkeypatch.setattr(page_fetch, "_page_cache", TTLCache("pages-test", ttl=60))
+    return server
+
+
+def test_unchanged_page_is_revalidated_not_reparsed(server, monkeypatch):
+    first = asyncio.run(page_fetch.fetch_page("https://cafe.example/"))
+    assert not first["cached"] and first["title"] == "Cafe"
+
+    def fail(*args):
+        raise AssertionError("a 304 must not be parsed again")
+
+    monkeypatch.setattr(page_fetch, "_parse_page", fail)
+    second = asyncio.run(page_fetch.fetch_page("https://cafe.example/"))
+    assert second["cached"] and second["sections"] == first["sections"]
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+
+
+def test_page_without_validators_is_fresh_for_a_while(server, monkeypatch):
+    server.etag = None
+    asyncio.run(page_fetch.fetch_page("https://cafe.example/"))
+    asyncio.run(page_fetch.fetch_page("https://cafe.example/"))
+    assert len(server.requests) == 1
+    monkeypatch.setattr(page_fetch, "PAGE_FRESH_FOR", 0)
+    asyncio.run(page_fetch.fetch_page("https://cafe.example/"))
+    assert len(server.requests) == 2
+
+
+def test_extract_page_targets_instruction_and_caps_size(server, monkeypatch):
+    text = asyncio.run(page_fetch.extract_page("https://cafe.example/", "opening hours"))
+    assert text.startswith("Content from https://cafe.example/:\nTitle: Cafe")
+    assert "Open daily 8-4." in text and "Coffee" not in text
+
+    monkeypatch.setattr(page_fetch, "NAVIGATE_MAX_BYTES", 80)
+    text = asyncio.run(page_fetch.extract_page("https://cafe.example/long", "menu"))
+    assert "cut off" in text and "Coffee" not in text
+
+
+def test_binary_content_is_not_decoded(server):
+    server.content_type = "application/pdf"
+    text = asyncio.run(page_fetch.extract_page("https://cafe.example/menu.pdf", "menu"))
+    assert "Binary content (application/pdf)" in text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
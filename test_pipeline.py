@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the dependency-graph step runner used by the booking pipeline
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools import pipeline
+from tools.pipeline import TaskGraph
+
+
+def test_independent_steps_overlap():
+    async def slow(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    async def main():
+        graph = TaskGraph("test")
+        graph.add("target", lambda: slow("https://opentable.com/r/x"))
+        graph.add("session", lambda: slow("session-1"))
+        graph.add("result", lambda target, session: slow(f"{session}@{target}"), after=("target", "session"))
+        began = time.perf_counter()
+        results = await graph.run()
+        return results, time.perf_counter() - began
+
+    results, elapsed = asyncio.run(main())
+    assert results["result"] == "session-1@https://opentable.com/r/x"
+    assert elapsed < 0.25  # 0.1 + 0.1, not 0.1 + 0.1 + 0.1
+
+
+def test_failure_still_cleans_up_resource_steps():
+    released = []
+
+    async def lease():
+        await asyncio.sleep(0.05)
+        return "session-1"
+
+    async def release(session):
+        released.append(session)
+
+    async def resolve():
+        raise LookupError("no booking platform")
+
+    async def main():
+        graph = TaskGraph("test")
+        graph.add("target", resolve)
+        graph.add("session", lease, cleanup=release)
+        graph.add("result", lambda target, session: asyncio.sleep(0), after=("target", "session"))
+        try:
+            await graph.run()
+        except LookupError:
+            pass
+        # The lease finishes in the background and is released afterwards;
+        # until then the pending cleanup is held so it can't be collected
+        assert len(pipeline._background_cleanups) == 1
+        await asyncio.sleep(0.1)
+        assert not pipeline._background_cleanups
+
+    asyncio.run(main())
+    assert released == ["session-1"]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the local restaurant entity store
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.restaurant_store import RestaurantStore, normalize_name
+
+
+def _store(tmp_path, **kwargs):
+    store = RestaurantStore(str(tmp_path / "restaurants.sqlite3"), **kwargs)
+    store.upsert(
+        "Hinodeya Ramen",
+        "OpenTable",
+        "https://www.opentable.com/r/hinodeya-san-jose",
+        aliases=["Hinodeya San Jose"],
+    )
+    store.upsert("Sushi Yasuda", "Resy", "https://resy.com/cities/ny/sushi-yasuda")
+    return store
+
+
+def test_normalize_name_ignores_spacing_and_punctuation():
+    assert normalize_name("Hino-Day A") == normalize_name("hino day a") == "hinodaya"
+
+
+def test_speech_transcribed_name_matches(tmp_path):
+    entry = _store(tmp_path).lookup("hino day a ramen")
+    assert entry is not None
+    assert entry["canonical_name"] == "Hinodeya Ramen"
+    assert entry["platform"] == "OpenTable"
+    assert 0.8 <= entry["score"] < 1.0
+
+
+def test_alias_is_exact_match_and_unrelated_names_miss(tmp_path):
+    store = _store(tmp_path)
+    assert store.lookup("hinodeya san jose")["score"] == 1.0
+    assert store.lookup("Sushi") is None
+    assert store.lookup("Olive Garden") is None
+
+
+def test_short_names_do_not_match_longer_restaurants(tmp_path):
+    store = _store(tmp_path)
+    store.upsert("Nopalito", "OpenTable", "https://www.opentable.com/r/nopalito-san-francisco")
+    store.upsert("Sushi Ran", "OpenTable", "https://www.opentable.com/r/sushi-ran-sausalito")
+    assert store.lookup("Nopa") is None
+    assert store.lookup("Sushi") is None
+    assert store.lookup("Hino") is None
+    assert store.lookup("Nopalito")["score"] == 1.0
+
+
+def test_entries_persist_and_go_stale(tmp_path):
+    _store(tmp_path)
+    reopened = RestaurantStore(str(tmp_path / "restaurants.sqlite3"), stale_after=0.01)
+    time.sleep(0.02)
+    entry = reopened.lookup("sushi yasuda")
+    assert entry["booking_url"] == "https://resy.com/cities/ny/sushi-yasuda"
+    assert entry["stale"] is True
+
+
+def test_upsert_by_url_merges_aliases(tmp_path):
+    store = _store(tmp_path)
+    store.upsert(
+        "Hinodeya Ramen Bar",
+        "OpenTable",
+        "https://www.opentable.com/r/hinodeya-san-jose",
+        aliases=["hinodeya"],
+    )
+    entry = store.lookup("Hinodeya")
+    assert entry["canonical_name"] == "Hinodeya Ramen Bar"
+    assert entry["aliases"] == ["Hinodeya San Jose", "hinodeya"]
+
+
+def test_fuzzy_hits_become_aliases_only_after_a_booking(tmp_path, monkeypatch):
+    pytest.importorskip("httpx")
+    pytest.importorskip("google.adk")
+    from tools import browserbase_tools, restaurant_store
+
+    store = _store(tmp_path)
+    monkeypatch.setattr(restaurant_store, "_store", store)
+    url = "https://www.opentable.com/r/hinodeya-san-jose"
+
+    async def main():
+        assert await browserbase_tools.resolve_booking_url("Hinodaya Ramen") == (url, "OpenTable")
+        assert store.lookup("Hinodaya Ramen")["score"] < 1.0
+        # A booking that ended up elsewhere doesn't vouch for the match
+        await browserbase_tools.remember_alias("Hinodaya Ramen", "https://resy.com/other")
+        assert store.lookup("Hinodaya Ramen")["score"] < 1.0
+        await browserbase_tools.remember_alias("Hinodaya Ramen", url)
+        assert store.lookup("Hinodaya Ramen")["score"] == 1.0
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-round-trip reservation selector probe
+"""
+
+import asyncio
+import os
+import sys
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.navigation import RESERVATION_SELECTORS
+from tools.selector_probe import SELECTOR_SETS, probe, selector_set_for
+
+
+class FakePage:
+    """
+    Answers the probe script from a {css: [elements]} table, ignoring text.
+    """
+
+    def __init__(self, dom):
+        self.dom = dom
+        self.evaluations = 0
+
+    async def evaluate(self, script, arg=None):
+        self.evaluations += 1
+        selectors, max_elements = arg
+        results = []
+        for selector in selectors:
+            nodes = [
+                n for n in self.dom.get(selector["css"], [])
+                if not selector["text"] or selector["text"].lower() in n["text"].lower()
+            ]
+            results.append({"count": len(nodes), "elements": nodes[:max_elements]})
+        return results
+
+
+def test_probe_is_one_round_trip_and_returns_every_match():
+    page = FakePage({
+        "button": [
+            {"tag": "button", "text": "Find a time", "attrs": {"class": "cta"}, "visible": True},
+            {"tag": "button", "text": "Reserve now", "attrs": {}, "visible": True},
+        ],
+        '[data-test*="reservation"]': [
+            {"tag": "div", "text": "", "attrs": {"data-test": "reservation-widget"}, "visible": True},
+        ],
+    })
+    result = asyncio.run(probe(page, "OpenTable"))
+
+    assert page.evaluations == 1
+    assert result["version"] == "OpenTable@v1"
+    assert [m["selector"] for m in result["matches"]] == [
+        '[data-test*="reservation"]',
+        'button:has-text("Find a time")',
+        'button:has-text("Reserve")',
+    ]
+    assert result["matches"][0]["elements"][0]["attrs"] == {"data-test": "reservation-widget"}
+
+
+def test_unknown_platform_uses_default_set():
+    assert selector_set_for("SevenRooms") is SELECTOR_SETS["default"]
+    page = FakePage({})
+    assert asyncio.run(probe(page, "SevenRooms")) == {"version": "default@v1", "matches": []}
+
+
+def test_navigation_waits_on_the_same_selectors():
+    assert RESERVATION_SELECTORS == (
+        'button:has-text("Make a Reservation")',
+        'button:has-text("Book Now")',
+        'button:has-text("Reserve")',
+        'a:has-text("Reservation")',
+        '[data-testid*="reservation"]',
+        '.reservation-button',
+    )
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for single-flight coalescing of concurrent tool calls
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.singleflight import coalesce
+
+
+def test_concurrent_async_callers_share_one_call():
+    calls = []
+
+    @coalesce("test_async")
+    async def search(query: str, k: int) -> str:
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return f"{query}:{k}"
+
+    async def main():
+        return await asyncio.gather(
+            search("ramen", 3), search("  ramen ", 3), search("ramen", k=3), search("sushi", 3)
+        )
+
+    results = asyncio.run(main())
+    assert results == ["ramen:3", "ramen:3", "ramen:3", "sushi:3"]
+    assert calls == ["ramen", "sushi"]
+    stats = search.singleflight.stats()
+    assert stats["coalesced"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_callers_on_different_threads_share_one_call():
+    calls = []
+    results = []
+
+    @coalesce("test_threads")
+    def fetch(url: str) -> str:
+        calls.append(url)
+        time.sleep(0.1)
+        return "body"
+
+    threads = [threading.Thread(target=lambda: results.append(fetch("https://x"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["body"] * 4
+    assert len(calls) == 1
+    assert fetch.singleflight.stats()["coalesced"] == 3
+
+
+def test_errors_propagate_and_are_not_remembered():
+    attempts = []
+
+    @coalesce("test_errors")
+    async def flaky() -> str:
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise ValueError("boom")
+        return "ok"
+
+    async def main():
+        first = await asyncio.gather(flaky(), flaky(), return_exceptions=True)
+        return first, await flaky()
+
+    first, second = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in first)
+    assert second == "ok"
+
+
+def test_cancelled_follower_does_not_cancel_the_shared_call():
+    calls = []
+
+    @coalesce("test_follower_cancel")
+    async def slow() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(slow())
+        await asyncio.sleep(0.01)
+        other = asyncio.ensure_future(slow())
+        timed_out = None
+        try:
+            await asyncio.wait_for(slow(), 0.02)
+        except asyncio.TimeoutError as e:
+            timed_out = e
+        return timed_out, await leader, await other
+
+    timed_out, leader_result, other_result = asyncio.run(main())
+    assert isinstance(timed_out, asyncio.TimeoutError)
+    assert (leader_result, other_result) == ("done", "done")
+    assert len(calls) == 1
+    stats = slow.singleflight.stats()
+    assert stats["coalesced"] == 2 and stats["executions"] == 1 and stats["in_flight"] == 0
+
+
+def test_followers_rerun_when_the_leader_is_cancelled():
+    calls = []
+
+    @coalesce("test_leader_cancel")
+    async def slow() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(slow())
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(slow())
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+    assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
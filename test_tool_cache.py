@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the two-tier tool response cache
+"""
+
+import os
+import sys
+import time
+
+# Make Multitoolagent/tools importable as `tools` ahead of the legacy copy
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Multitoolagent'))
+
+from tools.cache import TTLCache, make_key, normalize_query
+
+
+def test_normalized_queries_share_a_key():
+    a = make_key(normalize_query("Best ramen in  San Jose?"), 5, {"text": True})
+    b = make_key(normalize_query("best ramen in san jose"), 5, {"text": True})
+    c = make_key(normalize_query("best ramen in san jose"), 3, {"text": True})
+    assert a == b
+    assert a != c
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache("t", ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_ttl_expiry():
+    cache = TTLCache("t", ttl=0.01)
+    cache.set("a", {"x": 1})
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    db = str(tmp_path / "cache.sqlite3")
+    TTLCache("exa", ttl=60, db_path=db).set("k", {"results": [1, 2]})
+    fresh = TTLCache("exa", ttl=60, db_path=db)
+    assert fresh.get("k") == {"results": [1, 2]}
+    assert fresh.stats()["disk_hits"] == 1
+    # Promoted into memory on the first disk hit
+    assert fresh.get("k") == {"results": [1, 2]}
+    assert fresh.stats()["memory_hits"] == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -1,10 +1,28 @@
 # tools/exa_tools.py
+import asyncio
 import os, httpx
 from google.adk.tools import FunctionTool
 
 EXA_API_KEY = os.getenv("EXA_API_KEY")
 EXA_ENDPOINT = "https://api.exa.ai/search"
 
+# One keep-alive client for the whole process instead of a new connection
+# (DNS + TLS handshake) per search. httpx.Client is safe to share across threads.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client = httpx.Client(
+    http2=HTTP2_AVAILABLE and os.getenv("HTTP2_ENABLED", "1") != "0",
+    timeout=httpx.Timeout(
+        float(os.getenv("HTTP_READ_TIMEOUT", "30")),  # Generous for live crawling
+        connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    ),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+)
+
 def exa_search(query: str, k: int) -> str:
     """
     Returns a markdown bullet list of search hits with actual text content.
@@ -23,11 +41,10 @@ def exa_search(query: str, k: int) -> str:
     }
     
     try:
-        r = httpx.post(
+        r = _client.post(
             EXA_ENDPOINT,
             json=payload,
             headers={"x-api-key": EXA_API_KEY},
-            timeout=30,  # Increased timeout for live crawling
         )
         r.raise_for_status()
         
@@ -75,5 +92,12 @@ def exa_search(query: str, k: int) -> str:
     except Exception as e:
         return f"Error searching with Exa: {str(e)}"
 
-ExaSearchTool = FunctionTool(exa_search)
+async def exa_search_async(query: str, k: int) -> str:
+    """
+    Returns a markdown bullet list of search hits with actual text content.
+    """
+    # Run the pooled sync client in a worker thread so the event loop stays free
+    return await asyncio.to_thread(exa_search, query, k)
+
+ExaSearchTool = FunctionTool(exa_search_async)
 